@@ -279,6 +279,7 @@ TEMPLATES = [
                 "looking_for_group.motd.context_processors.motd",
                 "looking_for_group.context_processors.app_version",
                 "looking_for_group.context_processors.has_two_factor",
+                "looking_for_group.context_processors.fragment_cache",
                 "looking_for_group.tours.context_processors.completed_tours",
                 "postman.context_processors.inbox",
             ],
@@ -420,6 +421,70 @@ STAR_RATINGS_OBJECT_ID_PATTERN = (
 
 Q_CLUSTER = {"name": "looking_for_group"}
 
+# ------------------------------------------------------------------------------
+# Game Calendars
+# ------------------------------------------------------------------------------
+
+# When enabled, player calendars are assembled at read time from the master events of
+# their games instead of storing a copy of every game event in each player's calendar.
+GAMES_VIRTUAL_PLAYER_CALENDARS = env.bool("GAMES_VIRTUAL_PLAYER_CALENDARS", False)
+
+# The non-public games each gamer can see are cached and invalidated by receivers.
+GAME_VISIBILITY_CACHE_ALIAS = env("GAME_VISIBILITY_CACHE_ALIAS", default="default")
+GAME_VISIBILITY_CACHE_TIMEOUT = env.int("GAME_VISIBILITY_CACHE_TIMEOUT", default=60 * 60)
+
+# ------------------------------------------------------------------------------
+# Markdown Rendering
+# ------------------------------------------------------------------------------
+
+# Rendered markdown is cached by a hash of its source text.
+MARKDOWN_CACHE_ALIAS = env("MARKDOWN_CACHE_ALIAS", default="default")
+MARKDOWN_CACHE_TIMEOUT = env.int("MARKDOWN_CACHE_TIMEOUT", default=60 * 60 * 24 * 30)
+# Bodies longer than this are rendered in a background task. Zero disables this.
+MARKDOWN_ASYNC_THRESHOLD = env.int("MARKDOWN_ASYNC_THRESHOLD", default=0)
+
+# ------------------------------------------------------------------------------
+# Fragment Caches
+# ------------------------------------------------------------------------------
+
+# Serialized games, profiles and catalog entries are cached per object and version.
+API_FRAGMENT_CACHE_ALIAS = env("API_FRAGMENT_CACHE_ALIAS", default="default")
+API_FRAGMENT_CACHE_TIMEOUT = env.int("API_FRAGMENT_CACHE_TIMEOUT", default=60 * 60 * 24)
+# Game rows and cards, profile and community pages, cached by the same versions.
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = env.int(
+    "TEMPLATE_FRAGMENT_CACHE_TIMEOUT", default=60 * 60 * 24
+)
+
+# ------------------------------------------------------------------------------
+# Account Deletion
+# ------------------------------------------------------------------------------
+
+# Accounts are deleted in the background one chunk per transaction: this many GMed
+# games, or this many player records or calendar events.
+ACCOUNT_DELETION_GAME_BATCH_SIZE = env.int("ACCOUNT_DELETION_GAME_BATCH_SIZE", default=5)
+ACCOUNT_DELETION_BATCH_SIZE = env.int("ACCOUNT_DELETION_BATCH_SIZE", default=200)
+# Deletions without progress for this long are queued again.
+ACCOUNT_DELETION_STALLED_MINUTES = env.int(
+    "ACCOUNT_DELETION_STALLED_MINUTES", default=30
+)
+# Failed deletions are retried automatically until they have failed this many times.
+ACCOUNT_DELETION_MAX_ATTEMPTS = env.int("ACCOUNT_DELETION_MAX_ATTEMPTS", default=3)
+
+# ------------------------------------------------------------------------------
+# Maintenance
+# ------------------------------------------------------------------------------
+
+# Sweeps run by the scheduled looking_for_group.maintenance.run_maintenance task.
+MAINTENANCE_SWEEPS = [
+    "looking_for_group.games.tasks.clean_expired_availability_events",
+    "looking_for_group.invites.tasks.expire_pending_invites",
+    "looking_for_group.gamer_profiles.tasks.clean_expired_kicks",
+]
+# The most rows a sweep changes in one transaction.
+MAINTENANCE_BATCH_SIZE = env.int("MAINTENANCE_BATCH_SIZE", default=1000)
+# Kick records are kept for this many days after the suspension ends.
+KICKED_USER_RETENTION_DAYS = env.int("KICKED_USER_RETENTION_DAYS", default=365)
+
 # ------------------------------------------------------------------------------
 # Notifications
 # ------------------------------------------------------------------------------
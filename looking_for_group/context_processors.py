@@ -1,4 +1,5 @@
 from allauth_2fa.utils import user_has_valid_totp_device
+from django.conf import settings
 
 from . import __version__
 
@@ -19,3 +20,14 @@ def has_two_factor(request):
         return {"2FA_ENABLED": user_has_valid_totp_device(request.user)}
     else:
         return {"2FA_ENABLED": False}
+
+
+def fragment_cache(request):
+    """
+    How long the versioned template fragments are cached for.
+    """
+    return {
+        "FRAGMENT_CACHE_TIMEOUT": getattr(
+            settings, "TEMPLATE_FRAGMENT_CACHE_TIMEOUT", 60 * 60 * 24
+        )
+    }
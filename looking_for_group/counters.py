@@ -0,0 +1,262 @@
+"""
+Denormalized counters that are kept in step with the rows they count.
+
+Instead of recounting and saving the whole parent row whenever a child changes, the
+counters use the child's ``FieldTracker`` to spot status transitions and apply
+``F()`` deltas to the parent in a single ``UPDATE``. As this bypasses ``save()``, none
+of the parent's save receivers fire, so the cached fragments of the updated rows are
+discarded here instead. Drift is repaired periodically by :func:`reconcile`.
+"""
+import logging
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+
+from . import fragments
+
+logger = logging.getLogger("counters")
+
+registry = []
+
+
+def apply_deltas(model, lookup, deltas):
+    """
+    Apply a dict of ``{field: delta}`` to the rows of ``model`` matching ``lookup``
+    without calling ``save()``. Decrements never take a counter below zero.
+
+    :returns: int -- The number of rows updated.
+    """
+    updates = {}
+    for field, delta in deltas.items():
+        if delta > 0:
+            updates[field] = F(field) + delta
+        elif delta < 0:
+            updates[field] = Greatest(F(field) + delta, 0)
+    if not updates:
+        return 0
+    queryset = model.objects.filter(**lookup)
+    if list(lookup) == ["pk"]:
+        pks = [lookup["pk"]]
+    else:
+        pks = list(queryset.values_list("pk", flat=True))
+    updated = queryset.update(**updates)
+    if updated:
+        fragments.bump(model, pks)
+    return updated
+
+
+def increment(instance, field, delta=1):
+    """
+    Apply a delta to a counter field of an already saved instance and keep the
+    in-memory value roughly in step.
+    """
+    updated = apply_deltas(type(instance), {"pk": instance.pk}, {field: delta})
+    if updated and field in instance.__dict__:
+        setattr(instance, field, max(getattr(instance, field) + delta, 0))
+    return updated
+
+
+class StatusTransitionCounter:
+    """
+    Maintains counters on a target model from the rows of a sender model. The sender
+    must have a ``FieldTracker`` covering ``source_field`` and ``status_field`` so that
+    transitions can be detected without reloading the row.
+
+    :param sender: The model whose rows are being counted.
+    :param target: The model holding the counter fields.
+    :param source_field: The field on the sender identifying the target row, e.g.
+        ``game``.
+    :param target_field: The field on the target that ``source_field`` refers to.
+    :param status_field: The field on the sender whose value decides which counter a
+        row contributes to, if any.
+    :param status_counters: A dict mapping status values to counter field names.
+    :param created_counter: A counter field incremented once for every row created.
+    :param count_deletes: Whether deleting a row takes back its contribution. Counters
+        that record history, such as the number of games joined, leave this off.
+    :param tracker: The name of the ``FieldTracker`` on the sender.
+    """
+
+    def __init__(
+        self,
+        sender,
+        target,
+        source_field,
+        target_field="pk",
+        status_field=None,
+        status_counters=None,
+        created_counter=None,
+        count_deletes=True,
+        tracker="tracker",
+    ):
+        self.sender = sender
+        self.target = target
+        self.source_field = source_field
+        self.target_field = target_field
+        self.status_field = status_field
+        self.status_counters = status_counters or {}
+        self.created_counter = created_counter
+        self.count_deletes = count_deletes
+        self.tracker = tracker
+        self.tracked_fields = [source_field]
+        if status_field:
+            self.tracked_fields.append(status_field)
+        self.tracked_attnames = [
+            sender._meta.get_field(field).attname for field in self.tracked_fields
+        ]
+
+    def __repr__(self):
+        return "<StatusTransitionCounter {}.{}: {}>".format(
+            self.target._meta.label, self.target_field, ", ".join(self.counter_fields),
+        )
+
+    @property
+    def counter_fields(self):
+        fields = list(self.status_counters.values())
+        if self.created_counter:
+            fields.append(self.created_counter)
+        return fields
+
+    def connect(self):
+        """
+        Register the signal receivers for this counter and add it to the registry used
+        for reconciliation.
+        """
+        tracker = getattr(self.sender, self.tracker, None)
+        missing = set(self.tracked_fields) - set(getattr(tracker, "fields", ()))
+        if missing:
+            raise ImproperlyConfigured(
+                "{} needs a FieldTracker named {} that tracks {}".format(
+                    self.sender._meta.label, self.tracker, ", ".join(sorted(missing))
+                )
+            )
+        post_save.connect(self.after_save, sender=self.sender, weak=False)
+        post_delete.connect(self.after_delete, sender=self.sender, weak=False)
+        registry.append(self)
+        return self
+
+    def _current(self, instance):
+        return tuple(getattr(instance, attname) for attname in self.tracked_attnames)
+
+    def _previous(self, instance):
+        tracker = getattr(instance, self.tracker)
+        return tuple(tracker.previous(field) for field in self.tracked_fields)
+
+    def status_counter(self, status):
+        if not self.status_field:
+            return None
+        return self.status_counters.get(status)
+
+    def _apply(self, deltas):
+        for target_value, fields in deltas.items():
+            if target_value is None:
+                continue
+            apply_deltas(self.target, {self.target_field: target_value}, fields)
+
+    def after_save(self, sender, instance, created, *args, **kwargs):
+        current = self._current(instance)
+        deltas = defaultdict(lambda: defaultdict(int))
+        current_counter = self.status_counter(current[-1])
+        if created:
+            if self.created_counter:
+                deltas[current[0]][self.created_counter] += 1
+            if current_counter:
+                deltas[current[0]][current_counter] += 1
+        else:
+            previous = self._previous(instance)
+            if previous != current:
+                previous_counter = self.status_counter(previous[-1])
+                if previous_counter:
+                    deltas[previous[0]][previous_counter] -= 1
+                if current_counter:
+                    deltas[current[0]][current_counter] += 1
+        self._apply(deltas)
+
+    def after_delete(self, sender, instance, *args, **kwargs):
+        if not self.count_deletes:
+            return
+        state = self._previous(instance)
+        if state[0] is None:
+            state = self._current(instance)
+        counter = self.status_counter(state[-1])
+        if counter:
+            self._apply({state[0]: {counter: -1}})
+
+    def expected_counts(self, target_values):
+        """
+        Recount the counters for the given targets from the sender rows.
+
+        :returns: dict -- ``{target_value: {field: count}}``
+        """
+        expected = defaultdict(lambda: dict.fromkeys(self.counter_fields, 0))
+        group_by = [self.source_field]
+        if self.status_field:
+            group_by.append(self.status_field)
+        rows = (
+            self.sender.objects.filter(
+                **{"{}__in".format(self.source_field): target_values}
+            )
+            .order_by()
+            .values_list(*group_by)
+            .annotate(total=Count("pk"))
+        )
+        for row in rows:
+            target_value, total = row[0], row[-1]
+            if self.created_counter:
+                expected[target_value][self.created_counter] += total
+            counter = self.status_counter(row[1]) if self.status_field else None
+            if counter:
+                expected[target_value][counter] += total
+        return expected
+
+    def reconcile(self, batch_size=500):
+        """
+        Walk the targets in primary key batches and repair counters that drifted.
+        Counters that ignore deletes record history, so they are only ever raised to
+        the number of rows that still exist.
+
+        :returns: int -- The number of target rows repaired.
+        """
+        fields = self.counter_fields
+        key_fields = ["pk"] if self.target_field == "pk" else ["pk", self.target_field]
+        targets = self.target.objects.order_by("pk").values_list(*key_fields, *fields)
+        repaired = 0
+        last_pk = None
+        while True:
+            batch = targets if last_pk is None else targets.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            offset = len(key_fields)
+            expected = self.expected_counts([row[offset - 1] for row in batch])
+            for row in batch:
+                stored = dict(zip(fields, row[offset:]))
+                counts = expected.get(row[offset - 1], dict.fromkeys(fields, 0))
+                fixes = {}
+                for field in fields:
+                    if self.count_deletes and stored[field] != counts[field]:
+                        fixes[field] = counts[field]
+                    elif not self.count_deletes and stored[field] < counts[field]:
+                        fixes[field] = counts[field]
+                if fixes:
+                    logger.info(
+                        "Repairing counters {} for {} {}".format(
+                            fixes, self.target._meta.label, row[0]
+                        )
+                    )
+                    self.target.objects.filter(pk=row[0]).update(**fixes)
+                    fragments.bump(self.target, [row[0]])
+                    repaired += 1
+        return repaired
+
+
+def reconcile(batch_size=500):
+    """
+    Repair drift in every registered counter.
+
+    :returns: dict -- The number of rows repaired, keyed by counter.
+    """
+    return {repr(counter): counter.reconcile(batch_size) for counter in registry}
@@ -0,0 +1,159 @@
+"""
+Sparse fieldsets and opt-in expansions for the API.
+
+Clients can ask for a subset of a serializer's fields with ``?fields=slug,title`` and
+for related objects to be nested in full, rather than shown as a link or slug, with
+``?expand=gm``. Viewsets describe what each serializer field reads from the database
+in a ``query_plan``, and only the entries for the fields being serialized are applied
+to the queryset, so relations nobody asked for are neither loaded nor serialized.
+"""
+import logging
+
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger("api")
+
+FIELDS_QUERY_PARAM = "fields"
+EXPAND_QUERY_PARAM = "expand"
+
+
+def parse_field_list(values):
+    """
+    Split comma separated field names, which may be spread over repeated parameters.
+
+    :returns: list
+    """
+    names = []
+    for value in values:
+        names += [name.strip() for name in value.split(",") if name.strip()]
+    return names
+
+
+class Load:
+    """
+    What a serializer field reads from the database.
+
+    :param select_related: Relations to join.
+    :param prefetch_related: Relations to fetch in a separate query.
+    :param annotate: Names of queryset methods that add the annotations the field
+        reads.
+    """
+
+    def __init__(self, select_related=(), prefetch_related=(), annotate=()):
+        self.select_related = list(select_related)
+        self.prefetch_related = list(prefetch_related)
+        self.annotate = list(annotate)
+
+    def __repr__(self):
+        return "<Load select={} prefetch={} annotate={}>".format(
+            self.select_related, self.prefetch_related, self.annotate
+        )
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        for method in self.annotate:
+            queryset = getattr(queryset, method)()
+        return queryset
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Accepts ``fields`` and ``expand`` keyword arguments. Only the named fields are
+    kept, and the fields listed in ``Meta.expandable_fields`` are replaced by the
+    serializer they map to when expanded. Expandable fields map to the dotted path
+    of a serializer class, or to a tuple of the path and the keyword arguments to
+    instantiate it with, so serializers in other apps can be used without circular
+    imports.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        expand = kwargs.pop("expand", None) or []
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        for name in expand:
+            if name not in expandable or name not in self.fields:
+                continue
+            path, field_kwargs = expandable[name], {}
+            if not isinstance(path, str):
+                path, field_kwargs = path
+            self.fields[name] = import_string(path)(read_only=True, **field_kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewSetMixin:
+    """
+    Reads ``?fields=`` and ``?expand=`` for read requests, passes them on to the
+    serializer and prunes the queryset to match. ``query_plan`` maps serializer field
+    names to the :class:`Load` they need, and ``expanded_query_plan`` to what they need
+    on top of that when expanded. Write requests always use every field. Views that
+    apply the plan themselves, e.g. only to the rows missing from a cache, set
+    ``query_plan_deferred`` while filtering.
+    """
+
+    query_plan = {}
+    expanded_query_plan = {}
+    query_plan_deferred = False
+
+    def get_fieldset(self):
+        """
+        :returns: tuple -- The requested field names, or ``None`` for all of them, and
+            the names of the fields to expand.
+        """
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None, []
+        params = self.request.query_params
+        fields = None
+        if FIELDS_QUERY_PARAM in params:
+            fields = parse_field_list(params.getlist(FIELDS_QUERY_PARAM))
+        return fields, parse_field_list(params.getlist(EXPAND_QUERY_PARAM))
+
+    def get_fieldset_kwargs(self):
+        fields, expand = self.get_fieldset()
+        kwargs = {}
+        if fields is not None:
+            kwargs["fields"] = fields
+        if expand:
+            kwargs["expand"] = expand
+        return kwargs
+
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_fieldset_kwargs().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serialized_fields(self):
+        """
+        :returns: set -- The names of the fields the serializer will output.
+        """
+        fields = self.get_fieldset()[0]
+        names = getattr(self.get_serializer_class().Meta, "fields", None)
+        if not isinstance(names, (list, tuple)):
+            names = list(self.query_plan) + list(self.expanded_query_plan)
+        names = set(names)
+        if fields is not None:
+            names &= set(fields)
+        return names
+
+    def apply_query_plan(self, queryset):
+        names = self.get_serialized_fields()
+        expand = self.get_fieldset()[1]
+        for name, load in self.query_plan.items():
+            if name in names:
+                queryset = load.apply(queryset)
+        for name, load in self.expanded_query_plan.items():
+            if name in names and name in expand:
+                queryset = load.apply(queryset)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.query_plan_deferred:
+            return queryset
+        return self.apply_query_plan(queryset)
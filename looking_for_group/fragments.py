@@ -0,0 +1,262 @@
+"""
+Versioned cache of serialized API objects and rendered template fragments.
+
+Every cached object has a version, a random token kept in the cache that receivers
+replace whenever the object changes. The serialized form of an object, a fragment, is
+cached under a key made of the object's id and version, the versions of the objects it
+shows data from, the class of viewer, the serializer, the requested fields and the API
+version. List responses are assembled from fragments, so an edit only invalidates the
+fragments of the objects it touched while the rest of the page is still served from
+the cache, and only the objects that missed are loaded in full and serialized. Stale
+fragments are never read again and simply expire.
+
+Templates use the same versions through :func:`set_fragment_versions`, which gives
+each object a ``fragment_version`` to include in the key of a ``{% cache %}`` block.
+"""
+import hashlib
+import logging
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+logger = logging.getLogger("api")
+
+
+def get_cache():
+    return caches[getattr(settings, "API_FRAGMENT_CACHE_ALIAS", "default")]
+
+
+def get_timeout():
+    return getattr(settings, "API_FRAGMENT_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def version_key(model, pk):
+    return "api-fragment-version:{}:{}".format(model._meta.label_lower, pk)
+
+
+def get_versions(keys):
+    """
+    Fetch the versions stored under the given keys in one cache lookup, creating any
+    that are missing.
+
+    :returns: dict
+    """
+    cache = get_cache()
+    found = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return found
+
+
+def _bump(keys):
+    get_cache().set_many({key: uuid4().hex for key in keys}, timeout=None)
+
+
+def bump(model, pks):
+    """
+    Discard the cached fragments of the given objects once the current transaction
+    commits.
+    """
+    keys = [version_key(model, pk) for pk in set(pks) if pk]
+    if keys:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def bump_instance(instance):
+    bump(type(instance), [instance.pk])
+
+
+def get_dependency_keys(model, pks, dependencies=()):
+    """
+    :param dependencies: The paths of the foreign keys whose objects are shown with
+        each object, e.g. ``"parent_game_edition__game"``.
+    :returns: dict -- The version keys of each object and its dependencies, by pk.
+    """
+    keys = {pk: [version_key(model, pk)] for pk in pks}
+    if not dependencies or not keys:
+        return keys
+    related_models = []
+    for path in dependencies:
+        related_model = model
+        for name in path.split("__"):
+            related_model = related_model._meta.get_field(name).related_model
+        related_models.append(related_model)
+    rows = model._default_manager.filter(pk__in=list(keys)).values_list(
+        "pk", *dependencies
+    )
+    for pk, *related_pks in rows:
+        keys[pk] += [
+            version_key(related_model, related_pk)
+            for related_model, related_pk in zip(related_models, related_pks)
+            if related_pk is not None
+        ]
+    return keys
+
+
+def get_fragment_versions(model, pks, dependencies=()):
+    """
+    Combine the versions of each object and its dependencies, in one query and one
+    cache lookup for all of them.
+
+    :returns: dict -- A digest of the versions, by pk.
+    """
+    dependency_keys = get_dependency_keys(model, pks, dependencies)
+    versions = get_versions(
+        list({key for keys in dependency_keys.values() for key in keys})
+    )
+    return {
+        pk: hashlib.md5(
+            ":".join(versions[key] for key in keys).encode("utf-8")
+        ).hexdigest()
+        for pk, keys in dependency_keys.items()
+    }
+
+
+def set_fragment_versions(objs, dependencies=()):
+    """
+    Set ``fragment_version`` on each of the objects, for the keys of the template
+    fragments that show them.
+
+    :returns: list -- The objects.
+    """
+    objs = list(objs)
+    if objs:
+        versions = get_fragment_versions(
+            type(objs[0]), [obj.pk for obj in objs], dependencies
+        )
+        for obj in objs:
+            obj.fragment_version = versions[obj.pk]
+    return objs
+
+
+class CachedFragmentsMixin:
+    """
+    Serves ``list`` and ``retrieve`` from cached fragments for read requests.
+
+    ``fragment_dependencies`` lists the paths of the foreign keys whose objects a
+    fragment shows data from, e.g. ``"parent_game_edition__game"``, so that a change
+    to any of them invalidates it too. Views using a ``query_plan`` only apply it to
+    the objects that missed the cache.
+    """
+
+    fragment_dependencies = []
+
+    def get_viewer_class(self):
+        """
+        Distinguishes the viewers who get different data from the same serializer.
+        """
+        if self.request.user.is_authenticated:
+            return "authenticated"
+        return "anonymous"
+
+    def fragments_cacheable(self):
+        """
+        Expanded objects have no version of their own, so responses embedding them are
+        never cached.
+        """
+        if self.request.method not in SAFE_METHODS:
+            return False
+        if hasattr(self, "get_fieldset") and self.get_fieldset()[1]:
+            return False
+        return True
+
+    def get_fragment_context(self, serializer_class):
+        fields = None
+        if hasattr(self, "get_fieldset"):
+            fields = self.get_fieldset()[0]
+        context = [
+            serializer_class.__module__,
+            serializer_class.__qualname__,
+            self.get_viewer_class(),
+            str(self.request.version),
+            self.request.build_absolute_uri("/"),
+            ",".join(sorted(fields)) if fields is not None else "*",
+        ]
+        return hashlib.md5(":".join(context).encode("utf-8")).hexdigest()
+
+    def load_fragment_objects(self, pks):
+        """
+        Load the objects that missed the cache with everything their serializer reads.
+        """
+        queryset = self.get_queryset().filter(pk__in=pks)
+        if hasattr(self, "apply_query_plan"):
+            queryset = self.apply_query_plan(queryset)
+        return {obj.pk: obj for obj in queryset}
+
+    def serialize(self, objs, serializer_class, **kwargs):
+        if hasattr(self, "get_fieldset_kwargs"):
+            kwargs = {**self.get_fieldset_kwargs(), **kwargs}
+        return serializer_class(
+            objs, many=True, context=self.get_serializer_context(), **kwargs
+        ).data
+
+    def serialize_fragments(self, objs, serializer_class=None, loaded=False):
+        """
+        Serialize the objects, reusing cached fragments where their versions match.
+
+        :param serializer_class: Defaults to the view's serializer class.
+        :param loaded: Whether the objects were already loaded with everything their
+            serializer reads, rather than needing to be fetched again on a miss.
+        :returns: list
+        """
+        serializer_class = serializer_class or self.get_serializer_class()
+        objs = list(objs)
+        if not objs or not self.fragments_cacheable():
+            return self.serialize(objs, serializer_class)
+        versions = get_fragment_versions(
+            self.get_queryset().model,
+            [obj.pk for obj in objs],
+            self.fragment_dependencies,
+        )
+        context = self.get_fragment_context(serializer_class)
+        fragment_keys = {
+            obj.pk: "api-fragment:{}:{}:{}".format(obj.pk, context, versions[obj.pk])
+            for obj in objs
+        }
+        cache = get_cache()
+        fragments = cache.get_many(list(fragment_keys.values()))
+        missing = [obj for obj in objs if fragment_keys[obj.pk] not in fragments]
+        if missing:
+            logger.debug(
+                "Serializing {} of {} fragments".format(len(missing), len(objs))
+            )
+            if not loaded and hasattr(self, "apply_query_plan"):
+                reloaded = self.load_fragment_objects([obj.pk for obj in missing])
+                missing = [reloaded[obj.pk] for obj in missing if obj.pk in reloaded]
+            new_fragments = {
+                fragment_keys[obj.pk]: data
+                for obj, data in zip(missing, self.serialize(missing, serializer_class))
+            }
+            cache.set_many(new_fragments, timeout=get_timeout())
+            fragments.update(new_fragments)
+        return [
+            fragments[fragment_keys[obj.pk]]
+            for obj in objs
+            if fragment_keys[obj.pk] in fragments
+        ]
+
+    def list(self, request, *args, **kwargs):
+        if not self.fragments_cacheable():
+            return super().list(request, *args, **kwargs)
+        # The page only needs the rows; the plan is applied to the misses alone.
+        self.query_plan_deferred = True
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+        finally:
+            self.query_plan_deferred = False
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_fragments(page))
+        return Response(self.serialize_fragments(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.fragments_cacheable():
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        return Response(self.serialize_fragments([instance], loaded=True)[0])
@@ -6,8 +6,25 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets
 from rest_framework_extensions.mixins import NestedViewSetMixin
 
+from ..fragments import CachedFragmentsMixin
 from . import models, serializers
 
+# The objects whose names, links and tags are shown with editions and modules.
+edition_dependencies = [
+    "game",
+    "game_system",
+    "game_system__original_publisher",
+    "publisher",
+]
+module_dependencies = [
+    "publisher",
+    "parent_game_edition",
+    *[
+        "parent_game_edition__{}".format(dependency)
+        for dependency in edition_dependencies
+    ],
+]
+
 parent_lookup_game__slug = Parameter(
     name="parent_lookup_game__slug",
     in_="path",
@@ -59,7 +76,9 @@ parent_lookup_edition__slug = Parameter(
         operation_description="Fetch details of game publisher.",
     ),
 )
-class GamePublisherViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class GamePublisherViewSet(
+    CachedFragmentsMixin, NestedViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     List and detail views for `GamePublisher`.
     """
@@ -86,7 +105,9 @@ class GamePublisherViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
         operation_description="Fetch details of a game system.",
     ),
 )
-class GameSystemViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class GameSystemViewSet(
+    CachedFragmentsMixin, NestedViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Provides list and details for `GameSystem`.
     """
@@ -97,6 +118,7 @@ class GameSystemViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
     # filter_backends = ["publication_date"]
 
     serializer_class = serializers.GameSystemSerializer
+    fragment_dependencies = ["original_publisher"]
 
     queryset = (
         models.GameSystem.objects.all()
@@ -122,7 +144,9 @@ class GameSystemViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
         manual_parameters=[parent_lookup_game__slug],
     ),
 )
-class GameEditionViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class GameEditionViewSet(
+    CachedFragmentsMixin, NestedViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Provides list and detail view for `GameEdition`.
     """
@@ -132,6 +156,7 @@ class GameEditionViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["game_system", "publisher", "release_date", "game"]
     serializer_class = serializers.GameEditionSerializer
+    fragment_dependencies = edition_dependencies
 
     def get_queryset(self):
         return (
@@ -166,7 +191,9 @@ class GameEditionViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
         ],
     ),
 )
-class SourcebookViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class SourcebookViewSet(
+    CachedFragmentsMixin, NestedViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Provides list and detail view for `Sourcebook`.
     """
@@ -176,6 +203,7 @@ class SourcebookViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["edition", "corebook"]
     serializer_class = serializers.SourcebookSerializer
+    fragment_dependencies = ["publisher", "edition", "edition__game"]
 
     def get_queryset(self):
         return models.SourceBook.objects.filter(
@@ -198,7 +226,9 @@ class SourcebookViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
         operation_description="Fetch details of a published game.",
     ),
 )
-class PublishedGameViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class PublishedGameViewSet(
+    CachedFragmentsMixin, NestedViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Provides list and detail view for `PublishedGame`.
     """
@@ -235,7 +265,9 @@ class PublishedGameViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
         ],
     ),
 )
-class PublishedModuleViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
+class PublishedModuleViewSet(
+    CachedFragmentsMixin, NestedViewSetMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     Provides list and detail views for `PublishedModule`.
     """
@@ -251,6 +283,7 @@ class PublishedModuleViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
     ]
 
     serializer_class = serializers.PublishedModuleSerializer
+    fragment_dependencies = module_dependencies
 
     queryset = models.PublishedModule.objects.all().select_related(
         "publisher",
@@ -262,7 +295,7 @@ class PublishedModuleViewSet(NestedViewSetMixin, viewsets.ReadOnlyModelViewSet):
 
 @method_decorator(name="list", decorator=swagger_auto_schema(auto_schema=None))
 @method_decorator(name="retrieve", decorator=swagger_auto_schema(auto_schema=None))
-class WideGameEditionViewSet(viewsets.ReadOnlyModelViewSet):
+class WideGameEditionViewSet(CachedFragmentsMixin, viewsets.ReadOnlyModelViewSet):
     """
     Provides a non-nested list of editions
     """
@@ -270,12 +303,13 @@ class WideGameEditionViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["game", "game_system"]
     serializer_class = serializers.GameEditionSerializer
+    fragment_dependencies = edition_dependencies
     queryset = models.GameEdition.objects.all()
 
 
 @method_decorator(name="list", decorator=swagger_auto_schema(auto_schema=None))
 @method_decorator(name="retrieve", decorator=swagger_auto_schema(auto_schema=None))
-class WidePublishedModuleViewSet(viewsets.ReadOnlyModelViewSet):
+class WidePublishedModuleViewSet(CachedFragmentsMixin, viewsets.ReadOnlyModelViewSet):
     """
     Provides a non-nested list of modules
     """
@@ -287,4 +321,5 @@ class WidePublishedModuleViewSet(viewsets.ReadOnlyModelViewSet):
         "parent_game_edition__game_system",
     ]
     serializer_class = serializers.PublishedModuleSerializer
+    fragment_dependencies = module_dependencies
     queryset = models.PublishedModule.objects.all()
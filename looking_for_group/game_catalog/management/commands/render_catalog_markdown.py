@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...models import GameEdition, GameSystem, PublishedGame
+from ....rendering import render_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the markdown descriptions of the catalog in batches. Run this after "
+        "loading catalog fixtures, as fixture loads skip rendering."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in [GameSystem, PublishedGame, GameEdition]:
+            updated = render_queryset(
+                model.objects.all(),
+                "description",
+                "description_rendered",
+                batch_size=options["batch_size"],
+            )
+            self.stdout.write(
+                "Rendered {} {} descriptions".format(updated, model._meta.verbose_name)
+            )
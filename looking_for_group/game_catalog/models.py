@@ -11,6 +11,7 @@ from model_utils.models import TimeStampedModel
 from rules.contrib.models import RulesModel
 
 from . import rules
+from ..tracking import FieldTracker
 from .utils import AbstractTaggedLinkedModel, AbstractUUIDWithSlugModel
 
 # Create your models here.
@@ -101,6 +102,7 @@ class GameSystem(
     )
     collected_copies = GenericRelation("rpgcollections.Book")
     suggested_corrections = GenericRelation("game_catalog.SuggestedCorrection")
+    tracker = FieldTracker(fields=["description"])
 
     def __str__(self):
         return self.name  # pragma: no cover
@@ -153,6 +155,7 @@ class PublishedGame(
         null=True, blank=True, help_text=_("Release/publication date of game.")
     )
     suggested_corrections = GenericRelation("game_catalog.SuggestedCorrection")
+    tracker = FieldTracker(fields=["description"])
 
     def __str__(self):
         return self.title  # pragma: no cover
@@ -220,6 +223,7 @@ class GameEdition(
         null=True, blank=True, help_text=_("When was this released?")
     )
     suggested_corrections = GenericRelation("game_catalog.SuggestedCorrection")
+    tracker = FieldTracker(fields=["description"])
 
     def __repr__(self):
         return self.__str__()
@@ -447,6 +451,7 @@ class SuggestedCorrection(TimeStampedModel, AbstractUUIDWithSlugModel, RulesMode
             "Any other details or suggestions we should incorporate into the correction."
         ),
     )
+    tracker = FieldTracker(fields=["submitter", "status"])
 
     @property
     def title(self):
@@ -575,6 +580,7 @@ class SuggestedAddition(TimeStampedModel, AbstractUUIDWithSlugModel, RulesModel)
         blank=True,
         help_text=_("Comma seperated list of suggested tags"),
     )
+    tracker = FieldTracker(fields=["submitter", "status"])
 
     def __str__(self):
         return "Suggested {}: {}".format(self.content_type, self.title)
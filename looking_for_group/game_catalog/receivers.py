@@ -2,14 +2,17 @@ import logging
 
 from django.contrib.auth.models import Group
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import F
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
-from markdown import markdown
 from notifications.signals import notify
 
 from . import models
+from .. import fragments
+from ..counters import StatusTransitionCounter
+from ..gamer_profiles.models import GamerProfile
+from ..rendering import render_field
+from .utils import UUIDTaggedItem
 
 logger = logging.getLogger("catalog")
 
@@ -17,133 +20,81 @@ logger = logging.getLogger("catalog")
 @receiver(pre_save, sender=models.PublishedGame)
 @receiver(pre_save, sender=models.GameEdition)
 @receiver(pre_save, sender=models.GameSystem)
-def render_markdown_body(sender, instance, *args, **kwargs):
-    if instance.description:
-        instance.description_rendered = markdown(instance.description)
-    else:
-        instance.description_rendered = None
+def render_markdown_body(sender, instance, raw=False, *args, **kwargs):
+    if raw:
+        return  # Fixture loads are rendered in bulk with render_catalog_markdown.
+    if not instance.tracker.has_changed("description") and (
+        instance.description_rendered or not instance.description
+    ):
+        return  # Nothing new to render.
+    render_field(instance, "description", "description_rendered")
+
+
+correction_counter = StatusTransitionCounter(
+    models.SuggestedCorrection,
+    GamerProfile,
+    "submitter",
+    target_field="user_id",
+    status_field="status",
+    status_counters={
+        "approved": "submitted_corrections_approved",
+        "rejected": "submitted_corrections_rejected",
+    },
+    created_counter="submitted_corrections",
+    count_deletes=False,
+).connect()
+
+addition_counter = StatusTransitionCounter(
+    models.SuggestedAddition,
+    GamerProfile,
+    "submitter",
+    target_field="user_id",
+    status_field="status",
+    status_counters={
+        "approved": "submitted_additions_approved",
+        "rejected": "submitted_additions_rejected",
+    },
+    created_counter="submitted_additions",
+    count_deletes=False,
+).connect()
 
 
 @receiver(pre_save, sender=models.SuggestedCorrection)
-def check_for_correction_stat_increments(sender, instance, *args, **kwargs):
+def notify_on_correction_review(sender, instance, *args, **kwargs):
     """
-    Check to see if we should increment the profile stats based on
-    acceptance/rejection.
+    Let the submitter know when their correction is approved or rejected. The profile
+    stats are kept up to date by ``correction_counter``.
     """
-    try:
-        logger.debug("Checking to see if there is an older version of this object.")
-        old_version = models.SuggestedCorrection.objects.get(id=instance.pk)
-        logger.debug("Checking previous status of object.")
-        if old_version.status != instance.status:
-            logger.debug("Statuses do not match. Evaluating...")
-            if old_version.status == "new":
-                logger.debug("Status has changed from [new]...")
-                if instance.status == "approved":
-                    logger.debug(
-                        "Status has changed from new to approved. Incrementing approved count."
-                    )
-                    instance.submitter.gamerprofile.submitted_corrections_approved = (
-                        F("submitted_corrections_approved") + 1
-                    )
-
-                else:
-                    logger.debug(
-                        "Status has changed from new to rejected. Incrementing rejected count."
-                    )
-                    instance.submitter.gamerprofile.submitted_corrections_rejected = (
-                        F("submitted_corrections_rejected") + 1
-                    )
-            elif old_version.status == "approved":
-                logger.debug(
-                    "Old status was [approved]. Decrementing approved count and evaluating..."
-                )
-                instance.submitter.gamerprofile.submitted_corrections_approved = (
-                    F("submitted_corrections_approved") - 1
-                )
-                if instance.status == "rejected":
-                    logger.debug(
-                        "status changed from approved to rejected. Incrementing rejected count."
-                    )
-                    instance.submitter.gamerprofile.submitted_corrections_rejected = (
-                        F("submitted_corrections_rejected") + 1
-                    )
-            else:
-                logger.debug(
-                    "Status was [rejected]. Decrementing rejected count and evaluating..."
-                )
-                instance.submitter.gamerprofile.submitted_corrections_rejected = (
-                    F("submitted_corrections_rejected") - 1
-                )
-                if instance.status == "approved":
-                    logger.debug(
-                        "Status was changed from rejected to approved. Incrementing approval count."
-                    )
-                    instance.submitter.gamerprofile.submitted_corrections_approved = (
-                        F("submitted_corrections_approved") + 1
-                    )
-            logger.debug("Count changes complete. Saving gamer profile.")
-            instance.submitter.gamerprofile.save()
-            logger.debug("Refreshing gamerprofile from db...")
-            instance.submitter.gamerprofile.refresh_from_db()
-            logger.debug(
-                "New counts are CORRECTIONS [{}], APPROVALS [{}], REJECTIONS [{}]".format(
-                    instance.submitter.gamerprofile.submitted_corrections,
-                    instance.submitter.gamerprofile.submitted_corrections_approved,
-                    instance.submitter.gamerprofile.submitted_corrections_rejected,
-                )
-            )
-            if instance.status == "approved":
-                logger.debug(
-                    "Since instance was approved, sending notification to submitter."
-                )
-                notify.send(
-                    instance.reviewer,
-                    recipient=instance.submitter,
-                    verb=_(
-                        "has approved your suggested correction for {}".format(
-                            instance.title
-                        )
-                    ),
-                )
-            if instance.status == "rejected":
-                logger.debug(
-                    "Since instance was rejected, sending notification to submitter."
-                )
-                notify.send(
-                    instance.reviewer,
-                    recipient=instance.submitter,
-                    verb=_(
-                        "rejected your suggested correction for {}".format(
-                            instance.title
-                        )
-                    ),
-                )
-        else:
-            logger.debug("Statuses are the same. Ignoring.")
-    except ObjectDoesNotExist:
+    if instance._state.adding:
         logger.debug("No previous version of object to compare with...")
-        pass  # This is a new correction. We'll let the post_save handler deal with it.
+        return  # This is a new correction. We'll let the post_save handler deal with it.
+    if not instance.tracker.has_changed("status"):
+        logger.debug("Statuses are the same. Ignoring.")
+        return
+    if instance.status == "approved":
+        logger.debug("Since instance was approved, sending notification to submitter.")
+        notify.send(
+            instance.reviewer,
+            recipient=instance.submitter,
+            verb=_(
+                "has approved your suggested correction for {}".format(instance.title)
+            ),
+        )
+    if instance.status == "rejected":
+        logger.debug("Since instance was rejected, sending notification to submitter.")
+        notify.send(
+            instance.reviewer,
+            recipient=instance.submitter,
+            verb=_("rejected your suggested correction for {}".format(instance.title)),
+        )
 
 
 @receiver(post_save, sender=models.SuggestedCorrection)
-def check_to_increment_correction_stats(sender, instance, created, *args, **kwargs):
+def notify_editors_of_new_correction(sender, instance, created, *args, **kwargs):
     """
-    If created, increment the submitted count and then notify the rpgeditors.
+    If created, notify the rpgeditors.
     """
     if created:
-        logger.debug(
-            "This is a new correction object. Incrementing submission count..."
-        )
-        instance.submitter.gamerprofile.submitted_corrections = (
-            F("submitted_corrections") + 1
-        )
-        instance.submitter.gamerprofile.save()
-        instance.submitter.gamerprofile.refresh_from_db()
-        logger.debug(
-            "Total submissions is now equal to {}".format(
-                instance.submitter.gamerprofile.submitted_corrections
-            )
-        )
         try:
             logger.debug("Checking to see if editors exist...")
             editorgroup = Group.objects.get(name="rpgeditors")
@@ -160,73 +111,33 @@ def check_to_increment_correction_stats(sender, instance, created, *args, **kwar
 
 
 @receiver(pre_save, sender=models.SuggestedAddition)
-def check_for_addition_stat_increments(sender, instance, *args, **kwargs):
+def notify_on_addition_review(sender, instance, *args, **kwargs):
     """
-    Check to see if we should increment the profile stats based on
-    acceptance/rejection.
+    Let the submitter know when their addition is approved or rejected. The profile
+    stats are kept up to date by ``addition_counter``.
     """
-    try:
-        old_version = models.SuggestedAddition.objects.get(id=instance.pk)
-        if old_version.status != instance.status:
-            if old_version.status == "new":
-                if instance.status == "approved":
-                    instance.submitter.gamerprofile.submitted_additions_approved = (
-                        F("submitted_additions_approved") + 1
-                    )
-
-                else:
-                    instance.submitter.gamerprofile.submitted_additions_rejected = (
-                        F("submitted_additions_rejected") + 1
-                    )
-            elif old_version.status == "approved":
-                instance.submitter.gamerprofile.submitted_additions_approved = (
-                    F("submitted_additions_approved") - 1
-                )
-                if instance.status == "rejected":
-                    instance.submitter.gamerprofile.submitted_additions_rejected = (
-                        F("submitted_additions_rejected") + 1
-                    )
-            else:
-                instance.submitter.gamerprofile.submitted_additions_rejected = (
-                    F("submitted_additions_rejected") - 1
-                )
-                if instance.status == "approved":
-                    instance.submitter.gamerprofile.submitted_additions_approved = (
-                        F("submitted_additions_approved") + 1
-                    )
-            instance.submitter.gamerprofile.save()
-            if instance.status == "approved":
-                notify.send(
-                    instance.reviewer,
-                    recipient=instance.submitter,
-                    verb=_(
-                        "has approved your suggested addition of {}".format(
-                            instance.title
-                        )
-                    ),
-                )
-            if instance.status == "rejected":
-                notify.send(
-                    instance.reviewer,
-                    recipient=instance.submitter,
-                    verb=_(
-                        "rejected your suggested addition of {}".format(instance.title)
-                    ),
-                )
-    except ObjectDoesNotExist:
-        pass  # This is a new addition. We'll let the post_save handler deal with it.
+    if instance._state.adding or not instance.tracker.has_changed("status"):
+        return  # This is a new addition. We'll let the post_save handler deal with it.
+    if instance.status == "approved":
+        notify.send(
+            instance.reviewer,
+            recipient=instance.submitter,
+            verb=_("has approved your suggested addition of {}".format(instance.title)),
+        )
+    if instance.status == "rejected":
+        notify.send(
+            instance.reviewer,
+            recipient=instance.submitter,
+            verb=_("rejected your suggested addition of {}".format(instance.title)),
+        )
 
 
 @receiver(post_save, sender=models.SuggestedAddition)
-def check_to_increment_addition_stats(sender, instance, created, *args, **kwargs):
+def notify_editors_of_new_addition(sender, instance, created, *args, **kwargs):
     """
-    If created, increment the submitted count and then notify the rpgeditors.
+    If created, notify the rpgeditors.
     """
     if created:
-        instance.submitter.gamerprofile.submitted_additions = (
-            F("submitted_additions") + 1
-        )
-        instance.submitter.gamerprofile.save()
         try:
             editorgroup = Group.objects.get(name="rpgeditors")
             for user in editorgroup.user_set.all():
@@ -238,3 +149,29 @@ def check_to_increment_addition_stats(sender, instance, created, *args, **kwargs
                 )
         except ObjectDoesNotExist:
             pass  # No one to notify
+
+
+@receiver(post_save, sender=models.GamePublisher)
+@receiver(post_delete, sender=models.GamePublisher)
+@receiver(post_save, sender=models.GameSystem)
+@receiver(post_delete, sender=models.GameSystem)
+@receiver(post_save, sender=models.PublishedGame)
+@receiver(post_delete, sender=models.PublishedGame)
+@receiver(post_save, sender=models.GameEdition)
+@receiver(post_delete, sender=models.GameEdition)
+@receiver(post_save, sender=models.SourceBook)
+@receiver(post_delete, sender=models.SourceBook)
+@receiver(post_save, sender=models.PublishedModule)
+@receiver(post_delete, sender=models.PublishedModule)
+def bump_fragments_on_catalog_change(sender, instance, *args, **kwargs):
+    fragments.bump_instance(instance)
+
+
+@receiver(m2m_changed, sender=UUIDTaggedItem)
+def bump_fragments_on_tags_change(sender, instance, action, *args, **kwargs):
+    """
+    Entries inherit the tags of their parents, which are among the fragment
+    dependencies, so only the tagged entry is bumped.
+    """
+    if action in ("post_add", "post_remove", "post_clear"):
+        fragments.bump_instance(instance)
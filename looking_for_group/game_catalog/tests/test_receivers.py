@@ -1,8 +1,12 @@
+from io import StringIO
+
 import pytest
 from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
 from notifications.models import Notification
 
 from .. import models
+from ...rendering import default_renderer
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -468,3 +472,33 @@ def test_addition_rejected_to_approved(catalog_testdata, testing_catalog_ct):
         - previous_user_notifications
         == 1
     )
+
+
+def test_description_rendered_on_save(catalog_testdata):
+    catalog_testdata.cypher.description = "A **system**"
+    catalog_testdata.cypher.save()
+    assert catalog_testdata.cypher.description_rendered == default_renderer.convert(
+        "A **system**"
+    )
+
+
+def test_render_catalog_markdown_command(catalog_testdata):
+    models.GameSystem.objects.filter(pk=catalog_testdata.cypher.pk).update(
+        description="A **system**", description_rendered=None
+    )
+    out = StringIO()
+    call_command("render_catalog_markdown", stdout=out)
+    catalog_testdata.cypher.refresh_from_db()
+    assert catalog_testdata.cypher.description_rendered == (
+        "<p>A <strong>system</strong></p>"
+    )
+    assert "Rendered 1 Game System descriptions" in out.getvalue()
+
+
+def test_render_many_keeps_order():
+    assert default_renderer.render_many(["*b*", "", "a", "*b*"]) == [
+        "<p><em>b</em></p>",
+        None,
+        "<p>a</p>",
+        "<p><em>b</em></p>",
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.4 on 2020-03-29 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamer_profiles', '0027_gamerprofile_games_kicked'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='communitymembership',
+            name='comm_game_attendance_record',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Attendance percentage for sessions within community.', max_digits=5, null=True),
+        ),
+        migrations.AlterField(
+            model_name='gamerprofile',
+            name='attendance_record',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Overall attendance record for games sessions.', max_digits=5, null=True),
+        ),
+    ]
@@ -533,7 +533,7 @@ class GamerProfile(TimeStampedModel, AbstractUUIDModel, RulesModel):
     attendance_record = models.DecimalField(
         null=True,
         decimal_places=4,
-        max_digits=4,
+        max_digits=5,
         blank=True,
         help_text=_("Overall attendance record for games sessions."),
     )
@@ -727,7 +727,7 @@ class CommunityMembership(TimeStampedModel, AbstractUUIDModel, RulesModel):
         null=True,
         blank=True,
         decimal_places=4,
-        max_digits=4,
+        max_digits=5,
         help_text=_("Attendance percentage for sessions within community."),
     )
     game_notifications = models.BooleanField(
@@ -1,16 +1,17 @@
 import logging
 
-import bleach
-from bleach_whitelist.bleach_whitelist import markdown_attrs, markdown_tags
-from django.db.models.signals import post_save, pre_save
+from avatar.models import Avatar
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from markdown import markdown
+from keybase_proofs.models import KeybaseProof
 from notifications.signals import notify
 
 from . import models
+from .. import fragments
 from ..discord.models import CommunityDiscordLink
 from ..invites.models import Invite
 from ..invites.signals import invite_accepted
+from ..rendering import render_field, sanitized_renderer
 from ..users.models import User
 
 logger = logging.getLogger("gamer_profiles")
@@ -42,10 +43,8 @@ def generate_rendered_html_from_description(sender, instance, *args, **kwargs):
         logger.debug(
             "Found description for {}, rendering with markdown".format(instance.name)
         )
-        instance.description_rendered = bleach.clean(
-            markdown(instance.description, output_format="html5"),
-            markdown_tags,
-            markdown_attrs,
+        render_field(
+            instance, "description", "description_rendered", sanitized_renderer
         )
     if instance.id and not instance.description:
         logger.debug(
@@ -63,11 +62,7 @@ def generate_rendered_note_body(sender, instance, *args, **kwargs):
     """
     if instance.body:
         logger.debug("Rendering markdown for note titled {}".format(instance.title))
-        instance.body_rendered = bleach.clean(
-            markdown(instance.body, output_format="html5"),
-            markdown_tags,
-            markdown_attrs,
-        )
+        render_field(instance, "body", "body_rendered", sanitized_renderer)
 
 
 @receiver(post_save, sender=User)
@@ -135,3 +130,90 @@ def process_accepted_invite(sender, invite, acceptor, *args, **kwargs):
             logger.debug("Gamer {} was added to community {}".format(acceptor.gamerprofile, invite.content_object.name))
         except models.AlreadyInCommunity:
             logger.debug("Gamer {} was already a member of {}. Moving on...".format(acceptor.gamerprofile, invite.content_object.name))
+
+
+def bump_gamer_fragments(gamer_ids):
+    """
+    Gamers are also shown in the member lists of their communities.
+    """
+    fragments.bump(models.GamerProfile, gamer_ids)
+    fragments.bump(
+        models.GamerCommunity,
+        models.CommunityMembership.objects.filter(gamer_id__in=gamer_ids).values_list(
+            "community_id", flat=True
+        ),
+    )
+
+
+@receiver(post_save, sender=models.GamerProfile)
+@receiver(pre_delete, sender=models.GamerProfile)
+def bump_fragments_on_profile_change(sender, instance, *args, **kwargs):
+    bump_gamer_fragments([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def bump_fragments_on_user_change(
+    sender, instance, update_fields=None, *args, **kwargs
+):
+    """
+    Member lists show details of the user such as their timezone, so their gamer
+    profile and communities are bumped too, except for the save on every login.
+    """
+    fragments.bump_instance(instance)
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    bump_gamer_fragments(
+        models.GamerProfile.objects.filter(user_id=instance.pk).values_list(
+            "pk", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=KeybaseProof)
+@receiver(post_delete, sender=KeybaseProof)
+def bump_fragments_on_proof_change(sender, instance, *args, **kwargs):
+    """
+    Profiles show the verified proofs of their user.
+    """
+    fragments.bump(User, [instance.user_id])
+
+
+@receiver(post_save, sender=Avatar)
+@receiver(post_delete, sender=Avatar)
+def bump_fragments_on_avatar_change(sender, instance, *args, **kwargs):
+    fragments.bump(User, [instance.user_id])
+    bump_gamer_fragments(
+        models.GamerProfile.objects.filter(user_id=instance.user_id).values_list(
+            "pk", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=models.GamerCommunity)
+@receiver(post_delete, sender=models.GamerCommunity)
+def bump_fragments_on_community_change(sender, instance, *args, **kwargs):
+    fragments.bump_instance(instance)
+
+
+@receiver(post_save, sender=models.CommunityMembership)
+@receiver(post_delete, sender=models.CommunityMembership)
+def bump_fragments_on_membership_change(sender, instance, *args, **kwargs):
+    fragments.bump(models.GamerProfile, [instance.gamer_id])
+    fragments.bump(models.GamerCommunity, [instance.community_id])
+
+
+@receiver(m2m_changed, sender=models.GamerProfile.preferred_games.through)
+@receiver(m2m_changed, sender=models.GamerProfile.preferred_systems.through)
+def bump_fragments_on_preferences_change(
+    sender, instance, action, reverse, pk_set, *args, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        fragments.bump_instance(instance)
+    elif action == "pre_clear":
+        fragments.bump(
+            models.GamerProfile, instance.gamerprofile_set.values_list("pk", flat=True)
+        )
+    else:
+        fragments.bump(models.GamerProfile, pk_set)
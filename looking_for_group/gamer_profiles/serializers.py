@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from ..fieldsets import SparseFieldsetSerializerMixin
 from ..game_catalog.serializers import APIURLMixin
 from ..games.models import GamePosting, Player
 from ..games.serializers import GameDataSerializer
@@ -38,7 +39,9 @@ class GamerCommunitySerializer(serializers.ModelSerializer):
         )
 
 
-class GamerProfileListSerializer(serializers.ModelSerializer):
+class GamerProfileListSerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for list views of gamer profile, and so that less private data is displayed
     """
@@ -63,7 +66,9 @@ class GamerProfileListSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class GamerProfileSerializer(APIURLMixin, serializers.HyperlinkedModelSerializer):
+class GamerProfileSerializer(
+    SparseFieldsetSerializerMixin, APIURLMixin, serializers.HyperlinkedModelSerializer
+):
     """
     Serializer for GamerProfile objects.
     """
@@ -121,6 +126,12 @@ class GamerProfileSerializer(APIURLMixin, serializers.HyperlinkedModelSerializer
             "player_game_list",
             "reputation_score",
         )
+        expandable_fields = {
+            "communities": (
+                "looking_for_group.gamer_profiles.serializers.GamerCommunitySerializer",
+                {"many": True},
+            ),
+        }
         extra_kwargs = {
             "api_url": {"view_name": "api-profile-detail", "lookup_field": "username"}
         }
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..maintenance import PKRangeSweep
+from . import models
+
+
+def clean_expired_kicks():
+    """
+    Delete kick records whose suspension ended longer ago than the configured
+    retention period. Recently expired kicks are kept for the community's kick
+    history.
+
+    :returns: dict -- The sweep result.
+    """
+    retention = timedelta(days=getattr(settings, "KICKED_USER_RETENTION_DAYS", 365))
+    return PKRangeSweep(
+        "expired kicks",
+        models.KickedUser.objects.filter(end_date__lt=timezone.now() - retention),
+    ).run()
@@ -11,6 +11,9 @@ from django.utils.translation import ugettext_lazy as _
 from schedule.models import Calendar
 
 from .. import models
+from ...fragments import set_fragment_versions
+from ...games.models import GameEvent, MaterializedOccurrence
+from ..views.social_views import profile_fragment_dependencies
 
 register = Library()
 
@@ -52,6 +55,31 @@ def community_role_flag(context, community):
             )
 
 
+@register.simple_tag()
+def get_profile_fragment_version(gamer):
+    """
+    The version of a profile and the objects shown with it, for the keys of the
+    template fragments that show it.
+    """
+    if getattr(gamer, "fragment_version", None) is None:
+        set_fragment_versions([gamer], profile_fragment_dependencies)
+    return gamer.fragment_version
+
+
+@register.simple_tag(takes_context=True)
+def get_profile_relationship(context, gamer):
+    """
+    How the current user relates to a gamer, for the keys of the template fragments
+    that show different details to each.
+    """
+    user = context["request"].user
+    if user.is_authenticated and user == gamer.user:
+        return "self"
+    if user.has_perm("profile.view_detail", gamer):
+        return "connected"
+    return "stranger"
+
+
 @register.simple_tag(takes_context=True)
 def get_membership(context, gamer):
     try:
@@ -82,7 +110,7 @@ def get_conflicts(gamer, game, user_timezone=pytz.timezone('UTC')):
     end_recur_future_q = Q(rule__isnull=False, end_recurring_period__gt=timezone.now())
     one_shot_q = Q(rule__isnull=True, start__gt=timezone.now())
     cal, created = Calendar.objects.get_or_create(slug=gamer.username, defaults={"name": "{}'s calendar".format(gamer.username)})
-    cal_events = cal.events.filter(end_recur_future_q | end_recur_empty_q | one_shot_q)
+    cal_events = GameEvent.objects.for_calendar(cal).filter(end_recur_future_q | end_recur_empty_q | one_shot_q)
     player_result = {
         "Monday": [],
         "Tuesday": [],
@@ -93,13 +121,13 @@ def get_conflicts(gamer, game, user_timezone=pytz.timezone('UTC')):
         "Sunday": [],
     }
     if game.event:
-        cal_events = cal_events.exclude(id__in=[e.id for e in game.event.get_child_events()])
+        cal_events = cal_events.exclude(id__in=[e.id for e in game.event.get_child_events()]).exclude(id=game.event_id)
     if cal_events.count() == 0:
         return player_result
     else:
         occ = None
         for event in cal_events:
-            occ_future = event.occurrences_after()
+            occ_future = MaterializedOccurrence.objects.occurrences_after(event)
             try:
                 occ = next(occ_future)
                 while occ.cancelled:
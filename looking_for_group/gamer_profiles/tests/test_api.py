@@ -1251,3 +1251,22 @@ def test_retrieve_destroy_block_mute(
                 type(target_object).objects.get(pk=target_object.pk)
         else:
             assert type(target_object).objects.get(pk=target_object.pk)
+
+
+def test_profile_sparse_fieldsets_and_expansions(apiclient, social_testdata):
+    apiclient.force_login(social_testdata.gamer1.user)
+    response = apiclient.get(
+        reverse("api-profile-list", kwargs={"format": "json"}), {"fields": "user"}
+    )
+    assert response.status_code == 200
+    assert all(set(profile) == {"user"} for profile in response.data["results"])
+    url = reverse(
+        "api-profile-detail",
+        kwargs={"format": "json", "username": social_testdata.gamer1.username},
+    )
+    response = apiclient.get(url, {"fields": "communities", "expand": "communities"})
+    assert response.status_code == 200
+    assert set(response.data) == {"communities"}
+    assert {community["slug"] for community in response.data["communities"]} == {
+        community.slug for community in social_testdata.gamer1.communities.all()
+    }
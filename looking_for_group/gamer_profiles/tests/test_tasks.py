@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from .. import tasks
+from ..models import KickedUser
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_clean_expired_kicks(settings, social_testdata):
+    settings.KICKED_USER_RETENTION_DAYS = 30
+    settings.MAINTENANCE_BATCH_SIZE = 1
+    community = social_testdata.community
+    for end_date in [
+        None,
+        timezone.now() + timedelta(days=5),
+        timezone.now() - timedelta(days=5),
+        timezone.now() - timedelta(days=45),
+        timezone.now() - timedelta(days=90),
+    ]:
+        KickedUser.objects.create(
+            community=community,
+            kicker=social_testdata.gamer2,
+            kicked_user=social_testdata.gamer1,
+            reason="Spam",
+            end_date=end_date,
+        )
+    result = tasks.clean_expired_kicks()
+    assert result["rows"] == 2
+    assert result["batches"] == 2
+    assert KickedUser.objects.count() == 3
+    assert not KickedUser.objects.filter(
+        end_date__lt=timezone.now() - timedelta(days=30)
+    ).exists()
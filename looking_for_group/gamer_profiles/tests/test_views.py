@@ -5,6 +5,7 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
 from django.utils import timezone
 
+from ... import fragments
 from ...invites.models import Invite
 from .. import models
 from . import factories
@@ -129,6 +130,42 @@ def test_comm_List_view(
         assert expected_not_text not in response.content
 
 
+def test_community_list_rows_vary_on_viewer_role(client, settings, social_testdata):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "template-fragments",
+        }
+    }
+    join_url = reverse(
+        "gamer_profiles:community-join",
+        kwargs={"community": social_testdata.community_public.slug},
+    ).encode()
+    client.force_login(social_testdata.gamer1.user)
+    assert join_url not in client.get(reverse("gamer_profiles:community-list")).content
+    client.force_login(social_testdata.gamer2.user)
+    assert join_url in client.get(reverse("gamer_profiles:community-list")).content
+    social_testdata.community_public.add_member(social_testdata.gamer2)
+    assert join_url not in client.get(reverse("gamer_profiles:community-list")).content
+
+
+def test_community_member_rows_vary_on_user_change(settings, social_testdata):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "template-fragments",
+        }
+    }
+    key = fragments.version_key(models.GamerCommunity, social_testdata.community1.pk)
+    version = fragments.get_versions([key])[key]
+    user = social_testdata.blocked_gamer.user
+    user.save(update_fields=["last_login"])
+    assert fragments.get_versions([key])[key] == version
+    user.timezone = "Europe/Paris"
+    user.save()
+    assert fragments.get_versions([key])[key] != version
+
+
 @pytest.mark.parametrize(
     "gamer_to_use, expected_count", [("gamer1", 3), ("gamer2", 1), ("gamer3", 1)]
 )
@@ -15,7 +15,10 @@ from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework_extensions.mixins import DetailSerializerMixin, NestedViewSetMixin
 
+from looking_for_group.fieldsets import Load, SparseFieldsetViewSetMixin
+from looking_for_group.fragments import CachedFragmentsMixin
 from looking_for_group.mixins import AutoPermissionViewSetMixin, ParentObjectAutoPermissionViewSetMixin
+from looking_for_group.pagination import KeysetPagination
 
 from .. import models, serializers
 from ..models import AlreadyInCommunity, CurrentlySuspended, NotInCommunity
@@ -182,6 +185,7 @@ class GamerCommunityViewSet(
     permission_classes = (permissions.IsAuthenticated,)
     queryset = models.GamerCommunity.objects.all()
     serializer_class = serializers.GamerCommunitySerializer
+    pagination_class = KeysetPagination
     lookup_field = "slug"
     lookup_url_kwarg = "slug"
     permission_type_map = {
@@ -768,6 +772,8 @@ class CommunityMembershipViewSet(
 )
 class GamerProfileViewSet(
     AutoPermissionViewSetMixin,
+    CachedFragmentsMixin,
+    SparseFieldsetViewSetMixin,
     DetailSerializerMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -792,6 +798,17 @@ class GamerProfileViewSet(
         "local_games",
         "adult_themes",
     )
+    ordering = ["username"]
+    pagination_class = KeysetPagination
+    query_plan = {
+        "user": Load(select_related=["user"]),
+        "timezone": Load(select_related=["user"]),
+        "communities": Load(prefetch_related=["communities"]),
+        "gmed_games": Load(prefetch_related=["gmed_games"]),
+        "preferred_games": Load(prefetch_related=["preferred_games"]),
+        "preferred_systems": Load(prefetch_related=["preferred_systems"]),
+    }
+    fragment_dependencies = ["user"]
     lookup_field = "username"
     lookup_url_kwarg = "username"
     permission_type_map = {
@@ -807,7 +824,9 @@ class GamerProfileViewSet(
         return qs
 
     def retrieve(self, request, *args, **kwargs):
-        gamer = get_object_or_404(models.GamerProfile, username=self.kwargs["username"])
+        gamer = get_object_or_404(
+            self.apply_query_plan(self.get_queryset()), username=self.kwargs["username"]
+        )
         if request.user.gamerprofile.blocked_by(gamer):
             return Response(
                 data={
@@ -820,7 +839,9 @@ class GamerProfileViewSet(
         ):
             self.serializer_detail_class = serializers.GamerProfileListSerializer
         return Response(
-            data=self.serializer_detail_class(gamer, context={"request": request}).data,
+            data=self.serialize_fragments(
+                [gamer], serializer_class=self.serializer_detail_class, loaded=True
+            )[0],
             status=status.HTTP_200_OK,
         )
 
@@ -29,7 +29,9 @@ from rest_framework.renderers import JSONRenderer
 from rules.contrib.views import PermissionRequiredMixin
 from schedule.models import Event, Rule
 
-from ...games.models import AvailableCalendar
+from ...fragments import set_fragment_versions
+from ...games.models import AvailableCalendar, WeeklyAvailability
+from ...games.views import game_fragment_dependencies
 from ...locations.forms import CityLocationForm
 from ...locations.models import Location
 from .. import models, serializers
@@ -44,6 +46,10 @@ from ..forms import (
 
 logger = logging.getLogger("gamer_profiles")
 
+# The objects shown with a community or profile in their cached fragments.
+community_fragment_dependencies = ["owner", "owner__user"]
+profile_fragment_dependencies = ["user", "city"]
+
 
 class ModelFormWithSwitcViewhMixin(object):
     """
@@ -93,6 +99,27 @@ class CommunityListView(generic.ListView):
     paginate_by = 25
     ordering = ["-member_count", "name"]
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["object_list"] = set_fragment_versions(
+            context["object_list"], community_fragment_dependencies
+        )
+        # The role and game count shown in each row depend on the viewer's membership.
+        roles = {}
+        if self.request.user.is_authenticated:
+            roles = dict(
+                models.CommunityMembership.objects.filter(
+                    gamer=self.request.user.gamerprofile,
+                    community__in=context["object_list"],
+                ).values_list("community_id", "community_role")
+            )
+        for community in context["object_list"]:
+            if not self.request.user.is_authenticated:
+                community.viewer_relationship = "anonymous"
+            else:
+                community.viewer_relationship = roles.get(community.pk, "stranger")
+        return context
+
 
 class MyCommunitiesListView(LoginRequiredMixin, SelectRelatedMixin, generic.ListView):
     """
@@ -430,9 +457,13 @@ class CommunityDetailView(
             ].discord.servers.all()
         else:
             context["linked_discord_servers"] = None
-        context["active_games"] = context["community"].gameposting_set.exclude(
-            status__in=["closed", "cancel"]
+        context["active_games"] = set_fragment_versions(
+            context["community"].gameposting_set.exclude(
+                status__in=["closed", "cancel"]
+            ),
+            game_fragment_dependencies,
         )
+        set_fragment_versions([context["community"]], community_fragment_dependencies)
         context["comm_sessions"] = (
             context["community"]
             .gameposting_set.all()
@@ -1597,6 +1628,9 @@ class GamerAvailabilityUpdate(LoginRequiredMixin, generic.FormView):
                 events_cancelled, events_created
             )
         )
+        WeeklyAvailability.objects.rebuild_for_gamer(
+            self.request.user.gamerprofile, calendar=self.avail_calendar
+        )
         messages.success(self.request, _("Available times successfully updated."))
         if cache.get("profile_{}".format(self.request.user.username)):
             cache.incr_version("profile_{}".format(self.request.user.username))
@@ -1,7 +1,8 @@
 import logging
+from datetime import timedelta
 
-from django.db.models.query_utils import Q
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
@@ -11,14 +12,19 @@ from notifications.signals import notify
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.decorators import parser_classes as dparser_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_extensions.mixins import DetailSerializerMixin, NestedViewSetMixin
 
+from looking_for_group.fieldsets import Load, SparseFieldsetViewSetMixin
+from looking_for_group.fragments import CachedFragmentsMixin
 from looking_for_group.mixins import AutoPermissionViewSetMixin, ParentObjectAutoPermissionViewSetMixin
+from looking_for_group.pagination import KeysetPagination
 
-from . import models, serializers
+from . import models, serializers, visibility
 from .signals import player_kicked, player_left
 
 logger = logging.getLogger("api")
@@ -45,12 +51,38 @@ parent_lookup_session__game__slug = Parameter(
     description="Slug of related game object.",
 )
 
+character_query_plan = {
+    "api_url": Load(select_related=["game"]),
+    "game": Load(select_related=["game"]),
+    "player": Load(select_related=["player__gamer", "player__game"]),
+    "player_username": Load(select_related=["player__gamer"]),
+}
+
+# What an expanded game nested in another object reads.
+expanded_game_load = Load(
+    select_related=[
+        "game__gm",
+        "game__game_system",
+        "game__published_game__game",
+        "game__published_module__parent_game_edition__game",
+    ],
+    prefetch_related=["game__communities"],
+)
+
 
 @method_decorator(
     name="list",
     decorator=swagger_auto_schema(
         operation_summary="List Games",
         operation_description="Fetch a list of game records. **NOTE**: You will probably want to filter by status at least.",
+        manual_parameters=[
+            Parameter(
+                name="starts_within",
+                in_="query",
+                type="integer",
+                description="Only include games with a session starting within this many days.",
+            )
+        ],
     ),
 )
 @method_decorator(
@@ -134,6 +166,8 @@ parent_lookup_session__game__slug = Parameter(
 )
 class GamePostingViewSet(
     AutoPermissionViewSetMixin,
+    CachedFragmentsMixin,
+    SparseFieldsetViewSetMixin,
     DetailSerializerMixin,
     NestedViewSetMixin,
     viewsets.ModelViewSet,
@@ -149,7 +183,7 @@ class GamePostingViewSet(
     lookup_url_kwarg = "slug"
     serializer_class = serializers.GameDataListSerializer
     serializer_detail_class = serializers.GameDataSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = [
         "published_game",
         "game_system",
@@ -158,6 +192,38 @@ class GamePostingViewSet(
         "game_type",
         "game_mode",
     ]
+    ordering_fields = ["next_session_at", "start_time", "modified"]
+    ordering = ["-modified"]
+    pagination_class = KeysetPagination
+    query_plan = {
+        "gm": Load(select_related=["gm"]),
+        "gm_stats": Load(select_related=["gm"], annotate=["with_gm_active_game_count"]),
+        "published_game": Load(select_related=["published_game__game"]),
+        "published_game_title": Load(select_related=["published_game__game"]),
+        "game_system": Load(select_related=["game_system"]),
+        "game_system_name": Load(select_related=["game_system"]),
+        "published_module": Load(
+            select_related=["published_module__parent_game_edition__game"]
+        ),
+        "published_module_title": Load(select_related=["published_module"]),
+        "communities": Load(prefetch_related=["communities"]),
+        "current_players": Load(annotate=["with_player_count"]),
+        "players": Load(prefetch_related=["players"]),
+        "player_stats": Load(prefetch_related=["player_set__gamer"]),
+    }
+    expanded_query_plan = {
+        "gm": Load(select_related=["gm__user"]),
+        "players": Load(prefetch_related=["players__user"]),
+    }
+    fragment_dependencies = [
+        "gm",
+        "game_system",
+        "published_game",
+        "published_game__game",
+        "published_module",
+        "published_module__parent_game_edition",
+        "published_module__parent_game_edition__game",
+    ]
     permission_type_map = {
         **AutoPermissionViewSetMixin.permission_type_map,
         "apply": "apply",
@@ -165,21 +231,18 @@ class GamePostingViewSet(
     }
 
     def get_queryset(self):
-        gamer = self.request.user.gamerprofile
-        friends = gamer.friends.all()
-        communities = [f.id for f in gamer.communities.all()]
-        game_player_ids = [
-            obj.game.id
-            for obj in models.Player.objects.filter(gamer=gamer).select_related("game")
-        ]
-        q_gm = Q(gm=gamer)
-        q_gm_is_friend = Q(gm__in=friends) & Q(privacy_level="community")
-        q_isplayer = Q(id__in=game_player_ids)
-        q_community = Q(communities__id__in=communities) & Q(privacy_level="community")
-        q_public = Q(privacy_level="public")
-        qs = models.GamePosting.objects.filter(
-            q_gm | q_public | q_gm_is_friend | q_isplayer | q_community
-        ).distinct()
+        qs = visibility.visible_games(self.request.user.gamerprofile)
+        starts_within = self.request.query_params.get("starts_within", None)
+        if starts_within:
+            try:
+                days = int(starts_within)
+            except ValueError:
+                raise ValidationError({"starts_within": "Must be a number of days."})
+            now = timezone.now()
+            qs = qs.filter(
+                next_session_at__gte=now,
+                next_session_at__lte=now + timedelta(days=days),
+            )
         return qs
 
     def create(self, request, *args, **kwargs):
@@ -389,6 +452,7 @@ class GamePostingViewSet(
 )
 class GameSessionViewSet(
     ParentObjectAutoPermissionViewSetMixin,
+    SparseFieldsetViewSetMixin,
     NestedViewSetMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -402,6 +466,31 @@ class GameSessionViewSet(
 
     model = models.GameSession
     serializer_class = serializers.GameSessionSerializer
+    pagination_class = KeysetPagination
+    query_plan = {
+        "api_url": Load(select_related=["game"]),
+        "game": Load(select_related=["game"]),
+        "game_title": Load(select_related=["game"]),
+        "players_expected": Load(
+            prefetch_related=["players_expected__gamer", "players_expected__game"]
+        ),
+        "players_missing": Load(
+            prefetch_related=["players_missing__gamer", "players_missing__game"]
+        ),
+        "adventurelog": Load(select_related=["adventurelog"]),
+        "adventurelog_title": Load(select_related=["adventurelog"]),
+        "adventurelog_body": Load(select_related=["adventurelog"]),
+        "adventurelog_body_rendered": Load(select_related=["adventurelog"]),
+    }
+    expanded_query_plan = {
+        "game": expanded_game_load,
+        "adventurelog": Load(
+            select_related=[
+                "adventurelog__initial_author",
+                "adventurelog__last_edited_by",
+            ]
+        ),
+    }
     lookup_field = "slug"
     lookup_url_kwarg = "slug"
     parent_dependent_actions = [
@@ -725,9 +814,13 @@ class GameApplicationViewSet(
         logger.debug("Fetching gamerprofile from request...")
         gamer = self.request.user.gamerprofile
         logger.debug("Fetching game applications for gamer {}".format(gamer))
-        qs = models.GamePostingApplication.objects.filter(
-            gamer=self.request.user.gamerprofile
-        ).order_by("-modified", "-created", "status")
+        qs = (
+            models.GamePostingApplication.objects.filter(
+                gamer=self.request.user.gamerprofile
+            )
+            .select_related("game", "gamer")
+            .order_by("-modified", "-created", "status")
+        )
         logger.debug(
             "Retrieved queryset of length {} for gamer {}".format(
                 qs.count(), self.request.user.gamerprofile
@@ -811,9 +904,13 @@ class GMGameApplicationViewSet(
     permission_type_map["list"] = "approve"
 
     def get_queryset(self):
-        return models.GamePostingApplication.objects.filter(
-            game__slug=self.kwargs["parent_lookup_game__slug"]
-        ).exclude(status="new")
+        return (
+            models.GamePostingApplication.objects.filter(
+                game__slug=self.kwargs["parent_lookup_game__slug"]
+            )
+            .exclude(status="new")
+            .select_related("game", "gamer")
+        )
 
     def get_parent_game(self):
         return get_object_or_404(
@@ -1048,7 +1145,10 @@ class PlayerViewSet(
     ),
 )
 class CharacterViewSet(
-    ParentObjectAutoPermissionViewSetMixin, NestedViewSetMixin, viewsets.ModelViewSet
+    ParentObjectAutoPermissionViewSetMixin,
+    SparseFieldsetViewSetMixin,
+    NestedViewSetMixin,
+    viewsets.ModelViewSet,
 ):
     """
     Provides views for the characters in a game.
@@ -1066,6 +1166,10 @@ class CharacterViewSet(
     lookup_url_kwarg = "slug"
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["status"]
+    ordering = ["-modified"]
+    pagination_class = KeysetPagination
+    query_plan = character_query_plan
+    expanded_query_plan = {"game": expanded_game_load}
     parent_game = None
     permission_type_map = {
         **ParentObjectAutoPermissionViewSetMixin.permission_type_map,
@@ -1217,6 +1321,7 @@ class CharacterViewSet(
 )
 class MyCharacterViewSet(
     AutoPermissionViewSetMixin,
+    SparseFieldsetViewSetMixin,
     NestedViewSetMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -1234,6 +1339,10 @@ class MyCharacterViewSet(
     lookup_url_kwarg = "slug"
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["status"]
+    ordering = ["-modified"]
+    pagination_class = KeysetPagination
+    query_plan = character_query_plan
+    expanded_query_plan = {"game": expanded_game_load}
     permission_type_map = {
         **AutoPermissionViewSetMixin.permission_type_map,
         "deactivate": "delete",
@@ -0,0 +1,166 @@
+"""
+Helpers for representing weekly availability as a compact bitmap.
+
+A week is divided into 15 minute slots counted from Monday 00:00 UTC, giving
+672 slots in total. A bitmap is a plain python int where bit ``n`` is set when
+slot ``n`` is available. Because availability recurs weekly, all shifts wrap
+around the end of the week.
+"""
+import math
+
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+from pytz import UTC
+
+SLOT_MINUTES = 15
+MINUTES_PER_WEEK = 7 * 24 * 60
+SLOTS_PER_WEEK = MINUTES_PER_WEEK // SLOT_MINUTES
+FULL_WEEK_MASK = (1 << SLOTS_PER_WEEK) - 1
+DEFAULT_MINIMUM_OVERLAP = 150
+
+
+class WeeklyBitmapField(models.Field):
+    """
+    Stores a weekly availability bitmap as a fixed length postgres bit string while
+    exposing it as an int in python.
+    """
+
+    description = _("Weekly availability bitmap")
+
+    def db_type(self, connection):
+        return "bit({})".format(SLOTS_PER_WEEK)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return int(value, 2)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        return int(value, 2)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return format(value & FULL_WEEK_MASK, "0{}b".format(SLOTS_PER_WEEK))
+
+
+def minute_of_week(dt):
+    """
+    For a timezone aware datetime, return the minute of the week in UTC.
+    """
+    utc_time = dt.astimezone(UTC)
+    return utc_time.weekday() * 24 * 60 + utc_time.hour * 60 + utc_time.minute
+
+
+def rotate_right(mask, places):
+    """
+    Rotate the mask so that bit ``n + places`` lands in bit ``n``, wrapping around the week.
+    """
+    places = places % SLOTS_PER_WEEK
+    if not places:
+        return mask
+    return ((mask >> places) | (mask << (SLOTS_PER_WEEK - places))) & FULL_WEEK_MASK
+
+
+def mask_for_interval(start, end):
+    """
+    Return the bitmap of every slot touched by the interval between two timezone aware datetimes.
+    """
+    duration = (end - start).total_seconds() / 60
+    if duration <= 0:
+        return 0
+    if duration >= MINUTES_PER_WEEK:
+        return FULL_WEEK_MASK
+    offset = minute_of_week(start)
+    first_slot = offset // SLOT_MINUTES
+    slot_count = int(math.ceil((offset + duration) / SLOT_MINUTES)) - first_slot
+    if slot_count >= SLOTS_PER_WEEK:
+        return FULL_WEEK_MASK
+    return rotate_right((1 << slot_count) - 1, -first_slot)
+
+
+def mask_for_occurrences(occurrences):
+    """
+    Combine the intervals of an iterable of occurrences into one bitmap.
+    """
+    mask = 0
+    for occurrence in occurrences:
+        mask |= mask_for_interval(occurrence.start, occurrence.end)
+    return mask
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def slots_for_minutes(minutes):
+    return max(1, int(math.ceil(minutes / SLOT_MINUTES)))
+
+
+def erode(mask, run_length):
+    """
+    Return a mask where bit ``n`` is set only if slots ``n`` through ``n + run_length - 1``
+    are all set in the original mask. Eroding ``a & b`` is the same as ``erode(a) & erode(b)``,
+    which lets us erode each gamer once and compare with a single AND.
+    """
+    if run_length >= SLOTS_PER_WEEK:
+        return mask if mask == FULL_WEEK_MASK else 0
+    covered = 1
+    while covered < run_length:
+        step = min(covered, run_length - covered)
+        mask &= rotate_right(mask, step)
+        covered += step
+    return mask
+
+
+def split_runs(mask):
+    """
+    Split a bitmap into a list of masks, one for each contiguous run of set bits.
+    """
+    if not mask:
+        return []
+    if mask == FULL_WEEK_MASK:
+        return [mask]
+    # Rotate so that slot 0 is empty, which means no run wraps around the end of the week.
+    offset = next(slot for slot in range(SLOTS_PER_WEEK) if not (mask >> slot) & 1)
+    rotated = rotate_right(mask, offset)
+    runs = []
+    run = 0
+    for slot in range(SLOTS_PER_WEEK):
+        if (rotated >> slot) & 1:
+            run |= 1 << slot
+        elif run:
+            runs.append(rotate_right(run, -offset))
+            run = 0
+    if run:
+        runs.append(rotate_right(run, -offset))
+    return runs
+
+
+def build_window_masks(requester_mask, minimum_overlap=DEFAULT_MINIMUM_OVERLAP):
+    """
+    Turn a requester bitmap into a dict of required run length to the eroded union
+    of all windows needing that run length. Each window needs an overlap of
+    ``minimum_overlap`` minutes, or the whole window if it is shorter than that.
+    """
+    windows = {}
+    for run in split_runs(requester_mask):
+        run_length = popcount(run)
+        if minimum_overlap:
+            run_length = min(run_length, slots_for_minutes(minimum_overlap))
+        windows[run_length] = windows.get(run_length, 0) | erode(run, run_length)
+    return windows
+
+
+def mask_matches_windows(mask, windows):
+    """
+    Check whether a gamer bitmap overlaps any of the windows from :func:`build_window_masks`
+    for at least the required run length.
+    """
+    for run_length, eroded_windows in windows.items():
+        if erode(mask, run_length) & eroded_windows:
+            return True
+    return False
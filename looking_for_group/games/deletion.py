@@ -0,0 +1,225 @@
+"""
+Set based deletion of game events and everything hanging off them.
+
+Deleting a campaign through the ORM deletes its child events one at a time, and every
+delete fires receivers that query and delete the occurrences of that event. The
+:class:`DeletionPlan` instead collects the ids of the whole subtree up front and removes
+each table with a single ``DELETE``, children first, in one transaction. Per row
+signals are not sent, so the plan applies their side effects itself.
+"""
+import logging
+from collections import OrderedDict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.query_utils import Q
+from schedule.models import Event, EventRelation, Occurrence
+
+from . import models
+from .. import fragments
+
+logger = logging.getLogger("games")
+
+
+class DeletionPlan:
+    """
+    The rows to remove for a set of events, and optionally the sessions of a set of
+    games.
+
+    :param event_ids: The events to delete. Their child events are included.
+    :param game_ids: Games whose sessions, adventure logs and session attendance
+        records should also be deleted. The games themselves are left for the caller
+        to delete once their dependents are gone.
+    """
+
+    def __init__(self, event_ids=(), game_ids=()):
+        event_ids = {event_id for event_id in event_ids if event_id}
+        event_ids.update(
+            models.MasterEventLink.objects.filter(
+                master_event_id__in=event_ids
+            ).values_list("event_id", flat=True)
+        )
+        self.event_ids = sorted(event_ids)
+        self.game_ids = sorted({game_id for game_id in game_ids if game_id})
+
+    @classmethod
+    def for_events(cls, events):
+        return cls(event_ids=[event.pk for event in events])
+
+    @classmethod
+    def for_games(cls, games):
+        games = list(games)
+        return cls(
+            event_ids=[game.event_id for game in games],
+            game_ids=[game.pk for game in games],
+        )
+
+    def get_steps(self):
+        """
+        The statements to run in order, as ``(label, queryset, updates)`` tuples. Steps
+        with ``updates`` null out a reference instead of deleting the rows.
+
+        Every queryset only filters on columns of its own table, using subqueries
+        for anything else, so it can be executed as a single ``DELETE``.
+        """
+        steps = []
+        occurrences = Occurrence.objects.filter(event_id__in=self.event_ids).values(
+            "id"
+        )
+        sessions = models.GameSession.objects.filter(game_id__in=self.game_ids).values(
+            "id"
+        )
+        steps.append(
+            (
+                "games.ChildOccurenceLink",
+                models.ChildOccurenceLink.objects.filter(
+                    Q(master_event_occurence_id__in=occurrences)
+                    | Q(child_event_occurence_id__in=occurrences)
+                ),
+                None,
+            )
+        )
+        steps.append(
+            (
+                "games.MaterializedOccurrence",
+                models.MaterializedOccurrence.objects.filter(
+                    event_id__in=self.event_ids
+                ),
+                None,
+            )
+        )
+        steps.append(
+            (
+                "games.OccurrenceHorizon",
+                models.OccurrenceHorizon.objects.filter(event_id__in=self.event_ids),
+                None,
+            )
+        )
+        if self.game_ids:
+            through_models = [
+                models.GameSession.players_expected.through,
+                models.GameSession.players_missing.through,
+            ]
+            for through in through_models:
+                steps.append(
+                    (
+                        through._meta.label,
+                        through.objects.filter(gamesession_id__in=sessions),
+                        None,
+                    )
+                )
+            steps.append(
+                (
+                    "games.AdventureLog",
+                    models.AdventureLog.objects.filter(session_id__in=sessions),
+                    None,
+                )
+            )
+            steps.append(
+                (
+                    "games.GameSession",
+                    models.GameSession.objects.filter(game_id__in=self.game_ids),
+                    None,
+                )
+            )
+        steps.append(
+            (
+                "games.GameSession",
+                models.GameSession.objects.filter(
+                    occurrence_id__in=occurrences
+                ).exclude(game_id__in=self.game_ids),
+                {"occurrence": None},
+            )
+        )
+        steps.append(
+            (
+                "schedule.Occurrence",
+                Occurrence.objects.filter(event_id__in=self.event_ids),
+                None,
+            )
+        )
+        steps.append(
+            (
+                "schedule.EventRelation",
+                EventRelation.objects.filter(
+                    Q(event_id__in=self.event_ids)
+                    | Q(
+                        content_type=ContentType.objects.get_for_model(Event),
+                        object_id__in=self.event_ids,
+                    )
+                ),
+                None,
+            )
+        )
+        steps.append(
+            (
+                "games.MasterEventLink",
+                models.MasterEventLink.objects.filter(
+                    Q(event_id__in=self.event_ids)
+                    | Q(master_event_id__in=self.event_ids)
+                ),
+                None,
+            )
+        )
+        steps.append(
+            (
+                "games.GamePosting",
+                models.GamePosting.objects.filter(event_id__in=self.event_ids),
+                {"event": None, "next_session_at": None},
+            )
+        )
+        steps.append(
+            ("schedule.Event", Event.objects.filter(id__in=self.event_ids), None)
+        )
+        return steps
+
+    def count(self):
+        """
+        Report how many rows each table would lose, or have updated, without changing
+        anything.
+
+        :returns: OrderedDict -- Row counts keyed by model label.
+        """
+        counts = OrderedDict()
+        for label, queryset, updates in self.get_steps():
+            if updates is not None:
+                label = "{} (updated)".format(label)
+            counts[label] = counts.get(label, 0) + queryset.count()
+        return counts
+
+    def execute(self, dry_run=False):
+        """
+        Run the plan in a single transaction.
+
+        :param dry_run: Only count the affected rows.
+        :returns: OrderedDict -- Row counts keyed by model label.
+        """
+        if dry_run:
+            counts = self.count()
+            logger.info("Deletion plan dry run: {}".format(dict(counts)))
+            return counts
+        counts = OrderedDict()
+        with transaction.atomic():
+            calendar_ids = list(
+                Event.objects.filter(id__in=self.event_ids).values_list(
+                    "calendar_id", flat=True
+                )
+            )
+            models.CalendarVersion.objects.bump_virtual_calendars(self.event_ids)
+            game_ids = set(self.game_ids)
+            game_ids.update(
+                models.GamePosting.objects.filter(
+                    event_id__in=self.event_ids
+                ).values_list("pk", flat=True)
+            )
+            for label, queryset, updates in self.get_steps():
+                if updates is not None:
+                    label = "{} (updated)".format(label)
+                    affected = queryset.update(**updates)
+                else:
+                    affected = queryset._raw_delete(queryset.db)
+                counts[label] = counts.get(label, 0) + affected
+            models.CalendarVersion.objects.bump(calendar_ids)
+            fragments.bump(models.GamePosting, game_ids)
+        logger.info("Executed deletion plan: {}".format(dict(counts)))
+        return counts
@@ -1,8 +1,11 @@
+import itertools
 from datetime import timedelta
 
 import icalendar
 import pytz
+from django.conf import settings
 from django.contrib.syndication.views import FeedDoesNotExist
+from django.core.cache import cache
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
@@ -11,11 +14,21 @@ from schedule.feeds import CalendarICalendar, UpcomingEventsFeed
 from schedule.feeds.ical import EVENT_ITEMS
 
 from ..gamer_profiles.models import GamerProfile
-from .models import Calendar, GameEvent, GamePosting, Occurrence
+from .mixins import conditional_calendar_response, get_occurrence_uid
+from .models import (
+    Calendar,
+    CalendarVersion,
+    GameEvent,
+    GamePosting,
+    MaterializedOccurrence
+)
 
 
 class UpcomingGamesFeed(UpcomingEventsFeed):
     def get_object(self, request, gamer):
+        if hasattr(request, "upcoming_games_calendar"):
+            # Already fetched to check the calendar version.
+            return request.upcoming_games_calendar
         profile = get_object_or_404(GamerProfile, pk=gamer)
         calendar, created = Calendar.objects.get_or_create(
             slug=profile.username,
@@ -34,34 +47,78 @@ class UpcomingGamesFeed(UpcomingEventsFeed):
             kwargs={"gamer": GamerProfile.objects.get(username=obj.slug).pk},
         )
 
+    def items(self, obj):
+        return itertools.islice(
+            MaterializedOccurrence.objects.calendar_occurrences_after(
+                obj, timezone.now()
+            ),
+            getattr(settings, "FEED_LIST_LENGTH", 10),
+        )
+
+    def __call__(self, request, *args, **kwargs):
+        calendar = self.get_object(request, *args, **kwargs)
+        request.upcoming_games_calendar = calendar
+        calendar_version = CalendarVersion.objects.get_for_calendar(calendar)
+        # Occurrences drop off the feed as they pass, so it also changes hourly.
+        this_hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        return conditional_calendar_response(
+            request,
+            calendar_version,
+            lambda: super(UpcomingGamesFeed, self).__call__(request, *args, **kwargs),
+            "upcoming",
+            this_hour,
+            last_modified=max(calendar_version.modified, this_hour),
+        )
+
 
 class GamesICalFeed(CalendarICalendar):
 
     i = 1
+    cache_timeout = 60 * 60 * 24
 
-    def items(self):
-        tz = pytz.timezone("UTC")
+    def get_calendar(self):
         gamer_id = self.kwargs["gamer"]
-        gamer = get_object_or_404(GamerProfile, pk=gamer_id)
+        self.gamer = get_object_or_404(
+            GamerProfile.objects.select_related("user"), pk=gamer_id
+        )
         cal, created = Calendar.objects.get_or_create(
-            slug=gamer.username,
-            defaults={"name": "{}'s Calendar".format(gamer.username)},
+            slug=self.gamer.username,
+            defaults={"name": "{}'s Calendar".format(self.gamer.username)},
         )
-        if gamer.user.timezone:
-            tz = pytz.timezone(gamer.user.timezone)
-        return cal.occurrences_after(timezone.now().astimezone(tz) - timedelta(days=30))
+        return cal
 
-    def __call__(self, *args, **kwargs):
-        self.args = args
-        self.kwargs = kwargs
+    def items(self):
+        tz = pytz.timezone("UTC")
+        if self.gamer.user.timezone:
+            tz = pytz.timezone(self.gamer.user.timezone)
+        return MaterializedOccurrence.objects.calendar_occurrences_after(
+            self.calendar, timezone.now().astimezone(tz) - timedelta(days=30)
+        )
 
+    def get_games_by_event(self):
+        """
+        Fetch the games for every event in the calendar up front rather than once per item.
+        """
+        game_slugs = GameEvent.objects.get_related_game_slugs(
+            GameEvent.objects.for_calendar(self.calendar).values_list("id", flat=True)
+        )
+        games = GamePosting.objects.filter(
+            slug__in=set(game_slugs.values())
+        ).select_related("game_location")
+        games_by_slug = {game.slug: game for game in games}
+        return {
+            event_id: games_by_slug[slug]
+            for event_id, slug in game_slugs.items()
+            if slug in games_by_slug
+        }
+
+    def render_calendar(self):
         cal = icalendar.Calendar()
         cal.add("prodid", "-// lfg-directory //")
         cal.add("version", "2.0")
 
         end_date = timezone.now() + timedelta(days=400)
-        if Occurrence.objects.all().count() > 0:
-            self.i = Occurrence.objects.latest("id").id + 1
+        self.games_by_event = self.get_games_by_event()
         for item in self.items():
             if self.item_start(item) >= end_date:
                 break
@@ -73,25 +130,46 @@ class GamesICalFeed(CalendarICalendar):
                     event.add(vkey, value)
             event.add("status", self.item_status(item))
             cal.add_component(event)
+        return cal.to_ical()
 
-        response = HttpResponse(cal.to_ical())
-        response["Content-Type"] = "text/calendar"
-        return response
+    def __call__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.calendar = self.get_calendar()
+        calendar_version = CalendarVersion.objects.get_for_calendar(self.calendar)
+        # The feed covers a window relative to today, so it also changes daily.
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        def get_response():
+            cache_key = "ical_{}_{}_{}".format(
+                self.calendar.id, calendar_version.version, today.date()
+            )
+            body = cache.get(cache_key)
+            if body is None:
+                body = self.render_calendar()
+                cache.set(cache_key, body, self.cache_timeout)
+            response = HttpResponse(body)
+            response["Content-Type"] = "text/calendar"
+            return response
+
+        return conditional_calendar_response(
+            args[0],
+            calendar_version,
+            get_response,
+            "ical",
+            today.date(),
+            last_modified=max(calendar_version.modified, today),
+        )
 
     def item_uid(self, item):
         if item.id:
-            uid = str(item.id + self.i)
-            self.i += 1
-        else:
-            uid = item.id
-        return uid
+            return str(item.id)
+        return get_occurrence_uid(item)
 
     def item_location(self, item):
-        ge = GameEvent.objects.get(pk=item.event.id)
-        if ge.is_master_event():
-            game = GamePosting.objects.get(event=ge)
-        else:
-            game = GamePosting.objects.get(event=ge.get_master_event())
+        game = self.games_by_event.get(item.event_id)
+        if not game:
+            return None
         if game.game_mode == "irl" and game.game_location:
             return "{} (https://app.lfg.directory{})".format(
                 game.game_location.formatted_address, str(game.get_absolute_url())
@@ -130,6 +130,23 @@ class GameFilterForm(forms.Form):
         widget=SwitchInput(label=_("Filter by GM Sched?")),
         required=False,
     )
+    starts_within = forms.ChoiceField(
+        label=_("Next session within"),
+        choices=[
+            ("", ""),
+            (1, _("1 day")),
+            (3, _("3 days")),
+            (7, _("7 days")),
+            (14, _("14 days")),
+            (30, _("30 days")),
+        ],
+        required=False,
+    )
+    sort = forms.ChoiceField(
+        label=_("Sort by"),
+        choices=[("", _("Recently updated")), ("next_session", _("Next session"))],
+        required=False,
+    )
 
     def __init__(self, profile_has_city=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -211,3 +228,37 @@ class GameSessionRescheduleForm(forms.ModelForm):
                 attrs={"class": "dtp"}, format="%Y-%m-%d %H:%M"
             )
         }
+
+
+class SlotSuggestionForm(forms.Form):
+    """
+    Options for searching for the best times to schedule a session.
+    """
+
+    earliest = forms.DateTimeField(
+        required=False,
+        help_text=_("Earliest time to consider. Defaults to now."),
+        widget=forms.widgets.DateTimeInput(
+            attrs={"class": "dtp"}, format="%Y-%m-%d %H:%M"
+        ),
+    )
+    weeks = forms.IntegerField(
+        min_value=1,
+        max_value=8,
+        initial=2,
+        required=False,
+        help_text=_("How many weeks ahead to search."),
+    )
+    limit = forms.IntegerField(
+        min_value=1,
+        max_value=20,
+        initial=5,
+        required=False,
+        help_text=_("How many suggestions to return."),
+    )
+
+    def clean_weeks(self):
+        return self.cleaned_data["weeks"] or self.fields["weeks"].initial
+
+    def clean_limit(self):
+        return self.cleaned_data["limit"] or self.fields["limit"].initial
@@ -0,0 +1,31 @@
+# Generated by Django 3.0.4 on 2020-03-16 14:02
+
+import django.db.models.deletion
+import django.utils.timezone
+import looking_for_group.games.availability
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamer_profiles', '0027_gamerprofile_games_kicked'),
+        ('games', '0036_auto_20190829_1614'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyAvailability',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('bitmap', looking_for_group.games.availability.WeeklyBitmapField(default=0)),
+                ('gamer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_availability', to='gamer_profiles.GamerProfile')),
+            ],
+            options={
+                'verbose_name_plural': 'Weekly availability',
+            },
+        ),
+    ]
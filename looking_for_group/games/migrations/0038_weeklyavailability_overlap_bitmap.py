@@ -0,0 +1,30 @@
+# Generated by Django 3.0.4 on 2020-03-18 09:41
+
+import looking_for_group.games.availability
+from django.db import migrations
+
+from looking_for_group.games import availability
+
+
+def populate_overlap_bitmaps(apps, schema_editor):
+    WeeklyAvailability = apps.get_model("games", "WeeklyAvailability")
+    run_length = availability.slots_for_minutes(availability.DEFAULT_MINIMUM_OVERLAP)
+    for weekly in WeeklyAvailability.objects.all():
+        weekly.overlap_bitmap = availability.erode(weekly.bitmap, run_length)
+        weekly.save(update_fields=["overlap_bitmap"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0037_weeklyavailability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weeklyavailability',
+            name='overlap_bitmap',
+            field=looking_for_group.games.availability.WeeklyBitmapField(default=0, help_text='The bitmap eroded to the slots that begin a run long enough for the default minimum overlap.'),
+        ),
+        migrations.RunPython(populate_overlap_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.0.4 on 2020-03-21 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def schedule_horizon_extension(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func="looking_for_group.games.tasks.extend_occurrence_horizon",
+        defaults={"name": "Extend occurrence horizon", "schedule_type": "D", "repeats": -1},
+    )
+
+
+def unschedule_horizon_extension(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(func="looking_for_group.games.tasks.extend_occurrence_horizon").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_q', '0009_auto_20171009_0915'),
+        ('schedule', '0011_event_calendar_not_null'),
+        ('games', '0038_weeklyavailability_overlap_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccurrenceHorizon',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(db_index=True)),
+                ('end', models.DateTimeField(db_index=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='occurrence_horizon', to='schedule.Event')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MaterializedOccurrence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('original_start', models.DateTimeField()),
+                ('original_end', models.DateTimeField()),
+                ('cancelled', models.BooleanField(default=False)),
+                ('calendar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materialized_occurrences', to='schedule.Calendar')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materialized_occurrences', to='schedule.Event')),
+                ('occurrence', models.ForeignKey(blank=True, help_text='The persisted occurrence, if one exists.', null=True, on_delete=django.db.models.deletion.SET_NULL, to='schedule.Occurrence')),
+            ],
+            options={
+                'unique_together': {('event', 'original_start')},
+                'index_together': {('calendar', 'start'), ('event', 'start')},
+            },
+        ),
+        migrations.RunPython(schedule_horizon_extension, unschedule_horizon_extension),
+    ]
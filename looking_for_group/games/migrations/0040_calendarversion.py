@@ -0,0 +1,25 @@
+# Generated by Django 3.0.4 on 2020-03-23 19:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0011_event_calendar_not_null'),
+        ('games', '0039_materialized_occurrences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+                ('calendar', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='version_record', to='schedule.Calendar')),
+            ],
+        ),
+    ]
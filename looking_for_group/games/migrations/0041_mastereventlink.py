@@ -0,0 +1,49 @@
+# Generated by Django 3.0.4 on 2020-03-25 20:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_master_event_links(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Event = apps.get_model("schedule", "Event")
+    EventRelation = apps.get_model("schedule", "EventRelation")
+    MasterEventLink = apps.get_model("games", "MasterEventLink")
+    try:
+        content_type = ContentType.objects.get(app_label="schedule", model="event")
+    except ContentType.DoesNotExist:
+        return  # Fresh database, so there are no relations yet.
+    relations = EventRelation.objects.filter(
+        content_type=content_type,
+        distinction="playerevent",
+        object_id__in=Event.objects.values("id"),
+    ).values_list("event_id", "object_id")
+    MasterEventLink.objects.bulk_create(
+        [
+            MasterEventLink(event_id=event_id, master_event_id=master_event_id)
+            for event_id, master_event_id in relations.iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('schedule', '0011_event_calendar_not_null'),
+        ('games', '0040_calendarversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MasterEventLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='master_event_link', to='schedule.Event')),
+                ('master_event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_event_links', to='schedule.Event')),
+            ],
+        ),
+        migrations.RunPython(populate_master_event_links, migrations.RunPython.noop),
+    ]
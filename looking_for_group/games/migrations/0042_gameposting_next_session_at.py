@@ -0,0 +1,75 @@
+# Generated by Django 3.0.4 on 2020-03-27 18:05
+
+from datetime import timedelta
+
+import pytz
+from django.db import migrations, models
+from schedule.models import Event
+
+
+def backfill_next_session_at(apps, schema_editor):
+    """
+    Compute the next session of active games the same way as
+    GamePosting.get_next_scheduled_session_occurrence. Historical models have no methods,
+    so the occurrences are expanded with django-scheduler's Event directly.
+    """
+    GamePosting = apps.get_model("games", "GamePosting")
+    GameSession = apps.get_model("games", "GameSession")
+    games = (
+        GamePosting.objects.filter(event__isnull=False, start_time__isnull=False)
+        .exclude(status__in=["cancel", "closed"])
+        .select_related("gm__user")
+    )
+    changed = []
+    for game in games.iterator():
+        tz = pytz.timezone(game.gm.user.timezone or "UTC")
+        date_cutoff = game.start_time.astimezone(tz) - timedelta(days=1)
+        if game.sessions > 0:
+            latest_session = (
+                GameSession.objects.filter(game=game, status__in=["complete", "cancel"])
+                .order_by("-scheduled_time")
+                .first()
+            )
+            if latest_session:
+                date_cutoff = latest_session.scheduled_time.astimezone(tz) + timedelta(
+                    days=1
+                )
+        event = Event.objects.get(pk=game.event_id)
+        for occurrence in event.occurrences_after(after=date_cutoff):
+            if occurrence.start >= date_cutoff:
+                game.next_session_at = occurrence.start
+                changed.append(game)
+                break
+    GamePosting.objects.bulk_update(changed, ["next_session_at"], batch_size=200)
+    print("Set the next session time for {} games.".format(len(changed)))
+
+
+def schedule_next_session_sweep(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func="looking_for_group.games.tasks.sweep_next_session_times",
+        defaults={"name": "Refresh next session times", "schedule_type": "H", "repeats": -1},
+    )
+
+
+def unschedule_next_session_sweep(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(func="looking_for_group.games.tasks.sweep_next_session_times").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_q', '0009_auto_20171009_0915'),
+        ('games', '0041_mastereventlink'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameposting',
+            name='next_session_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, help_text='Cached start time of the next scheduled session.', null=True),
+        ),
+        migrations.RunPython(backfill_next_session_at, migrations.RunPython.noop),
+        migrations.RunPython(schedule_next_session_sweep, unschedule_next_session_sweep),
+    ]
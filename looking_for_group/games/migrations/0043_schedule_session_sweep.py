@@ -0,0 +1,28 @@
+# Generated by Django 3.0.4 on 2020-03-28 11:42
+
+from django.db import migrations
+
+
+def schedule_session_sweep(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func="looking_for_group.games.tasks.create_upcoming_sessions",
+        defaults={"name": "Create upcoming sessions", "schedule_type": "D", "repeats": -1},
+    )
+
+
+def unschedule_session_sweep(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(func="looking_for_group.games.tasks.create_upcoming_sessions").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_q', '0009_auto_20171009_0915'),
+        ('games', '0042_gameposting_next_session_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_session_sweep, unschedule_session_sweep),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.0.4 on 2020-03-29 09:15
+
+from django.db import migrations
+
+
+def schedule_counter_reconciliation(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func="looking_for_group.games.tasks.reconcile_counters",
+        defaults={"name": "Reconcile counters", "schedule_type": "D", "repeats": -1},
+    )
+
+
+def unschedule_counter_reconciliation(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(func="looking_for_group.games.tasks.reconcile_counters").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_q', '0009_auto_20171009_0915'),
+        ('games', '0043_schedule_session_sweep'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_counter_reconciliation, unschedule_counter_reconciliation),
+    ]
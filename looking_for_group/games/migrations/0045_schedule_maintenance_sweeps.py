@@ -0,0 +1,28 @@
+# Generated by Django 3.0.4 on 2020-03-30 08:40
+
+from django.db import migrations
+
+
+def schedule_maintenance_sweeps(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func="looking_for_group.maintenance.run_maintenance",
+        defaults={"name": "Maintenance sweeps", "schedule_type": "H", "repeats": -1},
+    )
+
+
+def unschedule_maintenance_sweeps(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(func="looking_for_group.maintenance.run_maintenance").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_q', '0009_auto_20171009_0915'),
+        ('games', '0044_schedule_counter_reconciliation'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_maintenance_sweeps, unschedule_maintenance_sweeps),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.4 on 2020-03-31 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0045_schedule_maintenance_sweeps'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='gameposting',
+            index_together={('modified', 'id')},
+        ),
+        migrations.AlterIndexTogether(
+            name='character',
+            index_together={('game', 'modified', 'id')},
+        ),
+        migrations.AlterIndexTogether(
+            name='gamesession',
+            index_together={('game', 'scheduled_time', 'id')},
+        ),
+    ]
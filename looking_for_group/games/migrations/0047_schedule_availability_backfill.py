@@ -0,0 +1,35 @@
+# Generated by Django 3.0.4 on 2020-04-01 10:05
+
+from django.db import migrations
+
+
+def schedule_availability_backfill(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func="looking_for_group.games.tasks.rebuild_weekly_availability",
+        defaults={
+            "name": "Backfill weekly availability",
+            "kwargs": "missing_only=True",
+            "schedule_type": "O",
+            "repeats": -1,
+        },
+    )
+
+
+def unschedule_availability_backfill(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(
+        func="looking_for_group.games.tasks.rebuild_weekly_availability"
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_q', '0009_auto_20171009_0915'),
+        ('games', '0046_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_availability_backfill, unschedule_availability_backfill),
+    ]
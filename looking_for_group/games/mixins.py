@@ -1,6 +1,9 @@
 import logging
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 logger = logging.getLogger("games")
 
@@ -17,3 +20,54 @@ class JSONResponseMixin(object):
     def render_to_response(self, context, **response_kwargs):
         logger.debug("Sending response to JSON instead of template")
         return self.render_to_json_response(context, **response_kwargs)
+
+
+def stream_json_list(items, chunk_size=100):
+    """
+    Encode an iterable as a JSON array a chunk at a time, producing the same output as
+    :class:`django.http.JsonResponse` without holding the whole document in memory.
+    """
+    encoder = DjangoJSONEncoder()
+    separator = ""
+    chunk = []
+    yield "["
+    for item in items:
+        chunk.append(encoder.encode(item))
+        if len(chunk) >= chunk_size:
+            yield separator + ", ".join(chunk)
+            separator = ", "
+            chunk = []
+    if chunk:
+        yield separator + ", ".join(chunk)
+    yield "]"
+
+
+def conditional_calendar_response(
+    request, calendar_version, get_response, *etag_args, last_modified=None
+):
+    """
+    Return a 304 if the client already has the current version of the calendar, otherwise
+    build the response with ``get_response`` and tag it with an ETag and Last-Modified header.
+    """
+    etag = quote_etag(calendar_version.get_etag(*etag_args))
+    if not last_modified:
+        last_modified = calendar_version.modified
+    timestamp = int(last_modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = get_response()
+        if response.status_code == 200:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(timestamp)
+    return response
+
+
+def get_occurrence_uid(occurrence):
+    """
+    Return an id for an occurrence that is not stored in the database. It is built from the
+    event and original start, so it is the same in every response and, being a string, never
+    collides with the id of a persisted occurrence.
+    """
+    return "{}_{}".format(
+        occurrence.event_id, int(occurrence.original_start.timestamp())
+    )
@@ -1,4 +1,7 @@
+import hashlib
+import itertools
 import logging
+from collections import defaultdict
 from datetime import timedelta
 
 import pytz
@@ -6,28 +9,39 @@ from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models, transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.db.models.query_utils import Q
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
-from django_q.tasks import async_task
 from model_utils.models import TimeStampedModel
 from rules.contrib.models import RulesModel
 from schedule.models import Calendar, Event, EventManager, EventRelation, EventRelationManager, Occurrence, Rule
 from schedule.models.calendars import CalendarManager
 from schedule.periods import Day, Week
+from schedule.utils import EventListManager
 
+from . import availability
+from .. import fragments
 from ..game_catalog.models import GameEdition, GameSystem, PublishedModule
 from ..game_catalog.utils import AbstractTaggedLinkedModel, AbstractUUIDWithSlugModel
-from ..gamer_profiles.models import GamerCommunity, GamerProfile
+from ..gamer_profiles.models import CommunityMembership, GamerCommunity, GamerProfile
 from ..games import rules
 from ..invites.models import Invite
 from ..locations.models import Location
-from .tasks import remove_event_and_descendants
-from .utils import check_table_exists
+from ..tracking import FieldTracker
+from .deletion import DeletionPlan
+from .utils import check_table_exists, virtual_player_calendars_enabled
 
 logger = logging.getLogger("games")
 
+# How far ahead and behind the current date occurrences are materialized.
+OCCURRENCE_HORIZON_DAYS = 90
+OCCURRENCE_LOOKBACK_DAYS = 30
+# How far ahead the scheduled sweep creates the next session of running games.
+SESSION_LOOKAHEAD_DAYS = 7
+
 
 class CurrentlyBlocked(Exception):
     pass
@@ -106,15 +120,21 @@ class AvailableCalendarManager(CalendarManager):
             name="{} availability".format(gamer.username),
         )
 
-    def find_compatible_schedules(self, requester_calendar, gamer_list):
+    def find_compatible_schedules(
+        self,
+        requester_calendar,
+        gamer_list,
+        minimum_overlap=availability.DEFAULT_MINIMUM_OVERLAP,
+    ):
         """
         For each gamer in the gamer_list queryset, check their availability calendars
         and return a narrowed list that only includes the ones with potentially compatible avaialbility from
         the requestor calendar.
 
-        First we define a Period that represents the next week days. Then we query the avaialbility events from said period in the requestor calendar.
-        For each of those occurrences, we check the avaialbility for conflicts. Gamers who have at least one area of acceptable overlap in the period are
-        included in the returned list of GamerProfiles.
+        The requestor's occurrences for next week are reduced to a weekly bitmap, and each of its contiguous
+        windows is compared against the stored :class:`WeeklyAvailability` bitmap of each gamer. Gamers with
+        at least ``minimum_overlap`` minutes of overlap within one window (or the whole window if it is shorter)
+        are included in the returned queryset of GamerProfiles, as are gamers who have not specified any availability.
 
         This queryset can be subsequently used for filtering game lists, etc.
         """
@@ -126,80 +146,54 @@ class AvailableCalendarManager(CalendarManager):
             ),
             date=timezone.now(),
         ).next_week()
-        requestor_occurrences = query_range.get_occurrences()
-        matches = []
-        gamer_list_length = gamer_list.count()
-        logger.debug("Starting evaluation of {} gamers".format(gamer_list_length))
-        for occurrence in requestor_occurrences:
-            conflicts = self.check_availability(
-                gamer_list, occurrence.start, occurrence.end, minimum_overlap=150
-            )
-            if (conflicts and len(conflicts) < gamer_list_length) or not conflicts:
-                logger.debug(
-                    "There is at least one match here. Adding gamer(s) to match list."
-                )
-                match_list = gamer_list.exclude(
-                    id__in=[item["gamer"].pk for item in conflicts]
-                )
-                logger.debug("Appening {} gamers".format(match_list.count()))
-                matches.append(match_list)
-                gamer_list = gamer_list.filter(
-                    id__in=[item["gamer"].pk for item in conflicts]
-                )
-                gamer_list_length = gamer_list.count()
-                logger.debug(
-                    "New list of gamers to evaluate is {}".format(gamer_list_length)
-                )
-                if gamer_list_length == 0:
-                    break
-        logger.debug("{} matches in list".format(len(matches)))
-        if len(matches) > 1:
-            logger.debug("Executing unions")
-            qs1 = matches.pop()
-            for item in matches:
-                qs1 = qs1.union(item)
-            return qs1
-        if len(matches) == 1:
-            logger.debug("Grabbing queryset")
-            return matches[0]
-        return matches
+        windows = availability.build_window_masks(
+            availability.mask_for_occurrences(query_range.get_occurrences()),
+            minimum_overlap,
+        )
+        if not windows:
+            logger.debug("Requestor has no availability defined, so nothing can match.")
+            return gamer_list.none()
+        bitmaps = WeeklyAvailability.objects.get_bitmaps_for_gamers(gamer_list)
+        logger.debug("Starting evaluation of {} gamers".format(len(bitmaps)))
+        matching_ids = [
+            gamer_id
+            for gamer_id, bitmap in bitmaps.items()
+            if not bitmap or availability.mask_matches_windows(bitmap, windows)
+        ]
+        logger.debug("{} matches in list".format(len(matching_ids)))
+        return gamer_list.filter(id__in=matching_ids)
 
     def check_availability(self, gamer_list, start, end, minimum_overlap=None):
         """
         For a given gamer list and two timezone aware datetimes,
         evaluate whether it falls within their availability. Assumes that the whole
-        time must fit within the schedule.
+        time must fit within the schedule unless a minimum overlap in minutes is supplied.
+        Gamers are screened with their availability bitmaps, and only those that
+        conflict have their calendar checked for the specific conflicting windows.
         :returns: A list of dicts containing the gamer and the conflict., or any empty list
         if no conflicts.
         """
+        windows = availability.build_window_masks(
+            availability.mask_for_interval(start, end), minimum_overlap
+        )
+        gamer_list = list(gamer_list)
+        bitmaps = WeeklyAvailability.objects.get_bitmaps_for_gamers(gamer_list)
         conflict_list = []
-        matches = 0
         for gamer in gamer_list:
-            logger.debug("Evaluating for gamer {}".format(gamer))
-            cal = self.get_or_create_availability_calendar_for_gamer(gamer)
-            if (
-                cal.events.filter(
-                    end_recurring_period__isnull=True, rule__isnull=False
-                ).count()
-                == 0
-            ):
+            bitmap = bitmaps.get(gamer.id)
+            if not bitmap:
                 # Gamer has nothing set, which means ambiguous results. Include in matches.
                 logger.debug(
-                    "Gamer has specified no availability. Treat like an ambiguous match."
-                )
-                matches += 1
-            else:
-                result = cal.check_proposed_time(start, end, minimum_overlap)
-                if result:
-                    logger.debug("Received {} conflicts".format(len(result)))
-                    conflict_list.append({"gamer": gamer, "conflicts": result})
-                else:
-                    matches += 1
-                    logger.debug(
-                        "No conflicts for this gamer. Currently {} matching gamers".format(
-                            matches
-                        )
+                    "Gamer {} has specified no availability. Treat like an ambiguous match.".format(
+                        gamer
                     )
+                )
+            elif not availability.mask_matches_windows(bitmap, windows):
+                cal = self.get_or_create_availability_calendar_for_gamer(gamer)
+                conflicts = cal.check_proposed_time(start, end, minimum_overlap)
+                conflict_list.append(
+                    {"gamer": gamer, "conflicts": conflicts or ["No availability"]}
+                )
         logger.debug("Returning list of {} conflicts".format(len(conflict_list)))
         return conflict_list
 
@@ -333,6 +327,123 @@ class AvailableCalendar(Calendar):
         proxy = True
 
 
+class WeeklyAvailabilityManager(models.Manager):
+    """
+    Manager for building and fetching weekly availability bitmaps.
+    """
+
+    def build_for_calendar(self, gamer, calendar):
+        """
+        Return an unsaved availability record for the gamer computed from their availability
+        calendar, so that callers can write several at once.
+        """
+        bitmap = availability.mask_for_occurrences(calendar.get_next_week_occurrences())
+        return self.model(
+            gamer=gamer,
+            bitmap=bitmap,
+            overlap_bitmap=availability.erode(
+                bitmap,
+                availability.slots_for_minutes(availability.DEFAULT_MINIMUM_OVERLAP),
+            ),
+        )
+
+    def rebuild_for_gamer(self, gamer, calendar=None):
+        """
+        Recalculate the bitmap for the given gamer from their availability calendar.
+        """
+        if not calendar:
+            calendar = AvailableCalendar.objects.get_or_create_availability_calendar_for_gamer(
+                gamer
+            )
+        built = self.build_for_calendar(gamer, calendar)
+        weekly_availability, created = self.update_or_create(
+            gamer=gamer,
+            defaults={"bitmap": built.bitmap, "overlap_bitmap": built.overlap_bitmap},
+        )
+        logger.debug(
+            "Rebuilt availability bitmap for {} with {} available slots".format(
+                gamer, availability.popcount(built.bitmap)
+            )
+        )
+        return weekly_availability
+
+    def get_bitmaps_for_gamers(self, gamer_list):
+        """
+        Return a dict of gamer id to bitmap for every gamer in the list. Gamers without a
+        record get an empty bitmap, which is treated as having no availability set; missing
+        records are backfilled by the rebuild task rather than on read.
+        """
+        if isinstance(gamer_list, models.QuerySet):
+            gamer_ids = list(gamer_list.values_list("id", flat=True))
+        else:
+            gamer_ids = [gamer.id for gamer in gamer_list]
+        bitmaps = dict(
+            self.filter(gamer_id__in=gamer_ids).values_list("gamer_id", "bitmap")
+        )
+        return {gamer_id: bitmaps.get(gamer_id, 0) for gamer_id in gamer_ids}
+
+    def overlapping(self, bitmap):
+        """
+        Return a queryset of the availability records that overlap the supplied bitmap by at least
+        the default minimum overlap for one of its windows (or the whole window if it is shorter).
+        The comparison is done in the database so that it can be used as a subquery for other filters.
+        """
+        run_length = availability.slots_for_minutes(
+            availability.DEFAULT_MINIMUM_OVERLAP
+        )
+        long_windows = 0
+        overlap_q = Q()
+        annotations = {}
+        for index, run in enumerate(availability.split_runs(bitmap)):
+            if availability.popcount(run) >= run_length:
+                long_windows |= availability.erode(run, run_length)
+            else:
+                # Short windows must fit completely within the gamer's availability.
+                key = "window_{}".format(index)
+                annotations[key] = F("bitmap").bitand(
+                    Value(run, output_field=availability.WeeklyBitmapField())
+                )
+                overlap_q |= Q(**{key: run})
+        if long_windows:
+            annotations["long_windows"] = F("overlap_bitmap").bitand(
+                Value(long_windows, output_field=availability.WeeklyBitmapField())
+            )
+            overlap_q |= ~Q(long_windows=0)
+        if not annotations:
+            return self.none()
+        return self.annotate(**annotations).filter(overlap_q)
+
+
+class WeeklyAvailability(TimeStampedModel):
+    """
+    A compact representation of a gamer's recurring weekly availability, used for bulk matching.
+    Each bit represents a 15 minute slot of the week in UTC, starting on Monday.
+    """
+
+    gamer = models.OneToOneField(
+        GamerProfile, on_delete=models.CASCADE, related_name="weekly_availability"
+    )
+    bitmap = availability.WeeklyBitmapField(default=0)
+    overlap_bitmap = availability.WeeklyBitmapField(
+        default=0,
+        help_text=_(
+            "The bitmap eroded to the slots that begin a run long enough for the default minimum overlap."
+        ),
+    )
+
+    objects = WeeklyAvailabilityManager()
+
+    def __str__(self):
+        return "Weekly availability for {}".format(self.gamer)
+
+    @property
+    def available_minutes(self):
+        return availability.popcount(self.bitmap) * availability.SLOT_MINUTES
+
+    class Meta:
+        verbose_name_plural = "Weekly availability"
+
+
 class GameEventRelation(EventRelation):
     """
     Override to make sure that we can fetch GameEvent objects.
@@ -345,11 +456,126 @@ class GameEventRelation(EventRelation):
 
 
 class GameEventManager(EventManager):
+    def with_master_event_ids(self):
+        """
+        Annotate the master event id, so that events fetched in bulk can answer if they are
+        player events without a query each.
+        """
+        return self.annotate(master_event_pk=F("master_event_link__master_event_id"))
+
     def get_for_object(self, content_object, distinction="", inherit=True):
         return GameEventRelation.objects.get_events_for_object(
             content_object, distinction=distinction, inherit=inherit
         )  # pragma: no cover
 
+    def get_related_game_slugs(self, event_ids):
+        """
+        Bulk version of :meth:`GameEvent.get_related_game` that resolves the slug of the
+        game each event belongs to, including the events for ad hoc sessions.
+
+        :returns: dict -- Event id to game slug. Events not tied to a game are omitted.
+        """
+        event_ids = set(event_ids)
+        master_ids = {event_id: event_id for event_id in event_ids}
+        master_ids.update(
+            MasterEventLink.objects.filter(event_id__in=event_ids).values_list(
+                "event_id", "master_event_id"
+            )
+        )
+        game_slugs = dict(
+            GamePosting.objects.filter(event_id__in=master_ids.values()).values_list(
+                "event_id", "slug"
+            )
+        )
+        missing_ids = set(master_ids.values()) - set(game_slugs.keys())
+        if missing_ids:
+            game_slugs.update(
+                GameSession.objects.filter(
+                    session_type="adhoc", occurrence__event_id__in=missing_ids
+                ).values_list("occurrence__event_id", "game__slug")
+            )
+        return {
+            event_id: game_slugs[master_id]
+            for event_id, master_id in master_ids.items()
+            if master_id in game_slugs
+        }
+
+    def for_calendar(self, calendar):
+        """
+        Return the events shown on a calendar. With virtual player calendars enabled, the
+        player copies are replaced by the master events of the games the owner plays in and
+        of the ad hoc sessions they are expected at.
+        """
+        if not virtual_player_calendars_enabled():
+            return self.filter(calendar=calendar)
+        child_ids = MasterEventLink.objects.filter(event__calendar=calendar).values(
+            "event_id"
+        )
+        game_event_ids = GamePosting.objects.filter(
+            players__username=calendar.slug, event__isnull=False
+        ).values("event_id")
+        adhoc_event_ids = GameSession.objects.filter(
+            session_type="adhoc",
+            players_expected__gamer__username=calendar.slug,
+            occurrence__isnull=False,
+        ).values("occurrence__event_id")
+        return self.filter(
+            (Q(calendar=calendar) & ~Q(id__in=child_ids))
+            | Q(id__in=game_event_ids)
+            | Q(id__in=adhoc_event_ids)
+        )
+
+    def get_events_by_calendar(self, calendars, start, end):
+        """
+        Fetch the events of each calendar that may have occurrences between start and end.
+
+        :returns: dict -- Calendar id to list of events.
+        """
+        range_q = Q(start__lte=end) & (
+            Q(end_recurring_period__gte=start) | Q(end_recurring_period__isnull=True)
+        )
+        events_by_calendar = {calendar.id: [] for calendar in calendars}
+        if virtual_player_calendars_enabled():
+            # Master events can appear on any number of calendars, so work out which calendars
+            # show each one first and then fetch all of them with a single query.
+            calendar_ids_by_slug = {
+                calendar.slug: calendar.id for calendar in calendars
+            }
+            shared_calendars = defaultdict(set)
+            for event_id, slug in itertools.chain(
+                GamePosting.objects.filter(
+                    players__username__in=calendar_ids_by_slug.keys(),
+                    event__isnull=False,
+                ).values_list("event_id", "players__username"),
+                GameSession.objects.filter(
+                    session_type="adhoc",
+                    players_expected__gamer__username__in=calendar_ids_by_slug.keys(),
+                    occurrence__isnull=False,
+                ).values_list(
+                    "occurrence__event_id", "players_expected__gamer__username"
+                ),
+            ):
+                shared_calendars[event_id].add(calendar_ids_by_slug[slug])
+            child_ids = MasterEventLink.objects.filter(
+                event__calendar__in=calendars
+            ).values("event_id")
+            for event in self.filter(
+                range_q,
+                (Q(calendar__in=calendars) & ~Q(id__in=child_ids))
+                | Q(id__in=list(shared_calendars.keys())),
+            ).select_related("calendar", "creator", "rule"):
+                calendar_ids = set(shared_calendars.get(event.id, ()))
+                if event.calendar_id in events_by_calendar:
+                    calendar_ids.add(event.calendar_id)
+                for calendar_id in calendar_ids:
+                    events_by_calendar[calendar_id].append(event)
+            return events_by_calendar
+        for event in self.filter(range_q, calendar__in=calendars).select_related(
+            "calendar", "creator", "rule"
+        ):
+            events_by_calendar[event.calendar_id].append(event)
+        return events_by_calendar
+
 
 class GameEvent(Event):
     """
@@ -359,13 +585,10 @@ class GameEvent(Event):
     objects = GameEventManager()
 
     def get_child_events(self):
-        ct = ContentType.objects.get_for_model(self)
         logger.debug("Fetching child events for event with id {}".format(self.id))
-        eventrelations = GameEventRelation.objects.filter(
-            content_type=ct, object_id=self.id, distinction="playerevent"
-        ).values_list("event__pk", flat=True)
-        logger.debug("Found {} event relations".format(eventrelations.count()))
-        return GameEvent.objects.filter(id__in=eventrelations)
+        return GameEvent.objects.with_master_event_ids().filter(
+            master_event_link__master_event_id=self.id
+        )
 
     def update_child_events(self):
         existing_events = self.get_child_events()
@@ -382,157 +605,178 @@ class GameEvent(Event):
             color_event=self.color_event,
         )
         logger.debug("Updated {} existing child events".format(updated_rows))
+        CalendarVersion.objects.bump(
+            existing_events.values_list("calendar_id", flat=True)
+        )
         return updated_rows
 
     def remove_child_events(self):
         logger.debug(
             "Received request to delete child events. Starting with retrieval of child events..."
         )
-        child_events = self.get_child_events()
-        if child_events.count() > 0:
-            num_deleted, details = child_events.delete()
+        child_event_ids = list(self.get_child_events().values_list("id", flat=True))
+        if child_event_ids:
+            details = DeletionPlan(event_ids=child_event_ids).execute()
             logger.debug(
-                "Deleted {} child events with details {}!".format(num_deleted, details)
+                "Deleted {} child events with details {}!".format(
+                    details["schedule.Event"], details
+                )
             )
-            return num_deleted
+            return details["schedule.Event"]
         return 0
 
     def generate_missing_child_events(self, calendarlist):
         """
         Check the list of players and for each, evaluate if the event
         already exists in their calendar. If not, create it.
+
+        The missing calendars are computed with a single query and the child
+        events and their relations are bulk created.
         """
+        if virtual_player_calendars_enabled():
+            logger.debug("Player calendars are virtual, no child events needed.")
+            return 0
         logger.debug(
             "Starting generation of missing child events for {} calendars...".format(
                 len(calendarlist)
             )
         )
-        events_added = 0
-        existing_events = self.get_child_events()
-        logger.debug("Found {} existing child events".format(existing_events.count()))
-        if calendarlist:
-            for calendar in calendarlist:
-                logger.debug("Evaluation calendar for {}".format(calendar.slug))
-                user = GamerProfile.objects.get(username=calendar.slug).user
-                if not existing_events.filter(calendar=calendar):
-                    logger.debug("Event missing from this calendar, creating")
-                    with transaction.atomic():
-                        logger.debug("Generating child event first...")
-                        child_event = type(self).objects.create(
-                            start=self.start,
-                            end=self.end,
-                            title=self.title,
-                            description=self.description,
-                            creator=user,
-                            rule=self.rule,
-                            end_recurring_period=self.end_recurring_period,
-                            calendar=calendar,
-                            color_event=self.color_event,
-                        )
-                        logger.debug(
-                            "Created event with pk of {}".format(child_event.pk)
-                        )
-                        logger.debug(
-                            "Now creating event relation back to master event..."
-                        )
-                        ch_rel = GameEventRelation.objects.create_relation(
-                            event=child_event,
-                            content_object=self,
-                            distinction="playerevent",
-                        )
-                        logger.debug(
-                            "Created event relation {} to master event {} for child event {}".format(
-                                ch_rel.pk, self.pk, child_event.pk
-                            )
-                        )
-                        logger.debug(
-                            "Added event {} for calendar {}".format(
-                                child_event.title, calendar.slug
-                            )
-                        )
-                        events_added += 1
-        return events_added
+        if not calendarlist:
+            return 0
+        existing_calendar_ids = set(
+            self.get_child_events()
+            .filter(calendar__in=calendarlist)
+            .values_list("calendar_id", flat=True)
+        )
+        logger.debug(
+            "Found {} calendars with existing child events".format(
+                len(existing_calendar_ids)
+            )
+        )
+        missing_calendars = [
+            calendar
+            for calendar in calendarlist
+            if calendar.id not in existing_calendar_ids
+        ]
+        if not missing_calendars:
+            return 0
+        user_ids = dict(
+            GamerProfile.objects.filter(
+                username__in=[calendar.slug for calendar in missing_calendars]
+            ).values_list("username", "user_id")
+        )
+        for calendar in missing_calendars:
+            if calendar.slug not in user_ids:
+                raise GamerProfile.DoesNotExist(
+                    "No gamer found for calendar {}".format(calendar.slug)
+                )
+        with transaction.atomic():
+            logger.debug("Generating {} child events...".format(len(missing_calendars)))
+            child_events = type(self).objects.bulk_create(
+                [
+                    type(self)(
+                        start=self.start,
+                        end=self.end,
+                        title=self.title,
+                        description=self.description,
+                        creator_id=user_ids[calendar.slug],
+                        rule=self.rule,
+                        end_recurring_period=self.end_recurring_period,
+                        calendar=calendar,
+                        color_event=self.color_event,
+                    )
+                    for calendar in missing_calendars
+                ]
+            )
+            logger.debug("Now creating event relations back to master event...")
+            content_type = ContentType.objects.get_for_model(self)
+            GameEventRelation.objects.bulk_create(
+                [
+                    GameEventRelation(
+                        event=child_event,
+                        content_type=content_type,
+                        object_id=self.id,
+                        distinction="playerevent",
+                    )
+                    for child_event in child_events
+                ]
+            )
+            MasterEventLink.objects.bulk_create(
+                [
+                    MasterEventLink(event=child_event, master_event=self)
+                    for child_event in child_events
+                ]
+            )
+            for child_event in child_events:
+                child_event.master_event_pk = self.id
+            CalendarVersion.objects.bump(
+                [calendar.id for calendar in missing_calendars]
+            )
+        logger.debug(
+            "Added {} child events for master event {}".format(
+                len(child_events), self.pk
+            )
+        )
+        return len(child_events)
 
     @property
     def child_events(self):
         return self.get_child_events()
 
     def delete(self, *args, **kwargs):
+        """
+        Delete the event along with its child events, occurrences and links using a
+        :class:`~looking_for_group.games.deletion.DeletionPlan`.
+        """
         logger.debug("entered delete method for event with id {}".format(self.id))
-        logger.debug("Testing to see if this is a master event...")
-        if self.is_master_event() and self.get_child_events().count() > 0:
-            with transaction.atomic():
-                logger.debug(
-                    "This is bad news. This is a master event with child events. This should have been handled separately."
-                )
-                logger.debug("Starting deletion of occurrences in child events...")
-                for event in self.get_child_events():
-                    occ_deleted, details = Occurrence.objects.filter(
-                        event=event
-                    ).delete()
-                    logger.debug(
-                        "Deleted {} occurrence records with details {}".format(
-                            occ_deleted, details
-                        )
-                    )
-                    logger.debug("Now deleting child event with id {}".format(event.id))
-                    event.delete()
-                    logger.debug("Child event deleted!")
-        else:
+        details = DeletionPlan(event_ids=[self.pk]).execute()
+        deleted = {
+            label: count for label, count in details.items() if "(updated)" not in label
+        }
+        self.id = None
+        return sum(deleted.values()), deleted
+
+    def get_master_event_id(self):
+        """
+        Return the id of the master event if this is a player event, otherwise None.
+        Events fetched with :meth:`GameEventManager.with_master_event_ids` already carry the
+        answer, so other events need a query, which is then cached on the instance.
+        """
+        if not hasattr(self, "master_event_pk"):
             logger.debug(
-                "This is either a child event or a master event with no descendants."
+                "Looking up master event link for event with id {}".format(self.id)
             )
-        logger.debug("Removing child occurrences")
-        occ_deleted, details = Occurrence.objects.filter(event=self).delete()
-        logger.debug(
-            "Deleted {} occurrence related records with details {}".format(
-                occ_deleted, details
+            self.master_event_pk = (
+                MasterEventLink.objects.filter(event_id=self.id)
+                .values_list("master_event_id", flat=True)
+                .first()
             )
-        )
-        logger.debug("Proceeding with normal delete...")
-        return super().delete(*args, **kwargs)
+        return self.master_event_pk
 
     def get_master_event(self):
-        ct = ContentType.objects.get_for_model(self)
-        try:
-            logger.debug(
-                "Trying to find an event relation from event with id {} to a master event...".format(
-                    self.id
-                )
-            )
-            mastereventrelation = GameEventRelation.objects.get(
-                event=self, content_type=ct, distinction="playerevent"
-            )
-        except ObjectDoesNotExist:
-            logger.debug("No corresponding relation found, returning false")
+        master_event_id = self.get_master_event_id()
+        if not master_event_id:
+            logger.debug("No corresponding master event found, returning false")
             return False
-        masterevent = mastereventrelation.content_object
         logger.debug(
             "Returning master event with id {} for child event {}".format(
-                masterevent.id, self.id
+                master_event_id, self.id
             )
         )
-        return masterevent
+        return GameEvent.objects.get(id=master_event_id)
 
     @property
     def master_event(self):
         return self.get_master_event()
 
     def get_related_game(self):
-        if self.is_master_event():
-            return GamePosting.objects.get(event=self)
-        return GamePosting.objects.get(event=self.get_master_event())
+        return GamePosting.objects.get(event_id=self.get_master_event_id() or self.id)
 
     def get_location(self):
         return self.get_related_game().game_location
 
     def is_master_event(self):
-        logger.debug("Checking if this event has a master event.")
-        if not self.get_master_event():
-            logger.debug("This does not have a master event, so it IS a master event.")
-            return True
-        logger.debug("This is a child event.")
-        return False
+        return not self.get_master_event_id()
 
     def is_player_event(self):
         if self.is_master_event():
@@ -543,6 +787,26 @@ class GameEvent(Event):
         proxy = True
 
 
+class MasterEventLink(models.Model):
+    """
+    Denormalized link from a player event to its master event. Mirrors the ``playerevent``
+    :class:`GameEventRelation` so the role of an event can be found with a plain join.
+    Events without a link are master events.
+    """
+
+    event = models.OneToOneField(
+        Event, on_delete=models.CASCADE, related_name="master_event_link"
+    )
+    master_event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="player_event_links"
+    )
+
+    def __str__(self):
+        return "Event {} is a copy of event {}".format(
+            self.event_id, self.master_event_id
+        )
+
+
 class ChildOccurenceLink(models.Model):
     """
     An object to help keep a player occurrence linked to the master event occurrence.
@@ -560,6 +824,458 @@ class ChildOccurenceLink(models.Model):
         unique_together = ["master_event_occurence", "child_event_occurence"]
 
 
+class OccurrenceHorizonManager(models.Manager):
+    def get_default_window(self, now=None):
+        """
+        Return the start and end of the window that should currently be materialized.
+        """
+        if not now:
+            now = timezone.now()
+        return (
+            now - timedelta(days=OCCURRENCE_LOOKBACK_DAYS),
+            now + timedelta(days=OCCURRENCE_HORIZON_DAYS),
+        )
+
+    def covering(self, event_ids, start, end):
+        """
+        Return the ids of the events whose materialized occurrences cover the whole range.
+        """
+        return set(
+            self.filter(
+                event_id__in=event_ids, start__lte=start, end__gte=end
+            ).values_list("event_id", flat=True)
+        )
+
+
+class OccurrenceHorizon(models.Model):
+    """
+    Records the range of time for which an event's occurrences have been materialized.
+    """
+
+    event = models.OneToOneField(
+        Event, on_delete=models.CASCADE, related_name="occurrence_horizon"
+    )
+    start = models.DateTimeField(db_index=True)
+    end = models.DateTimeField(db_index=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = OccurrenceHorizonManager()
+
+    def __str__(self):
+        return "Occurrences for event {} from {} to {}".format(
+            self.event_id, self.start, self.end
+        )
+
+
+class MaterializedOccurrenceManager(models.Manager):
+    """
+    Maintains and reads the materialized occurrences for events so that calendar reads
+    are range scans rather than expansions of the recurrence rules.
+    """
+
+    def row_from_occurrence(self, event, occurrence):
+        return self.model(
+            event_id=event.id,
+            calendar_id=event.calendar_id,
+            occurrence_id=occurrence.id,
+            title=occurrence.title,
+            description=occurrence.description,
+            start=occurrence.start,
+            end=occurrence.end,
+            original_start=occurrence.original_start,
+            original_end=occurrence.original_end,
+            cancelled=occurrence.cancelled,
+        )
+
+    def materialize_event(self, event, start=None, end=None, clear_prefetch=True):
+        """
+        Discard and regenerate the materialized occurrences of a single event.
+
+        :param event: The :class:`schedule.models.Event` to materialize.
+        :param start: Start of the window. Defaults to the current horizon.
+        :param end: End of the window. Defaults to the current horizon.
+        :returns: int -- The number of occurrences stored.
+        """
+        default_start, default_end = OccurrenceHorizon.objects.get_default_window()
+        start = start or default_start
+        end = end or default_end
+        rows = [
+            self.row_from_occurrence(event, occurrence)
+            for occurrence in event.get_occurrences(
+                start, end, clear_prefetch=clear_prefetch
+            )
+        ]
+        with transaction.atomic():
+            self.filter(event_id=event.id).delete()
+            self.bulk_create(rows, ignore_conflicts=True)
+            OccurrenceHorizon.objects.update_or_create(
+                event_id=event.id, defaults={"start": start, "end": end}
+            )
+        logger.debug(
+            "Materialized {} occurrences for event {}".format(len(rows), event.id)
+        )
+        return len(rows)
+
+    def extend_event(self, event, horizon, start, end):
+        """
+        Move an existing horizon forward, dropping the rows that have fallen out of it and only
+        expanding the recurrence rule for the newly covered time.
+
+        :returns: int -- The number of occurrences added.
+        """
+        rows = []
+        if end > horizon.end:
+            rows = [
+                self.row_from_occurrence(event, occurrence)
+                for occurrence in event.get_occurrences(
+                    horizon.end, end, clear_prefetch=False
+                )
+            ]
+        with transaction.atomic():
+            self.filter(event_id=event.id, end__lt=start).delete()
+            self.bulk_create(rows, ignore_conflicts=True)
+            horizon.start = start
+            horizon.end = max(end, horizon.end)
+            horizon.save()
+        return len(rows)
+
+    def invalidate_events(self, event_ids):
+        """
+        Throw away the materialized occurrences for the events so that reads fall back
+        to expanding their rules until they are materialized again.
+        """
+        with transaction.atomic():
+            OccurrenceHorizon.objects.filter(event_id__in=event_ids).delete()
+            deleted, details = self.filter(event_id__in=event_ids).delete()
+        logger.debug("Invalidated {} materialized occurrences".format(deleted))
+        return deleted
+
+    def sync_occurrence(self, occurrence):
+        """
+        Replace the row for a persisted occurrence that has been moved, cancelled, or edited.
+        """
+        try:
+            horizon = OccurrenceHorizon.objects.get(event_id=occurrence.event_id)
+        except ObjectDoesNotExist:
+            return  # Nothing materialized for this event yet.
+        with transaction.atomic():
+            self.filter(
+                event_id=occurrence.event_id, original_start=occurrence.original_start
+            ).delete()
+            if occurrence.start < horizon.end and occurrence.end >= horizon.start:
+                self.row_from_occurrence(occurrence.event, occurrence).save()
+
+    def sync_occurrences(self, occurrences):
+        """
+        Bulk version of :meth:`sync_occurrence` for occurrences that were created or edited
+        in bulk, and so skipped the occurrence receivers. Expects the events to be selected
+        with the occurrences.
+
+        :returns: int -- The number of rows stored.
+        """
+        occurrences = list(occurrences)
+        horizons = {
+            horizon.event_id: horizon
+            for horizon in OccurrenceHorizon.objects.filter(
+                event_id__in={occurrence.event_id for occurrence in occurrences}
+            )
+        }
+        occurrences = [
+            occurrence for occurrence in occurrences if occurrence.event_id in horizons
+        ]
+        if not occurrences:
+            return 0  # Nothing materialized for these events yet.
+        original_starts = {
+            (occurrence.event_id, occurrence.original_start)
+            for occurrence in occurrences
+        }
+        stale_ids = [
+            row_id
+            for row_id, event_id, original_start in self.filter(
+                event_id__in={event_id for event_id, start in original_starts},
+                original_start__in={start for event_id, start in original_starts},
+            ).values_list("id", "event_id", "original_start")
+            if (event_id, original_start) in original_starts
+        ]
+        rows = [
+            self.row_from_occurrence(occurrence.event, occurrence)
+            for occurrence in occurrences
+            if occurrence.start < horizons[occurrence.event_id].end
+            and occurrence.end >= horizons[occurrence.event_id].start
+        ]
+        with transaction.atomic():
+            self.filter(id__in=stale_ids).delete()
+            self.bulk_create(rows, ignore_conflicts=True)
+        return len(rows)
+
+    def link_occurrences(self, occurrences):
+        """
+        Bulk version of :meth:`sync_occurrence` for occurrences that were just persisted
+        unchanged, which only need their materialized rows pointed at them.
+
+        :returns: int -- The number of rows linked.
+        """
+        occurrence_ids = {
+            (occurrence.event_id, occurrence.original_start): occurrence.id
+            for occurrence in occurrences
+        }
+        if not occurrence_ids:
+            return 0
+        rows = []
+        for row in self.filter(
+            event_id__in={event_id for event_id, start in occurrence_ids.keys()},
+            original_start__in={start for event_id, start in occurrence_ids.keys()},
+        ):
+            occurrence_id = occurrence_ids.get((row.event_id, row.original_start))
+            if occurrence_id and row.occurrence_id != occurrence_id:
+                row.occurrence_id = occurrence_id
+                rows.append(row)
+        self.bulk_update(rows, ["occurrence"])
+        return len(rows)
+
+    def get_occurrences_for_events(self, events, start, end):
+        """
+        Fetch the occurrences of a list of events in a range with a single query where possible,
+        falling back to expanding the rules of events that have not been materialized for the range.
+
+        :returns: dict -- Event id to list of :class:`schedule.models.Occurrence`.
+        """
+        events_by_id = {event.id: event for event in events}
+        covered_ids = OccurrenceHorizon.objects.covering(
+            events_by_id.keys(), start, end
+        )
+        result = {event_id: [] for event_id in events_by_id.keys()}
+        if covered_ids:
+            for row in self.filter(
+                event_id__in=covered_ids, start__lt=end, end__gte=start
+            ).order_by("start"):
+                result[row.event_id].append(
+                    row.to_occurrence(events_by_id[row.event_id])
+                )
+        for event_id, event in events_by_id.items():
+            if event_id not in covered_ids:
+                result[event_id] = event.get_occurrences(start, end)
+        return result
+
+    def occurrences_after(self, event, after=None):
+        """
+        Equivalent of :meth:`schedule.models.Event.occurrences_after`, reading from the
+        materialized rows while inside the horizon.
+        """
+        if after is None:
+            after = timezone.now()
+        try:
+            horizon = OccurrenceHorizon.objects.get(
+                event_id=event.id, start__lte=after, end__gte=after
+            )
+        except ObjectDoesNotExist:
+            yield from event.occurrences_after(after=after)
+            return
+        for row in self.filter(
+            event_id=event.id, end__gt=after, start__lt=horizon.end
+        ).order_by("start"):
+            yield row.to_occurrence(event)
+        for occurrence in event.occurrences_after(after=horizon.end):
+            if occurrence.start >= horizon.end:
+                yield occurrence
+
+    def calendar_occurrences_after(self, calendar, after=None):
+        """
+        Equivalent of :meth:`schedule.models.Calendar.occurrences_after`, reading from the
+        materialized rows while every event in the calendar is inside its horizon.
+        """
+        if after is None:
+            after = timezone.now()
+        events = list(GameEvent.objects.for_calendar(calendar))
+        horizons = list(
+            OccurrenceHorizon.objects.filter(
+                event__in=events, start__lte=after, end__gte=after
+            ).values_list("end", flat=True)
+        )
+        if not events or len(horizons) < len(events):
+            yield from EventListManager(events).occurrences_after(after)
+            return
+        horizon_end = min(horizons)
+        events_by_id = {event.id: event for event in events}
+        for row in self.filter(
+            event_id__in=events_by_id.keys(), end__gt=after, start__lt=horizon_end
+        ).order_by("start"):
+            yield row.to_occurrence(events_by_id[row.event_id])
+        for occurrence in EventListManager(events).occurrences_after(horizon_end):
+            if occurrence.start >= horizon_end:
+                yield occurrence
+
+
+class MaterializedOccurrence(models.Model):
+    """
+    A precomputed occurrence of an event within its :class:`OccurrenceHorizon`.
+    Includes the changes from any persisted :class:`schedule.models.Occurrence`.
+    """
+
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="materialized_occurrences"
+    )
+    calendar = models.ForeignKey(
+        Calendar, on_delete=models.CASCADE, related_name="materialized_occurrences"
+    )
+    occurrence = models.ForeignKey(
+        Occurrence,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        help_text=_("The persisted occurrence, if one exists."),
+    )
+    title = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    original_start = models.DateTimeField()
+    original_end = models.DateTimeField()
+    cancelled = models.BooleanField(default=False)
+
+    objects = MaterializedOccurrenceManager()
+
+    def __str__(self):
+        return "{}: {} to {}".format(self.title, self.start, self.end)
+
+    def to_occurrence(self, event):
+        """
+        Convert back into the occurrence object that django-scheduler would have generated.
+        """
+        return Occurrence(
+            id=self.occurrence_id,
+            event=event,
+            title=self.title,
+            description=self.description,
+            start=self.start,
+            end=self.end,
+            original_start=self.original_start,
+            original_end=self.original_end,
+            cancelled=self.cancelled,
+        )
+
+    class Meta:
+        index_together = [["calendar", "start"], ["event", "start"]]
+        unique_together = ["event", "original_start"]
+
+
+class CalendarVersionManager(models.Manager):
+    def get_for_calendar(self, calendar):
+        version, created = self.get_or_create(calendar=calendar)
+        return version
+
+    def bump(self, calendar_ids):
+        """
+        Increment the version of the calendars so any cached responses for them are discarded.
+        Calendars without a version record have never been served, so there is nothing to bump.
+        """
+        calendar_ids = {calendar_id for calendar_id in calendar_ids if calendar_id}
+        if not calendar_ids:
+            return 0
+        return self.filter(calendar_id__in=calendar_ids).update(
+            version=F("version") + 1, modified=timezone.now()
+        )
+
+    def bump_virtual_calendars(self, event_ids):
+        """
+        With virtual player calendars, the players of a game see its master events without
+        holding a copy, so their calendars are bumped whenever those events change.
+        """
+        if not virtual_player_calendars_enabled():
+            return 0
+        event_ids = {event_id for event_id in event_ids if event_id}
+        if not event_ids:
+            return 0
+        usernames = set(
+            GamePosting.objects.filter(event_id__in=event_ids).values_list(
+                "players__username", flat=True
+            )
+        )
+        usernames.update(
+            GameSession.objects.filter(
+                session_type="adhoc", occurrence__event_id__in=event_ids
+            ).values_list("players_expected__gamer__username", flat=True)
+        )
+        return self.bump_for_usernames(usernames)
+
+    def bump_for_events(self, event_ids):
+        """
+        Increment the version of every calendar that shows the given master events, whether
+        it holds the event itself, a player copy of it, or displays it virtually.
+        """
+        event_ids = {event_id for event_id in event_ids if event_id}
+        if not event_ids:
+            return 0
+        calendar_ids = Event.objects.filter(
+            Q(id__in=event_ids) | Q(master_event_link__master_event_id__in=event_ids)
+        ).values_list("calendar_id", flat=True)
+        return self.bump(calendar_ids) + self.bump_virtual_calendars(event_ids)
+
+    def bump_for_usernames(self, usernames):
+        """
+        Increment the version of the primary calendars of the given gamers.
+        """
+        usernames = {username for username in usernames if username}
+        if not usernames:
+            return 0
+        return self.filter(calendar__slug__in=usernames).update(
+            version=F("version") + 1, modified=timezone.now()
+        )
+
+
+class CalendarVersion(models.Model):
+    """
+    A counter that changes whenever an event or occurrence in a calendar changes.
+    Used to validate and cache the responses for calendar feeds.
+    """
+
+    calendar = models.OneToOneField(
+        Calendar, on_delete=models.CASCADE, related_name="version_record"
+    )
+    version = models.PositiveIntegerField(default=1)
+    modified = models.DateTimeField(default=timezone.now)
+
+    objects = CalendarVersionManager()
+
+    def __str__(self):
+        return "Version {} of calendar {}".format(self.version, self.calendar_id)
+
+    def get_etag(self, *args):
+        """
+        Return an etag for a response built from this version of the calendar and any extra arguments.
+        """
+        key = ":".join(str(arg) for arg in (self.calendar_id, self.version) + args)
+        return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def get_or_create_calendars_for_gamers(gamers):
+    """
+    Return the primary calendar of each gamer in the same order, creating any missing
+    calendars in a single query.
+    """
+    usernames = [gamer.username for gamer in gamers]
+    calendars = {
+        calendar.slug: calendar
+        for calendar in Calendar.objects.filter(slug__in=usernames)
+    }
+    missing = [username for username in usernames if username not in calendars]
+    if missing:
+        Calendar.objects.bulk_create(
+            [
+                Calendar(slug=username, name="{}'s Calendar".format(username))
+                for username in missing
+            ],
+            ignore_conflicts=True,
+        )
+        calendars.update(
+            {
+                calendar.slug: calendar
+                for calendar in Calendar.objects.filter(slug__in=missing)
+            }
+        )
+    return [calendars[username] for username in usernames]
+
+
 def get_rules_as_tuple(*args, **kwargs):
     """
     Lazily extract the rules from the database and provide as a tuple.
@@ -617,6 +1333,16 @@ CHARACTER_STATUS_CHOICES = (
     ("inactive", _("Inactive (or deceased)")),
 )
 
+# The game fields that are mirrored onto its event.
+GAME_EVENT_FIELDS = [
+    "start_time",
+    "session_length",
+    "end_date",
+    "game_frequency",
+    "title",
+    "game_description",
+]
+
 SESSION_STATUS_CHOICES = (
     ("pending", _("Scheduled")),
     ("cancel", _("Cancelled")),
@@ -635,6 +1361,76 @@ SESSION_TYPE_CHOICES = (("normal", "Normal"), ("adhoc", "Ad hoc"))
 
 
 # Create your models here.
+class GamePostingQuerySet(models.QuerySet):
+    def visible_to(self, gamer):
+        """
+        Narrow to the games the gamer can see: public games, games they GM or play in,
+        and community games whose GM is their friend or that are posted to one of
+        their communities. Each relationship is checked with an ``EXISTS`` subquery, so
+        no rows are duplicated and nothing is loaded into Python.
+        """
+        community_games = Q(privacy_level="community") & (
+            Q(visible_as_friend=True) | Q(visible_in_community=True)
+        )
+        return self.annotate(
+            visible_as_player=Exists(
+                Player.objects.filter(game_id=OuterRef("pk"), gamer_id=gamer.pk)
+            ),
+            visible_as_friend=Exists(
+                GamerProfile.friends.through.objects.filter(
+                    from_gamerprofile_id=gamer.pk, to_gamerprofile_id=OuterRef("gm_id")
+                )
+            ),
+            visible_in_community=Exists(
+                GamePosting.communities.through.objects.filter(
+                    gameposting_id=OuterRef("pk"),
+                    gamercommunity_id__in=CommunityMembership.objects.filter(
+                        gamer_id=gamer.pk
+                    ).values("community_id"),
+                )
+            ),
+        ).filter(
+            Q(privacy_level="public")
+            | Q(gm_id=gamer.pk)
+            | Q(visible_as_player=True)
+            | community_games
+        )
+
+    def with_player_count(self):
+        """
+        Annotate the number of players in each game as ``current_player_count``.
+        """
+        return self.annotate(
+            current_player_count=_count_subquery(
+                Player.objects.filter(game_id=OuterRef("pk")), "game_id"
+            )
+        )
+
+    def with_gm_active_game_count(self):
+        """
+        Annotate the number of games the GM of each game is running that are not
+        cancelled or closed as ``gm_active_game_count``.
+        """
+        return self.annotate(
+            gm_active_game_count=_count_subquery(
+                GamePosting.objects.filter(gm_id=OuterRef("gm_id")).exclude(
+                    status__in=["cancel", "closed"]
+                ),
+                "gm_id",
+            )
+        )
+
+
+def _count_subquery(queryset, group_by):
+    """
+    A correlated subquery counting the rows of ``queryset``, or zero if there are none.
+    """
+    counts = (
+        queryset.order_by().values(group_by).annotate(count=Count("pk")).values("count")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
 class GamePosting(
     TimeStampedModel, AbstractUUIDWithSlugModel, AbstractTaggedLinkedModel, RulesModel
 ):
@@ -792,6 +1588,13 @@ class GamePosting(
         help_text=_("Which communities would you like to post this in? (Optional)"),
     )
     sessions = models.PositiveIntegerField(default=0)
+    next_session_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text=_("Cached start time of the next scheduled session."),
+    )
     players = models.ManyToManyField(GamerProfile, through="Player")
     event = models.ForeignKey(
         GameEvent,
@@ -801,6 +1604,19 @@ class GamePosting(
         on_delete=models.SET_NULL,
     )
     invites = GenericRelation(Invite)
+    tracker = FieldTracker(
+        fields=[
+            "gm",
+            "status",
+            "privacy_level",
+            "game_mode",
+            "game_location",
+            "event",
+            *GAME_EVENT_FIELDS,
+        ]
+    )
+
+    objects = GamePostingQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -812,14 +1628,7 @@ class GamePosting(
         """
         Generates any missing player calendars
         """
-        player_calendars = []
-        for player in self.players.all():
-            calendar, created = Calendar.objects.get_or_create(
-                slug=player.username,
-                defaults={"name": "{}'s Calendar".format(player.username)},
-            )
-            player_calendars.append(calendar)
-        return player_calendars
+        return get_or_create_calendars_for_gamers(self.players.all())
 
     def get_pending_applicant_count(self):
         return GamePostingApplication.objects.filter(
@@ -855,7 +1664,9 @@ class GamePosting(
                 )
                 logger.debug("Set new date cutoff of {}".format(date_cutoff))
             logger.debug("Checking for occurrences after {}".format(date_cutoff))
-            occurrences = self.event.occurrences_after(after=date_cutoff)
+            occurrences = MaterializedOccurrence.objects.occurrences_after(
+                self.event, after=date_cutoff
+            )
             next_occurrence = None
             try:
                 next_occurrence = next(occurrences)
@@ -869,13 +1680,24 @@ class GamePosting(
             return next_occurrence
         return None
 
+    def refresh_next_session_at(self, commit=True):
+        """
+        Recompute the cached start time of the next session. It is saved with an update
+        so that the save receivers for the game are not triggered again, which means its
+        cached fragments are discarded here.
+        """
+        next_occurrence = self.get_next_scheduled_session_occurrence()
+        self.next_session_at = next_occurrence.start if next_occurrence else None
+        if commit:
+            GamePosting.objects.filter(pk=self.pk).update(
+                next_session_at=self.next_session_at
+            )
+            fragments.bump_instance(self)
+        return self.next_session_at
+
     @property
     def next_session_time(self):
-        if self.event:
-            next_occurrence = self.get_next_scheduled_session_occurrence()
-            if next_occurrence:
-                return next_occurrence.start
-        return None
+        return self.next_session_at
 
     def get_next_session(self):
         if self.event:
@@ -931,16 +1753,23 @@ class GamePosting(
         )
 
     def update_completed_session_count(self):
+        """
+        Recount the completed sessions of this game. Day to day the count is kept up to
+        date by the session counter, so this only writes the field and does not call
+        ``save()``.
+        """
         self.sessions = GameSession.objects.filter(status="complete", game=self).count()
-        self.save()
+        GamePosting.objects.filter(pk=self.pk).update(sessions=self.sessions)
 
     def delete(self, *args, **kwargs):
-        if self.event:
-            async_task(remove_event_and_descendants, self.event)
-        return super().delete(*args, **kwargs)
+        with transaction.atomic():
+            DeletionPlan.for_games([self]).execute()
+            self.event = None
+            return super().delete(*args, **kwargs)
 
     class Meta:
         ordering = ["status", "start_time", "-end_date", "-created"]
+        index_together = [["modified", "id"]]
         verbose_name = "Game"
         verbose_name_plural = "Games"
         rules_permissions = {
@@ -1012,6 +1841,7 @@ class Player(TimeStampedModel, AbstractUUIDWithSlugModel, RulesModel):
     game = models.ForeignKey(GamePosting, on_delete=models.CASCADE)
     sessions_expected = models.PositiveIntegerField(default=0)
     sessions_missed = models.PositiveIntegerField(default=0)
+    tracker = FieldTracker(fields=["gamer"])
 
     def __str__(self):
         return str(self.gamer)
@@ -1077,6 +1907,7 @@ class Character(TimeStampedModel, AbstractUUIDWithSlugModel, RulesModel):
         return reverse_lazy("games:character_detail", kwargs={"character": self.slug})
 
     class Meta:
+        index_together = [["game", "modified", "id"]]
         rules_permissions = {
             "add": rules.is_game_member,
             "change": rules.is_character_editor,
@@ -1122,6 +1953,9 @@ class GameSession(TimeStampedModel, AbstractUUIDWithSlugModel, RulesModel):
     occurrence = models.ForeignKey(
         Occurrence, null=True, blank=True, on_delete=models.SET_NULL
     )
+    tracker = FieldTracker(
+        fields=["game", "status", "gm_notes", "scheduled_time", "occurrence"]
+    )
 
     def __str__(self):
         return "{} (session at {})".format(
@@ -1180,6 +2014,7 @@ class GameSession(TimeStampedModel, AbstractUUIDWithSlugModel, RulesModel):
             self.save()
 
     class Meta:
+        index_together = [["game", "scheduled_time", "id"]]
         rules_permissions = {
             "add": rules.is_game_gm,
             "change": rules.is_game_gm,
@@ -1217,6 +2052,7 @@ class AdventureLog(TimeStampedModel, AbstractUUIDWithSlugModel, RulesModel):
         related_name="latest_editor_logs",
         on_delete=models.SET_NULL,
     )
+    tracker = FieldTracker(fields=["body"])
 
     class Meta:
         rules_permissions = {
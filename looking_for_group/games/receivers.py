@@ -1,36 +1,67 @@
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import timedelta
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.db.models import F
-from django.db.models.signals import m2m_changed, post_save, pre_delete, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django_q.tasks import async_task
-from markdown import markdown
 from notifications.signals import notify
-from schedule.models import Calendar, Occurrence, Rule
+from schedule.models import Calendar, Event, EventRelation, Occurrence, Rule
 
-from . import models
+from . import models, visibility
+from .. import fragments
+from ..counters import StatusTransitionCounter, increment
+from ..gamer_profiles.models import CommunityMembership, GamerCommunity, GamerProfile
 from ..invites.models import Invite
 from ..invites.signals import invite_accepted
+from ..locations.models import Location
+from ..rendering import render_field
 from .signals import player_kicked, player_left
 from .tasks import (
     calculate_player_attendance,
     clear_calendar_for_departing_player,
     create_game_player_events,
+    materialize_event_occurrences,
     notify_subscribers_of_new_game,
+    refresh_next_session_for_events,
+    refresh_next_session_for_game,
     remove_event_and_descendants,
     sync_calendar_for_arriving_player,
     undo_player_attendence_for_incomplete_session,
     update_child_events_for_master,
     update_player_calendars_for_adhoc_session
 )
+from .utils import virtual_player_calendars_enabled
 
 logger = logging.getLogger("games")
 
+_cleanup_state = threading.local()
+
+
+@contextmanager
+def skip_departure_cleanup():
+    """
+    Skip the per player calendar cleanup and the next session refresh for players and
+    sessions deleted inside the block, for callers that remove the calendars and games
+    themselves. Rows deleted by a cascade are new instances, so this is tracked per thread
+    rather than on the instances.
+    """
+    previous = getattr(_cleanup_state, "skip", False)
+    _cleanup_state.skip = True
+    try:
+        yield
+    finally:
+        _cleanup_state.skip = previous
+
+
+def departure_cleanup_skipped():
+    return getattr(_cleanup_state, "skip", False)
+
 
 @receiver(pre_delete, sender=models.GameEvent)
 def remove_child_events_on_delete(sender, instance, *args, **kwargs):
@@ -68,32 +99,33 @@ def set_end_date_for_game_on_complete(sender, instance, *args, **kwargs):
 
 @receiver(pre_save, sender=models.GamePosting)
 def render_markdown_description(sender, instance, *args, **kwargs):
-    if instance.game_description:
-        instance.game_description_rendered = markdown(instance.game_description)
-    else:
-        instance.game_description_rendered = None
+    if not instance.tracker.has_changed("game_description") and (
+        instance.game_description_rendered or not instance.game_description
+    ):
+        return  # Nothing new to render.
+    render_field(instance, "game_description", "game_description_rendered")
 
 
 @receiver(pre_save, sender=models.GameSession)
 def render_markdown_notes(sender, instance, *args, **kwargs):
-    if instance.gm_notes:
-        instance.gm_notes_rendered = markdown(instance.gm_notes)
-    else:
-        instance.gm_notes_rendered = None
-    try:
-        old_copy = models.GameSession.objects.get(id=instance.pk)
-        if instance.status != "complete" and old_copy.status == "complete":
-            undo_player_attendence_for_incomplete_session(old_copy)
-    except ObjectDoesNotExist:
-        pass  # This is a new session so no need to worry.
+    if instance.tracker.has_changed("gm_notes") or (
+        instance.gm_notes and not instance.gm_notes_rendered
+    ):
+        render_field(instance, "gm_notes", "gm_notes_rendered")
+    if (
+        instance.status != "complete"
+        and instance.tracker.previous("status") == "complete"
+    ):
+        undo_player_attendence_for_incomplete_session(instance)
 
 
 @receiver(pre_save, sender=models.AdventureLog)
 def render_markdown_log_body(sender, instance, *args, **kwargs):
-    if instance.body:
-        instance.body_rendered = markdown(instance.body)
-    else:
-        instance.body_rendered = None
+    if not instance.tracker.has_changed("body") and (
+        instance.body_rendered or not instance.body
+    ):
+        return  # Nothing new to render.
+    render_field(instance, "body", "body_rendered")
 
 
 @receiver(post_save, sender=models.AdventureLog)
@@ -116,9 +148,13 @@ def notify_on_log_create_edit(sender, instance, created, *args, **kwargs):
             )
 
 
-@receiver(post_save, sender=models.GameSession)
-def update_complete_session_count(sender, instance, *args, **kwargs):
-    instance.game.update_completed_session_count()
+completed_session_counter = StatusTransitionCounter(
+    models.GameSession,
+    models.GamePosting,
+    "game",
+    status_field="status",
+    status_counters={"complete": "sessions"},
+).connect()
 
 
 @receiver(post_save, sender=models.GameSession)
@@ -132,6 +168,11 @@ def create_update_event_for_game(sender, instance, *args, **kwargs):
     """
     If the game has enough information to generate an event, check if one already exists and link to it.
     """
+    if instance.event_id and not any(
+        instance.tracker.has_changed(field) for field in models.GAME_EVENT_FIELDS
+    ):
+        logger.debug("No event fields have changed, so the event is left alone.")
+        return
     if instance.start_time and instance.session_length:
         if instance.game_frequency in ("na", "Custom"):
             frequency = None
@@ -181,6 +222,7 @@ def create_update_event_for_game(sender, instance, *args, **kwargs):
             if needs_edit:
                 logger.debug("Changes were made, saving.")
                 instance.event.save()
+                instance._materialize_event = True
             else:
                 logger.debug("No changes required.")
         else:
@@ -213,6 +255,7 @@ def create_update_event_for_game(sender, instance, *args, **kwargs):
                 rule=rule,
                 calendar=calendar,
             )
+            instance._materialize_event = True
     else:
         logger.debug("Insufficient data for an event.")
         if instance.event:
@@ -228,16 +271,32 @@ def create_update_event_for_game(sender, instance, *args, **kwargs):
 
 
 @receiver(post_save, sender=models.GamePosting)
-def update_games_created_count(sender, instance, created, *args, **kwargs):
-    if created:
-        instance.gm.games_created = F("games_created") + 1
-        instance.gm.save()
+def materialize_game_event_occurrences(sender, instance, *args, **kwargs):
+    """
+    Queue materialization of the event created or edited in pre_save once the game is committed.
+    """
+    if not getattr(instance, "_materialize_event", False):
+        return
+    instance._materialize_event = False
+    event = instance.event
+    transaction.on_commit(lambda: async_task(materialize_event_occurrences, event))
+
+
+games_created_counter = StatusTransitionCounter(
+    models.GamePosting,
+    models.GamerProfile,
+    "gm",
+    created_counter="games_created",
+    count_deletes=False,
+).connect()
 
 
 @receiver(post_save, sender=models.GameEvent)
 def update_child_events_when_master_event_updated(
     sender, instance, created, *args, **kwargs
 ):
+    models.CalendarVersion.objects.bump([instance.calendar_id])
+    models.CalendarVersion.objects.bump_virtual_calendars([instance.id])
     if not created:
         async_task(update_child_events_for_master, instance)
 
@@ -250,6 +309,8 @@ def create_player_events_as_needed(sender, instance, created, *args, **kwargs):
 
 @receiver(post_save, sender=Occurrence)
 def create_or_update_player_occurence(sender, instance, created, *args, **kwargs):
+    models.CalendarVersion.objects.bump([instance.event.calendar_id])
+    models.CalendarVersion.objects.bump_virtual_calendars([instance.event_id])
     async_task(
         "looking_for_group.games.tasks.create_or_update_linked_occurences_on_edit",
         instance,
@@ -257,6 +318,140 @@ def create_or_update_player_occurence(sender, instance, created, *args, **kwargs
     )
 
 
+@receiver(post_save, sender=Occurrence)
+def sync_materialized_occurrence(sender, instance, *args, **kwargs):
+    models.MaterializedOccurrence.objects.sync_occurrence(instance)
+
+
+@receiver(post_delete, sender=Occurrence)
+def invalidate_materialized_occurrences_on_occurrence_delete(
+    sender, instance, *args, **kwargs
+):
+    models.MaterializedOccurrence.objects.invalidate_events([instance.event_id])
+    models.CalendarVersion.objects.bump(
+        Event.objects.filter(id=instance.event_id).values_list("calendar_id", flat=True)
+    )
+    models.CalendarVersion.objects.bump_virtual_calendars([instance.event_id])
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=models.GameEvent)
+def bump_calendar_version_on_event_change(sender, instance, *args, **kwargs):
+    models.CalendarVersion.objects.bump([instance.calendar_id])
+    models.CalendarVersion.objects.bump_virtual_calendars([instance.id])
+
+
+@receiver(post_save, sender=models.GamePosting)
+def bump_calendar_version_on_game_location_change(
+    sender, instance, created, *args, **kwargs
+):
+    """
+    Calendar feeds show where a game is played, so every calendar with its events changes with it.
+    """
+    if created or not (
+        instance.tracker.has_changed("game_location")
+        or instance.tracker.has_changed("game_mode")
+    ):
+        return
+    event_ids = set(
+        models.GameSession.objects.filter(
+            game=instance, session_type="adhoc", occurrence__isnull=False
+        ).values_list("occurrence__event_id", flat=True)
+    )
+    event_ids.add(instance.event_id)
+    models.CalendarVersion.objects.bump_for_events(event_ids)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=models.GameEvent)
+def invalidate_materialized_occurrences_on_event_edit(
+    sender, instance, created, *args, **kwargs
+):
+    """
+    Any edit to an event may change its occurrences, so discard them until they are regenerated.
+    """
+    if not created:
+        models.MaterializedOccurrence.objects.invalidate_events([instance.id])
+
+
+# The fields that the cached next session time of a game depends on.
+NEXT_SESSION_GAME_FIELDS = ["status", "event", *models.GAME_EVENT_FIELDS]
+NEXT_SESSION_SESSION_FIELDS = ["status", "scheduled_time", "occurrence"]
+NEXT_SESSION_EVENT_FIELDS = {"start", "end", "rule", "end_recurring_period"}
+NEXT_SESSION_OCCURRENCE_FIELDS = {"start", "end", "cancelled"}
+
+
+def saved_fields_overlap(update_fields, fields):
+    """
+    Check if a save may have changed any of the fields, for models without a tracker.
+    """
+    return update_fields is None or bool(fields.intersection(update_fields))
+
+
+@receiver(post_save, sender=models.GamePosting)
+@receiver(post_save, sender=models.GameSession)
+@receiver(post_delete, sender=models.GameSession)
+def refresh_next_session_on_change(sender, instance, signal, *args, **kwargs):
+    """
+    Queue a refresh of the game's next session time, unless the save left every field
+    it depends on alone.
+    """
+    if departure_cleanup_skipped():
+        return
+    if sender == models.GamePosting:
+        game = instance
+        fields = NEXT_SESSION_GAME_FIELDS
+    else:
+        game = instance.game
+        fields = NEXT_SESSION_SESSION_FIELDS
+    if signal == post_save and not any(
+        instance.tracker.has_changed(field) for field in fields
+    ):
+        return
+    async_task(refresh_next_session_for_game, game)
+
+
+@receiver(post_save, sender=Occurrence)
+@receiver(post_delete, sender=Occurrence)
+def refresh_next_session_on_occurrence_change(
+    sender, instance, signal, *args, **kwargs
+):
+    if signal == post_save and not saved_fields_overlap(
+        kwargs.get("update_fields"), NEXT_SESSION_OCCURRENCE_FIELDS
+    ):
+        return
+    if models.GamePosting.objects.filter(event_id=instance.event_id).exists():
+        async_task(refresh_next_session_for_events, [instance.event_id])
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=models.GameEvent)
+def refresh_next_session_on_event_edit(sender, instance, created, *args, **kwargs):
+    if created or not saved_fields_overlap(
+        kwargs.get("update_fields"), NEXT_SESSION_EVENT_FIELDS
+    ):
+        return
+    if models.GamePosting.objects.filter(event_id=instance.id).exists():
+        async_task(refresh_next_session_for_events, [instance.id])
+
+
+@receiver(post_save, sender=EventRelation)
+@receiver(post_save, sender=models.GameEventRelation)
+def create_master_event_link(sender, instance, created, *args, **kwargs):
+    """
+    Keep the denormalized master event link in step with player event relations that are
+    not created through :meth:`looking_for_group.games.models.GameEvent.generate_missing_child_events`.
+    """
+    if created and instance.distinction == "playerevent":
+        models.MasterEventLink.objects.get_or_create(
+            event_id=instance.event_id, defaults={"master_event_id": instance.object_id}
+        )
+        if sender.event.is_cached(instance):
+            # Discard any role the event cached before it was linked.
+            vars(instance.event).pop("master_event_pk", None)
+
+
 @receiver(m2m_changed, sender=models.GamePosting.players.through)
 def sync_calendar_on_player_clear(sender, instance, action, pk_set, *args, **kwargs):
     if action == "post_clear":
@@ -275,30 +470,40 @@ def sync_calendar_on_player_add(sender, instance, created, *args, **kwargs):
         async_task(sync_calendar_for_arriving_player, instance)
 
 
+games_joined_counter = StatusTransitionCounter(
+    models.Player,
+    models.GamerProfile,
+    "gamer",
+    created_counter="games_joined",
+    count_deletes=False,
+).connect()
+
+
 @receiver(post_save, sender=models.Player)
-def update_games_joined(sender, instance, created, *args, **kwargs):
-    if created:
-        instance.gamer.games_joined = F("games_joined") + 1
-        instance.gamer.save()
+@receiver(post_delete, sender=models.Player)
+def bump_virtual_calendar_on_player_change(sender, instance, *args, **kwargs):
+    """
+    A virtual player calendar is built from the games the gamer plays in, so it changes with membership.
+    """
+    if virtual_player_calendars_enabled() and instance.gamer:
+        models.CalendarVersion.objects.bump_for_usernames([instance.gamer.username])
 
 
 @receiver(pre_delete, sender=models.Player)
 def clear_calendar_on_player_remove(sender, instance, *args, **kwargs):
+    if departure_cleanup_skipped():
+        return
     async_task(clear_calendar_for_departing_player, instance)
 
 
 @receiver(player_left)
 def update_games_left(sender, player, *args, **kwargs):
-    gamer = player.gamer
-    gamer.games_left = F("games_left") + 1
-    gamer.save()
+    increment(player.gamer, "games_left")
 
 
 @receiver(player_kicked)
 def update_games_kicked(sender, player, *args, **kwargs):
-    gamer = player.gamer
-    gamer.games_kicked = F("games_kicked") + 1
-    gamer.save()
+    increment(player.gamer, "games_kicked")
 
 
 @receiver(pre_save, sender=models.GameSession)
@@ -340,14 +545,12 @@ def generate_master_event_occurrence_for_adhoc_session(
                 logger.debug(
                     "Players are associated with this. Adding any missing child events for adhoc session."
                 )
-                for player in instance.players_expected.all():
-                    c, created = Calendar.objects.get_or_create(
-                        slug=player.gamer.username,
-                        defaults={
-                            "name": "{}'s calendar".format(player.gamer.username)
-                        },
-                    )
-                    calendar_list.append(c)
+                calendar_list = models.get_or_create_calendars_for_gamers(
+                    [
+                        player.gamer
+                        for player in instance.players_expected.select_related("gamer")
+                    ]
+                )
                 master_event.generate_missing_child_events(calendar_list)
             logger.debug("Persisting occurrence...")
             master_occurrence.save()
@@ -368,6 +571,12 @@ def update_player_calendars_on_player_add(
     sender, instance, action, pk_set, *args, **kwargs
 ):
     if instance.session_type == "adhoc":
+        if virtual_player_calendars_enabled() and action in ("post_add", "post_remove"):
+            models.CalendarVersion.objects.bump_for_usernames(
+                models.Player.objects.filter(id__in=pk_set).values_list(
+                    "gamer__username", flat=True
+                )
+            )
         async_task(update_player_calendars_for_adhoc_session, instance)
 
 
@@ -421,7 +630,11 @@ def remove_event_for_cancelled_game(sender, instance, *args, **kwargs):
     If so, delete the incomplete game sessions and change the end date for the game and game event to now.
     If not, remove the start and end date for the game and remove the event.
     """
-    if instance.status == "cancel" and instance.event:
+    if (
+        instance.status == "cancel"
+        and instance.tracker.has_changed("status")
+        and instance.event
+    ):
         existing_sessions = models.GameSession.objects.filter(game=instance)
         if existing_sessions.count() > 0:
             with transaction.atomic():
@@ -440,3 +653,156 @@ def remove_event_for_cancelled_game(sender, instance, *args, **kwargs):
             ev = instance.event
             instance.event = None
             async_task(remove_event_and_descendants, ev)
+
+
+@receiver(post_save, sender=models.GamePosting)
+def bump_visibility_on_game_change(sender, instance, created, *args, **kwargs):
+    """
+    Who can see a game depends on its privacy level and GM. Public games are never
+    cached, so creating one does not affect anyone. Otherwise only the GMs, players and,
+    for community games, the GMs' friends and the members of its communities are bumped.
+    """
+    if created:
+        if instance.privacy_level != "public":
+            visibility.bump_audience(
+                gm_ids=[instance.gm_id],
+                friends_of_gm=instance.privacy_level == "community",
+            )
+    elif instance.tracker.has_changed("privacy_level") or instance.tracker.has_changed(
+        "gm"
+    ):
+        community = "community" in (
+            instance.privacy_level,
+            instance.tracker.previous("privacy_level"),
+        )
+        visibility.bump_audience(
+            gm_ids=[instance.gm_id, instance.tracker.previous("gm")],
+            game_ids=[instance.pk],
+            community_ids=instance.communities.values_list("pk", flat=True)
+            if community
+            else (),
+            friends_of_gm=community,
+        )
+
+
+@receiver(m2m_changed, sender=models.GamePosting.communities.through)
+def bump_visibility_on_game_communities_change(
+    sender, instance, action, reverse, pk_set, *args, **kwargs
+):
+    """
+    Only the members of the communities added or removed gain or lose the game. The
+    rows removed by a clear are only known before it happens.
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        # The instance is a community and pk_set holds games.
+        games = models.GamePosting.objects.filter(privacy_level="community")
+        if action == "pre_clear":
+            games = games.filter(communities=instance)
+        else:
+            games = games.filter(pk__in=pk_set)
+        if games.exists():
+            visibility.bump_audience(community_ids=[instance.pk])
+    elif instance.privacy_level == "community":
+        if action == "pre_clear":
+            pk_set = instance.communities.values_list("pk", flat=True)
+        visibility.bump_audience(community_ids=pk_set)
+
+
+@receiver(post_save, sender=models.Player)
+@receiver(post_delete, sender=models.Player)
+def bump_visibility_on_player_change(sender, instance, *args, **kwargs):
+    visibility.bump_gamers([instance.gamer_id, instance.tracker.previous("gamer")])
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def bump_visibility_on_membership_change(sender, instance, *args, **kwargs):
+    visibility.bump_gamers([instance.gamer_id])
+
+
+@receiver(m2m_changed, sender=GamerProfile.friends.through)
+def bump_visibility_on_friends_change(
+    sender, instance, action, pk_set, *args, **kwargs
+):
+    """
+    Friendship is symmetrical, so both sides of the change are bumped. The friends
+    removed by a clear are only known before it happens.
+    """
+    if action in ("post_add", "post_remove"):
+        visibility.bump_gamers([instance.pk, *pk_set])
+    elif action == "pre_clear":
+        visibility.bump_gamers(
+            [instance.pk, *instance.friends.values_list("pk", flat=True)]
+        )
+
+
+@receiver(post_save, sender=models.GamePosting)
+@receiver(pre_delete, sender=models.GamePosting)
+def bump_fragments_on_game_change(sender, instance, *args, **kwargs):
+    """
+    Profiles list the games their gamer runs and plays in, communities list their
+    games, and the GM's stats are shown with each of their games. Deletions are
+    handled before the players and communities are removed.
+    """
+    fragments.bump_instance(instance)
+    fragments.bump(
+        GamerProfile,
+        [
+            instance.gm_id,
+            instance.tracker.previous("gm"),
+            *models.Player.objects.filter(game=instance).values_list(
+                "gamer_id", flat=True
+            ),
+        ],
+    )
+    fragments.bump(GamerCommunity, instance.communities.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=models.Player)
+@receiver(post_delete, sender=models.Player)
+def bump_fragments_on_player_change(sender, instance, *args, **kwargs):
+    fragments.bump(models.GamePosting, [instance.game_id])
+    fragments.bump(
+        GamerProfile, [instance.gamer_id, instance.tracker.previous("gamer")]
+    )
+
+
+@receiver(post_save, sender=models.GameSession)
+@receiver(post_delete, sender=models.GameSession)
+def bump_fragments_on_session_change(sender, instance, *args, **kwargs):
+    """
+    GM stats and community details add up the completed sessions of games, so they
+    change with the sessions too.
+    """
+    fragments.bump(models.GamePosting, [instance.game_id])
+    game = models.GamePosting.objects.filter(pk=instance.game_id)
+    fragments.bump(GamerProfile, game.values_list("gm_id", flat=True))
+    fragments.bump(GamerCommunity, game.values_list("communities", flat=True))
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def bump_fragments_on_location_change(sender, instance, *args, **kwargs):
+    fragments.bump_instance(instance)
+
+
+@receiver(m2m_changed, sender=models.GamePosting.communities.through)
+def bump_fragments_on_game_communities_change(
+    sender, instance, action, reverse, pk_set, *args, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        game_ids = pk_set
+        if action == "pre_clear":
+            game_ids = instance.gameposting_set.values_list("pk", flat=True)
+        fragments.bump(models.GamePosting, game_ids)
+        fragments.bump_instance(instance)
+    else:
+        community_ids = pk_set
+        if action == "pre_clear":
+            community_ids = instance.communities.values_list("pk", flat=True)
+        fragments.bump(GamerCommunity, community_ids)
+        fragments.bump_instance(instance)
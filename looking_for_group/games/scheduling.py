@@ -0,0 +1,216 @@
+"""
+Batched conflict checking for game sessions.
+
+Rather than querying each player's calendars for every proposed time, a
+:class:`GameScheduler` loads the calendar events and availability of every player
+in a game once, expands recurrences over the requested window once, and can then
+score any number of candidate start times in memory.
+"""
+import bisect
+import itertools
+import logging
+from datetime import timedelta
+
+from schedule.models import Calendar
+
+from . import availability, models
+
+logger = logging.getLogger("games")
+
+
+def round_up_to_slot(dt):
+    """
+    Round a datetime up to the start of the next availability slot.
+    """
+    remainder = timedelta(
+        minutes=dt.minute % availability.SLOT_MINUTES,
+        seconds=dt.second,
+        microseconds=dt.microsecond,
+    )
+    if not remainder:
+        return dt
+    return dt + timedelta(minutes=availability.SLOT_MINUTES) - remainder
+
+
+class GameScheduler(object):
+    """
+    Scores proposed session times for a game against its players' availability and calendars.
+
+    :param game: The :class:`looking_for_group.games.models.GamePosting` being scheduled.
+    :param window_start: The earliest start time that will be evaluated.
+    :param window_end: The latest start time that will be evaluated.
+    :param gamer_list: Optional list of gamers to evaluate. Defaults to the game's players.
+    """
+
+    def __init__(self, game, window_start, window_end, gamer_list=None):
+        self.game = game
+        self.session_length = timedelta(minutes=int(60 * game.session_length))
+        self.session_slots = availability.slots_for_minutes(
+            self.session_length.total_seconds() / 60
+        )
+        self.window_start = window_start
+        self.window_end = window_end
+        if gamer_list is None:
+            gamer_list = game.players.all()
+        self.gamers = list(gamer_list)
+        bitmaps = models.WeeklyAvailability.objects.get_bitmaps_for_gamers(self.gamers)
+        # Eroding by the session length means a single bit tells us if a session starting in that slot fits.
+        self.session_fits = {
+            gamer_id: availability.erode(bitmap, self.session_slots)
+            for gamer_id, bitmap in bitmaps.items()
+            if bitmap
+        }
+        self.busy_times = self.load_busy_times()
+        # The latest end of any appointment up to each index, so that a single bisect answers has_conflict.
+        self.busy_max_ends = {
+            gamer_id: list(itertools.accumulate((end for _, end in intervals), max))
+            for gamer_id, intervals in self.busy_times.items()
+        }
+
+    def get_game_event_ids(self):
+        """
+        Collect the ids of the master and player events that belong to this game, as they are never conflicts.
+        """
+        master_ids = set(
+            models.GameSession.objects.filter(
+                game=self.game, session_type="adhoc", occurrence__isnull=False
+            ).values_list("occurrence__event_id", flat=True)
+        )
+        if self.game.event_id:
+            master_ids.add(self.game.event_id)
+        if not master_ids:
+            return set()
+        child_ids = models.MasterEventLink.objects.filter(
+            master_event_id__in=master_ids
+        ).values_list("event_id", flat=True)
+        return master_ids.union(child_ids)
+
+    def load_busy_times(self):
+        """
+        Expand the calendar events of every gamer over the window once and return
+        a dict of gamer id to a sorted list of (start, end) tuples.
+        """
+        calendars = list(
+            Calendar.objects.filter(slug__in=[gamer.username for gamer in self.gamers])
+        )
+        gamers_by_slug = {gamer.username: gamer for gamer in self.gamers}
+        busy_times = {gamer.id: [] for gamer in self.gamers}
+        range_end = self.window_end + self.session_length
+        excluded_ids = self.get_game_event_ids()
+        events_by_calendar = models.GameEvent.objects.get_events_by_calendar(
+            calendars, self.window_start, range_end
+        )
+        event_list = [
+            event
+            for events in events_by_calendar.values()
+            for event in events
+            if event.id not in excluded_ids
+        ]
+        event_occurrences = models.MaterializedOccurrence.objects.get_occurrences_for_events(
+            event_list, self.window_start, range_end
+        )
+        for calendar in calendars:
+            gamer = gamers_by_slug[calendar.slug]
+            for event in events_by_calendar[calendar.id]:
+                if event.id in excluded_ids:
+                    continue
+                for occurrence in event_occurrences[event.id]:
+                    if not occurrence.cancelled:
+                        busy_times[gamer.id].append((occurrence.start, occurrence.end))
+        for gamer_id in busy_times.keys():
+            busy_times[gamer_id].sort()
+        return busy_times
+
+    def is_available(self, gamer, start):
+        """
+        Check if the whole session fits in the gamer's weekly availability.
+        Gamers without any availability defined are treated as available.
+        A start that is not aligned to a slot also needs the following slot to fit,
+        as the session then runs into the part of the slot after its end.
+        """
+        if gamer.id not in self.session_fits:
+            return True
+        fits = self.session_fits[gamer.id]
+        offset = availability.minute_of_week(start)
+        slot = offset // availability.SLOT_MINUTES
+        if not (fits >> slot) & 1:
+            return False
+        if offset % availability.SLOT_MINUTES or start.second or start.microsecond:
+            next_slot = (slot + 1) % availability.SLOTS_PER_WEEK
+            return bool((fits >> next_slot) & 1)
+        return True
+
+    def has_conflict(self, gamer, start):
+        """
+        Check if the gamer has another appointment that overlaps a session starting at start.
+        """
+        end = start + self.session_length
+        index = bisect.bisect_left(self.busy_times[gamer.id], (end,))
+        return bool(index) and self.busy_max_ends[gamer.id][index - 1] > start
+
+    def check_time(self, start):
+        """
+        Return a tuple of the gamers with availability issues and the gamers with
+        conflicting appointments for a session starting at start.
+        """
+        avail_conflicts = [
+            gamer for gamer in self.gamers if not self.is_available(gamer, start)
+        ]
+        occurrence_conflicts = [
+            gamer for gamer in self.gamers if self.has_conflict(gamer, start)
+        ]
+        return avail_conflicts, occurrence_conflicts
+
+    def get_candidates(self, step=None):
+        if not step:
+            step = timedelta(minutes=availability.SLOT_MINUTES)
+        candidate = round_up_to_slot(self.window_start)
+        while candidate <= self.window_end:
+            yield candidate
+            candidate += step
+
+    def suggest_slots(self, limit=5, step=None):
+        """
+        Score every candidate start time in the window and return up to ``limit`` non-overlapping
+        slots, ranked by how many players can attend and then by how soon they are.
+        """
+        scored = []
+        for candidate in self.get_candidates(step):
+            avail_conflicts, occurrence_conflicts = self.check_time(candidate)
+            absent_ids = {gamer.id for gamer in avail_conflicts}.union(
+                gamer.id for gamer in occurrence_conflicts
+            )
+            attending = len(
+                [gamer for gamer in self.gamers if gamer.id not in absent_ids]
+            )
+            scored.append(
+                (-attending, candidate, avail_conflicts, occurrence_conflicts)
+            )
+        scored.sort(key=lambda item: (item[0], item[1]))
+        logger.debug("Scored {} candidate start times".format(len(scored)))
+        slots = []
+        for (
+            negative_attending,
+            candidate,
+            avail_conflicts,
+            occurrence_conflicts,
+        ) in scored:
+            if len(slots) >= limit:
+                break
+            if any(
+                candidate < slot["end"]
+                and candidate + self.session_length > slot["start"]
+                for slot in slots
+            ):
+                continue
+            slots.append(
+                {
+                    "start": candidate,
+                    "end": candidate + self.session_length,
+                    "available_players": -negative_attending,
+                    "total_players": len(self.gamers),
+                    "avail_issues": [str(gamer) for gamer in avail_conflicts],
+                    "conflict_issues": [str(gamer) for gamer in occurrence_conflicts],
+                }
+            )
+        return slots
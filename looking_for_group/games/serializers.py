@@ -7,6 +7,7 @@ from drf_writable_nested.mixins import NestedUpdateMixin
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
+from ..fieldsets import SparseFieldsetSerializerMixin
 from ..game_catalog import serializers as catalog_serializers
 from ..game_catalog.models import GameEdition, GameSystem, PublishedModule
 from ..gamer_profiles.models import GamerCommunity, GamerProfile
@@ -27,6 +28,19 @@ def find_slug_in_url(url):
     return possible_slug
 
 
+GAME_EXPANDABLE_FIELDS = {
+    "gm": "looking_for_group.gamer_profiles.serializers.GamerProfileListSerializer",
+    "communities": (
+        "looking_for_group.gamer_profiles.serializers.GamerCommunitySerializer",
+        {"many": True},
+    ),
+}
+SESSION_EXPANDABLE_FIELDS = {
+    "game": "looking_for_group.games.serializers.GameDataListSerializer",
+    "adventurelog": "looking_for_group.games.serializers.AdventureLogSerializer",
+}
+
+
 class PlayerEditableField(serializers.RelatedField):
     def to_representation(self, instance):
         return {"game": instance.game.slug, "gamer": instance.gamer.username}
@@ -142,7 +156,9 @@ class PlayerSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class CharacterSerializer(catalog_serializers.NestedHyperlinkedModelSerializer):
+class CharacterSerializer(
+    SparseFieldsetSerializerMixin, catalog_serializers.NestedHyperlinkedModelSerializer
+):
     """
     Serializer for character objects.
     """
@@ -203,6 +219,9 @@ class CharacterSerializer(catalog_serializers.NestedHyperlinkedModelSerializer):
             "sheet",
         )
         read_only_fields = ("api_url", "slug", "game", "player", "player_username")
+        expandable_fields = {
+            "game": "looking_for_group.games.serializers.GameDataListSerializer"
+        }
         extra_kwargs = {
             "api_url": {
                 "view_name": "api-character-detail",
@@ -307,7 +326,9 @@ class AdventureLogSerializer(catalog_serializers.NestedHyperlinkedModelSerialize
         }
 
 
-class GameSessionSerializer(catalog_serializers.NestedHyperlinkedModelSerializer):
+class GameSessionSerializer(
+    SparseFieldsetSerializerMixin, catalog_serializers.NestedHyperlinkedModelSerializer
+):
     """
     Serializer for a game session from player's perspective.
     """
@@ -363,6 +384,7 @@ class GameSessionSerializer(catalog_serializers.NestedHyperlinkedModelSerializer
             "adventurelog_body_rendered",
         )
         read_only_fields = fields
+        expandable_fields = SESSION_EXPANDABLE_FIELDS
         extra_kwargs = {
             "api_url": {
                 "view_name": "api-session-detail",
@@ -463,6 +485,7 @@ class GameSessionGMSerializer(NestedUpdateMixin, GameSessionSerializer):
             "adventurelog_body",
             "adventurelog_body_rendered",
         )
+        expandable_fields = SESSION_EXPANDABLE_FIELDS
         extra_kwargs = {
             "api_url": {
                 "view_name": "api-session-detail",
@@ -481,7 +504,9 @@ class GameSessionGMSerializer(NestedUpdateMixin, GameSessionSerializer):
         }
 
 
-class GameDataListSerializer(catalog_serializers.NestedHyperlinkedModelSerializer):
+class GameDataListSerializer(
+    SparseFieldsetSerializerMixin, catalog_serializers.NestedHyperlinkedModelSerializer
+):
     """
     Broader view for a list view. Can also be used as a detail view for non-members of a game.
     """
@@ -504,17 +529,25 @@ class GameDataListSerializer(catalog_serializers.NestedHyperlinkedModelSerialize
 
     def get_gm_stats(self, obj):
         if obj.gm:
+            active_games = getattr(obj, "gm_active_game_count", None)
+            if active_games is None:
+                active_games = (
+                    models.GamePosting.objects.filter(gm=obj.gm)
+                    .exclude(status__in=["cancel", "closed"])
+                    .count()
+                )
             return {
                 "games_created": obj.gm.games_created,
-                "active_games": models.GamePosting.objects.filter(gm=obj.gm)
-                .exclude(status__in=["cancel", "closed"])
-                .count(),
+                "active_games": active_games,
                 "games_finished": obj.gm.gm_games_finished,
             }
         return None
 
     def get_current_players(self, obj):
-        return models.Player.objects.filter(game=obj).count()
+        current_players = getattr(obj, "current_player_count", None)
+        if current_players is None:
+            current_players = models.Player.objects.filter(game=obj).count()
+        return current_players
 
     def get_published_game_title(self, obj):
         if obj.published_game:
@@ -563,6 +596,7 @@ class GameDataListSerializer(catalog_serializers.NestedHyperlinkedModelSerialize
             "min_players",
             "max_players",
             "sessions",
+            "next_session_at",
             "created",
             "modified",
         )
@@ -575,9 +609,11 @@ class GameDataListSerializer(catalog_serializers.NestedHyperlinkedModelSerialize
             "game_system_name",
             "published_module_title",
             "sessions",
+            "next_session_at",
             "created",
             "modified",
         )
+        expandable_fields = GAME_EXPANDABLE_FIELDS
         extra_kwargs = {
             "api_url": {"view_name": "api-game-detail", "lookup_field": "slug"},
             "published_game": {
@@ -614,24 +650,24 @@ class GameDataSerializer(GameDataListSerializer):
     player_stats = serializers.SerializerMethodField(read_only=True, required=False)
 
     def get_player_stats(self, obj):
-        players = models.Player.objects.filter(game=obj)
-        return PlayerSerializer(players, many=True).data
+        return PlayerSerializer(obj.player_set.all(), many=True).data
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance:
             self._session_gm = self.instance.gm
-            self.fields["communities"].queryset = self._session_gm.communities.all()
         elif (
             "request" in self.context.keys()
             and self.context["request"]
             and self.context["request"].user.is_authenticated
         ):
             self._session_gm = self.context["request"].user.gamerprofile
-            self.fields["communities"].queryset = self._session_gm.communities.all()
         else:
             self._session_gm = None
-            self.fields["communities"].queryset = None
+        if "communities" in self.fields:
+            self.fields["communities"].queryset = (
+                self._session_gm.communities.all() if self._session_gm else None
+            )
 
     def create(self, validated_data):
         if (
@@ -774,6 +810,7 @@ class GameDataSerializer(GameDataListSerializer):
             "max_players",
             "players",
             "sessions",
+            "next_session_at",
             "player_stats",
             "created",
             "modified",
@@ -788,9 +825,17 @@ class GameDataSerializer(GameDataListSerializer):
             "published_module_title",
             "players",
             "sessions",
+            "next_session_at",
             "created",
             "modified",
         )
+        expandable_fields = {
+            **GAME_EXPANDABLE_FIELDS,
+            "players": (
+                "looking_for_group.gamer_profiles.serializers.GamerProfileListSerializer",
+                {"many": True},
+            ),
+        }
         extra_kwargs = {
             "communities": {"required": False},
             "player_stats": {"required": False},
@@ -1,14 +1,21 @@
 import logging
+from datetime import timedelta
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.db.models import F
+from django.db.models import Count, F, Sum
+from django.db.models.query_utils import Q
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from notifications.signals import notify
-from schedule.models import Calendar, Occurrence
+from schedule.models import Calendar, CalendarRelation, Event, Occurrence
 
 from . import models
+from .. import counters, fragments
+from ..gamer_profiles.models import CommunityMembership, GamerCommunity
+from ..maintenance import PKRangeSweep
+from .deletion import DeletionPlan
+from .utils import attendance_rate, virtual_player_calendars_enabled
 
 logger = logging.getLogger("games")
 
@@ -16,6 +23,67 @@ logger = logging.getLogger("games")
 def update_child_events_for_master(event):
     if event.is_master_event() and event.child_events.count() > 0:
         event.update_child_events()
+        for child_event in event.get_child_events().select_related("rule"):
+            models.MaterializedOccurrence.objects.materialize_event(child_event)
+
+
+def materialize_event_occurrences(event):
+    """
+    Regenerate the materialized occurrences for an event after its rule or times change.
+    """
+    return models.MaterializedOccurrence.objects.materialize_event(event)
+
+
+def extend_occurrence_horizon(batch_size=500):
+    """
+    Move the materialized occurrence window forward. Intended to run nightly.
+
+    Events that already have a horizon only have the newly covered days expanded,
+    while active events without one are materialized from scratch.
+    """
+    start, end = models.OccurrenceHorizon.objects.get_default_window()
+    with transaction.atomic():
+        pruned, details = models.MaterializedOccurrence.objects.filter(
+            end__lt=start
+        ).delete()
+        models.OccurrenceHorizon.objects.filter(start__lt=start).update(start=start)
+    event_ids = list(
+        models.GameEvent.objects.filter(start__lte=end)
+        .filter(
+            Q(end_recurring_period__gte=start) | Q(end_recurring_period__isnull=True)
+        )
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    extended = 0
+    materialized = 0
+    for index in range(0, len(event_ids), batch_size):
+        events = (
+            models.GameEvent.objects.filter(
+                id__in=event_ids[index : index + batch_size]
+            )
+            .select_related("rule", "occurrence_horizon")
+            .prefetch_related("occurrence_set")
+        )
+        for event in events:
+            try:
+                horizon = event.occurrence_horizon
+            except ObjectDoesNotExist:
+                horizon = None
+            if horizon:
+                extended += models.MaterializedOccurrence.objects.extend_event(
+                    event, horizon, start, end
+                )
+            else:
+                materialized += models.MaterializedOccurrence.objects.materialize_event(
+                    event, start, end, clear_prefetch=False
+                )
+    logger.info(
+        "Pruned {} expired occurrences, extended horizon with {} occurrences, and materialized {} occurrences for new events".format(
+            pruned, extended, materialized
+        )
+    )
+    return pruned, extended, materialized
 
 
 def create_game_player_events(gameposting):
@@ -23,29 +91,215 @@ def create_game_player_events(gameposting):
         gameposting.generate_player_events_from_master_event()
 
 
+def propagate_occurrences_to_child_events(master_occurrences, child_events):
+    """
+    Create a linked copy of each master occurrence in every child event of its master event that
+    does not already have one. The missing pairs are found with a single query and the occurrences
+    and links are bulk created, so occurrences from several games can be propagated at once.
+
+    Bulk creation skips the occurrence receivers, so callers should follow up with
+    :func:`refresh_child_event_caches` for the affected child events and occurrences.
+
+    :returns: int -- The number of child occurrences created.
+    """
+    master_occurrences = list(master_occurrences)
+    child_events = list(child_events)
+    if not master_occurrences or not child_events:
+        return 0
+    existing_pairs = set(
+        models.ChildOccurenceLink.objects.filter(
+            master_event_occurence__in=master_occurrences,
+            child_event_occurence__event__in=child_events,
+        ).values_list("master_event_occurence_id", "child_event_occurence__event_id")
+    )
+    missing_pairs = [
+        (occurence, event)
+        for occurence in master_occurrences
+        for event in child_events
+        if event.get_master_event_id() == occurence.event_id
+        and (occurence.id, event.id) not in existing_pairs
+    ]
+    logger.debug("Found {} missing child occurrences.".format(len(missing_pairs)))
+    if not missing_pairs:
+        return 0
+    with transaction.atomic():
+        child_occurences = Occurrence.objects.bulk_create(
+            [
+                Occurrence(
+                    event=event,
+                    title=occurence.title,
+                    description=occurence.description,
+                    start=occurence.start,
+                    end=occurence.end,
+                    cancelled=occurence.cancelled,
+                    original_start=occurence.original_start,
+                    original_end=occurence.original_end,
+                )
+                for occurence, event in missing_pairs
+            ]
+        )
+        models.ChildOccurenceLink.objects.bulk_create(
+            [
+                models.ChildOccurenceLink(
+                    master_event_occurence=occurence,
+                    child_event_occurence=child_occurence,
+                )
+                for (occurence, event), child_occurence in zip(
+                    missing_pairs, child_occurences
+                )
+            ]
+        )
+    return len(child_occurences)
+
+
+def create_upcoming_sessions(lookahead_days=models.SESSION_LOOKAHEAD_DAYS):
+    """
+    Scheduled sweep that creates the pending session for every running game whose next
+    occurrence starts within the lookahead window, expecting all current players.
+    Works across all games in bulk, so the number of queries does not grow with the
+    number of games unless an occurrence still has to be expanded from its rule.
+
+    :returns: tuple -- Number of sessions created and the duration of the sweep in seconds.
+    """
+    started = timezone.now()
+    games = list(
+        models.GamePosting.objects.filter(
+            status__in=["started", "replace"],
+            event__isnull=False,
+            next_session_at__gte=started,
+            next_session_at__lte=started + timedelta(days=lookahead_days),
+        )
+        .exclude(
+            id__in=models.GameSession.objects.filter(
+                session_type="normal", status="pending"
+            ).values("game_id")
+        )
+        .select_related("event", "gm__user")
+    )
+    created = 0
+    if games:
+        created = create_sessions_for_games(games)
+    duration = (timezone.now() - started).total_seconds()
+    logger.info(
+        "Created {} upcoming sessions in {:.2f} seconds".format(created, duration)
+    )
+    return created, duration
+
+
+def create_sessions_for_games(games):
+    """
+    Persist the next occurrence of each game and create its pending session with the
+    players expected, all with bulk queries.
+
+    :returns: int -- The number of sessions created.
+    """
+    rows = {
+        (row.event_id, row.start): row
+        for row in models.MaterializedOccurrence.objects.filter(
+            event_id__in=[game.event_id for game in games],
+            start__in=[game.next_session_at for game in games],
+        ).select_related("occurrence")
+    }
+    occurrences = {}
+    for game in games:
+        row = rows.get((game.event_id, game.next_session_at))
+        if row and row.occurrence:
+            occurrences[game.id] = row.occurrence
+        elif row:
+            occurrences[game.id] = row.to_occurrence(game.event)
+        else:
+            # Not materialized yet, so fall back to expanding the rule for this game.
+            occurrences[game.id] = game.get_next_scheduled_session_occurrence()
+    games = [game for game in games if occurrences[game.id]]
+    new_occurrences = [
+        occurrences[game.id] for game in games if not occurrences[game.id].id
+    ]
+    players = {}
+    for player_id, game_id in models.Player.objects.filter(game__in=games).values_list(
+        "id", "game_id"
+    ):
+        players.setdefault(game_id, []).append(player_id)
+    with transaction.atomic():
+        # Bulk creation skips the occurrence receivers, so their work is repeated in bulk below.
+        Occurrence.objects.bulk_create(new_occurrences)
+        sessions = [
+            models.GameSession(
+                game=game,
+                occurrence=occurrences[game.id],
+                status="pending",
+                scheduled_time=occurrences[game.id].start,
+            )
+            for game in games
+        ]
+        for session in sessions:
+            session.generate_uuid_slug()
+        models.GameSession.objects.bulk_create(sessions)
+        models.GameSession.players_expected.through.objects.bulk_create(
+            [
+                models.GameSession.players_expected.through(
+                    gamesession_id=session.id, player_id=player_id
+                )
+                for session in sessions
+                for player_id in players.get(session.game_id, [])
+            ]
+        )
+        child_events = list(
+            models.GameEvent.objects.with_master_event_ids().filter(
+                master_event_link__master_event_id__in=[game.event_id for game in games]
+            )
+        )
+        propagate_occurrences_to_child_events(new_occurrences, child_events)
+    models.MaterializedOccurrence.objects.link_occurrences(
+        list(new_occurrences)
+        + list(
+            Occurrence.objects.filter(
+                master_occurence_link__master_event_occurence__in=new_occurrences
+            )
+        )
+    )
+    models.CalendarVersion.objects.bump(
+        [game.event.calendar_id for game in games]
+        + [event.calendar_id for event in child_events]
+    )
+    models.CalendarVersion.objects.bump_virtual_calendars(
+        [game.event_id for game in games]
+    )
+    fragments.bump(models.GamePosting, [game.pk for game in games])
+    return len(sessions)
+
+
+def refresh_child_event_caches(child_events, master_occurrences):
+    """
+    Bump the calendar versions of child events and update the materialized rows for the
+    copies of the master occurrences after they were changed in bulk.
+    """
+    models.CalendarVersion.objects.bump([event.calendar_id for event in child_events])
+    models.MaterializedOccurrence.objects.sync_occurrences(
+        Occurrence.objects.filter(
+            event__in=child_events,
+            master_occurence_link__master_event_occurence__in=master_occurrences,
+        ).select_related("event")
+    )
+
+
 def create_or_update_linked_occurences_on_edit(occurence, created=False):
     game_event = models.GameEvent.objects.get(id=occurence.event.id)
     if game_event.is_master_event():
         # Check to ensure this is related to a game posting.
         # This is a game and we need to make sure the players have the event.
-        # First, we retrive any existing links.
         logger.debug("This is an master event occurrence linked to a game.")
-        child_occurences_to_update = None
+        child_events = list(game_event.get_child_events())
+        if not child_events:
+            return
+        updated_records = 0
         with transaction.atomic():
             if not created:
                 logger.debug(
                     "This is an updated occurrence, checking for exising child occurences..."
                 )
-                polinks = models.ChildOccurenceLink.objects.filter(
-                    master_event_occurence=occurence
-                )
-                logger.debug(
-                    "Found {} existing occurences to update.".format(polinks.count())
-                )
-                child_occurences_to_update = Occurrence.objects.filter(
-                    id__in=[p.child_event_occurence.id for p in polinks]
-                )
-                updated_records = child_occurences_to_update.update(
+                updated_records = Occurrence.objects.filter(
+                    master_occurence_link__master_event_occurence=occurence
+                ).update(
                     title=occurence.title,
                     description=occurence.description,
                     start=occurence.start,
@@ -58,62 +312,94 @@ def create_or_update_linked_occurences_on_edit(occurence, created=False):
                     "Updated {} records requiring changes.".format(updated_records)
                 )
             logger.debug("Adding any missing occurences...")
-            child_events = game_event.get_child_events()
-            if child_occurences_to_update:
-                child_events = child_events.exclude(
-                    id__in=[c.event.id for c in child_occurences_to_update]
-                )
-            occ_created = 0
-            for event in child_events:
-                with transaction.atomic():
-                    child_occurence = Occurrence.objects.create(
-                        event=event,
-                        title=occurence.title,
-                        description=occurence.description,
-                        start=occurence.start,
-                        end=occurence.end,
-                        cancelled=occurence.cancelled,
-                        original_start=occurence.original_start,
-                        original_end=occurence.original_end,
-                    )
-                    models.ChildOccurenceLink.objects.create(
-                        master_event_occurence=occurence,
-                        child_event_occurence=child_occurence,
-                    )
-                    occ_created += 1
+            occ_created = propagate_occurrences_to_child_events(
+                [occurence], child_events
+            )
             logger.debug("Created {} new linked occurences.".format(occ_created))
+        if updated_records or occ_created:
+            refresh_child_event_caches(child_events, [occurence])
 
 
 def sync_calendar_for_arriving_player(player):
+    if virtual_player_calendars_enabled():
+        logger.debug("Player calendars are virtual, nothing to copy.")
+        return
     with transaction.atomic():
         events_created = player.game.generate_player_events_from_master_event()
         logger.debug("Created {} child events.".format(events_created))
         player_event = player.game.event.get_child_events().filter(
             calendar__slug=player.gamer.username
         )[0]
-        occurences_to_sync = player.game.event.occurrence_set.filter(
-            start__gte=timezone.now()
+        occurences_to_sync = list(
+            player.game.event.occurrence_set.filter(start__gte=timezone.now())
+        )
+        logger.debug("Preparing to sync occurences.")
+        synced_occurences = propagate_occurrences_to_child_events(
+            occurences_to_sync, [player_event]
         )
-        if occurences_to_sync.count() > 0:
-            logger.debug("Preparing to sync occurences.")
-            synced_occurences = 0
-            for occ in occurences_to_sync:
-                with transaction.atomic():
-                    pocc = Occurrence.objects.create(
-                        event=player_event,
-                        title=occ.title,
-                        description=occ.description,
-                        start=occ.start,
-                        end=occ.end,
-                        cancelled=occ.cancelled,
-                        original_start=occ.original_start,
-                        original_end=occ.original_end,
-                    )
-                    models.ChildOccurenceLink.objects.create(
-                        master_event_occurence=occ, child_event_occurence=pocc
-                    )
-                    synced_occurences += 1
-            logger.debug("Synced {} occurences.".format(synced_occurences))
+        logger.debug("Synced {} occurences.".format(synced_occurences))
+    if synced_occurences:
+        refresh_child_event_caches([player_event], occurences_to_sync)
+
+
+def remove_player_event_copies(batch_size=500):
+    """
+    Migration path to virtual player calendars. Deletes the copies of master events and their
+    occurrences from player calendars in batches. Only runs once virtual calendars are enabled,
+    as otherwise players would lose their game events.
+
+    :returns: int -- The number of child events removed.
+    """
+    if not virtual_player_calendars_enabled():
+        raise ValueError(
+            "Enable GAMES_VIRTUAL_PLAYER_CALENDARS before removing player event copies."
+        )
+    removed = 0
+    while True:
+        child_ids = list(
+            models.MasterEventLink.objects.values_list("event_id", flat=True)[
+                :batch_size
+            ]
+        )
+        if not child_ids:
+            break
+        removed += DeletionPlan(event_ids=child_ids).execute().get("schedule.Event", 0)
+    logger.info("Removed {} player event copies".format(removed))
+    return removed
+
+
+def restore_player_event_copies():
+    """
+    Reverse of :func:`remove_player_event_copies` for switching virtual player calendars off again.
+    Recreates the child events of every game and ad hoc session and copies their upcoming occurrences.
+
+    :returns: int -- The number of child events created.
+    """
+    if virtual_player_calendars_enabled():
+        raise ValueError(
+            "Disable GAMES_VIRTUAL_PLAYER_CALENDARS before restoring player event copies."
+        )
+    created = 0
+    for game in models.GamePosting.objects.filter(event__isnull=False).select_related(
+        "event"
+    ):
+        created += game.generate_player_events_from_master_event()
+        child_events = list(game.event.get_child_events())
+        if child_events:
+            master_occurrences = list(
+                game.event.occurrence_set.filter(start__gte=timezone.now())
+            )
+            propagate_occurrences_to_child_events(master_occurrences, child_events)
+            refresh_child_event_caches(child_events, master_occurrences)
+    for session in models.GameSession.objects.filter(
+        session_type="adhoc", occurrence__isnull=False
+    ):
+        session_created, session_deleted = update_player_calendars_for_adhoc_session(
+            session
+        )
+        created += session_created
+    logger.info("Restored {} player event copies".format(created))
+    return created
 
 
 def clear_calendar_for_departing_player(player):
@@ -159,19 +445,42 @@ def clear_calendar_for_departing_player(player):
 
 def calculate_player_attendance(gamesession):
     """
-    Takes all the players that were expected at the game session and
-    recalculates their attendance.
+    Recalculates the attendance of every player in the session's game with a single
+    aggregate query and writes back the changes with one bulk update, then refreshes
+    the attendance records of the affected gamers.
     """
-    game_players = gamesession.players_expected.all()
-    if game_players:
-        for player in game_players:
-            player.sessions_expected = player.gamesession_set.filter(
-                status="complete"
-            ).count()
-            player.sessions_missed = player.missed_sessions.filter(
-                status="complete"
-            ).count()
-            player.save()
+    players = list(
+        models.Player.objects.filter(game_id=gamesession.game_id).annotate(
+            completed_expected=Count(
+                "gamesession",
+                filter=Q(gamesession__status="complete"),
+                distinct=True,
+            ),
+            completed_missed=Count(
+                "missed_sessions",
+                filter=Q(missed_sessions__status="complete"),
+                distinct=True,
+            ),
+        )
+    )
+    changed = []
+    for player in players:
+        if (player.sessions_expected, player.sessions_missed) != (
+            player.completed_expected,
+            player.completed_missed,
+        ):
+            player.sessions_expected = player.completed_expected
+            player.sessions_missed = player.completed_missed
+            changed.append(player)
+    if changed:
+        models.Player.objects.bulk_update(
+            changed, ["sessions_expected", "sessions_missed"]
+        )
+        update_attendance_records(
+            [player.gamer_id for player in changed], gamesession.game_id
+        )
+    logger.debug("Updated attendance for {} players".format(len(changed)))
+    return len(changed)
 
 
 def undo_player_attendence_for_incomplete_session(gamesession):
@@ -180,20 +489,76 @@ def undo_player_attendence_for_incomplete_session(gamesession):
     scores for this session.
 
     Only used when undoing a session completion.
+    """
+    expected_ids = list(gamesession.players_expected.values_list("id", flat=True))
+    if not expected_ids:
+        return
+    models.Player.objects.filter(id__in=expected_ids, sessions_expected__gt=0).update(
+        sessions_expected=F("sessions_expected") - 1
+    )
+    models.Player.objects.filter(
+        id__in=gamesession.players_missing.filter(id__in=expected_ids).values("id"),
+        sessions_missed__gt=0,
+    ).update(sessions_missed=F("sessions_missed") - 1)
+    update_attendance_records(
+        models.Player.objects.filter(id__in=expected_ids).values_list(
+            "gamer_id", flat=True
+        ),
+        gamesession.game_id,
+    )
 
-    Note, you should send the old copy not the new instance here.
+
+def update_attendance_records(gamer_ids, game_id):
+    """
+    Refresh the overall attendance record of the gamers, and their records in the communities
+    the game is posted in, from the per game counters. Only the affected profiles and
+    memberships are touched, each with one aggregate query and one bulk update.
     """
-    game_players = gamesession.players_expected.all()
-    if game_players:
-        for player in game_players:
-            if player.sessions_expected > 0:
-                player.sessions_expected = F("sessions_expected") - 1
-            if (
-                player in gamesession.players_missing.all()
-                and player.sessions_missed > 0
-            ):
-                player.sessions_missed = F("sessions_missed") - 1
-            player.save()
+    gamer_ids = {gamer_id for gamer_id in gamer_ids if gamer_id}
+    if not gamer_ids:
+        return
+    totals = models.Player.objects.filter(gamer_id__in=gamer_ids).values("gamer_id")
+    models.GamerProfile.objects.bulk_update(
+        [
+            models.GamerProfile(
+                id=row["gamer_id"],
+                attendance_record=attendance_rate(row["expected"], row["missed"]),
+            )
+            for row in totals.annotate(
+                expected=Sum("sessions_expected"), missed=Sum("sessions_missed")
+            )
+        ],
+        ["attendance_record"],
+    )
+    community_ids = models.GamePosting.communities.through.objects.filter(
+        gameposting_id=game_id
+    ).values("gamercommunity_id")
+    community_totals = {
+        (row["gamer_id"], row["game__communities"]): attendance_rate(
+            row["expected"], row["missed"]
+        )
+        for row in totals.filter(game__communities__in=community_ids)
+        .values("gamer_id", "game__communities")
+        .annotate(expected=Sum("sessions_expected"), missed=Sum("sessions_missed"))
+    }
+    memberships = list(
+        CommunityMembership.objects.filter(
+            gamer_id__in=gamer_ids, community_id__in=community_ids
+        )
+    )
+    for membership in memberships:
+        membership.comm_game_attendance_record = community_totals.get(
+            (membership.gamer_id, membership.community_id)
+        )
+    CommunityMembership.objects.bulk_update(
+        memberships, ["comm_game_attendance_record"]
+    )
+    # Bulk updates skip the save receivers that discard the cached fragments.
+    fragments.bump(models.GamePosting, [game_id])
+    fragments.bump(models.GamerProfile, gamer_ids)
+    fragments.bump(
+        GamerCommunity, [membership.community_id for membership in memberships]
+    )
 
 
 def update_player_calendars_for_adhoc_session(gamesession):
@@ -216,12 +581,12 @@ def update_player_calendars_for_adhoc_session(gamesession):
         master_event = models.GameEvent.objects.get(pk=gamesession.occurrence.event.pk)
         if gamesession.players_expected.count() > 0:
             logger.debug("This session has players, grabbing calendars")
-            for player in gamesession.players_expected.all():
-                pcal, created = Calendar.objects.get_or_create(
-                    slug=player.gamer.username,
-                    defaults={"name": "{}'s calendar".format(player.gamer.username)},
-                )  # Create event if missing.
-                calendar_list.append(pcal)
+            calendar_list = models.get_or_create_calendars_for_gamers(
+                [
+                    player.gamer
+                    for player in gamesession.players_expected.select_related("gamer")
+                ]
+            )  # Create calendars if missing.
             logger.debug(
                 "Running generation for {} calendars".format(len(calendar_list))
             )
@@ -261,14 +626,164 @@ def update_player_calendars_for_adhoc_session(gamesession):
 
 
 def clean_expired_availability_events():
-    avail_calls = models.AvailableCalendar.objects.all()
-    deleted_count = 0
-    for acal in avail_calls:
-        deleted_info = acal.events.filter(
-            end_recurring_period__lt=timezone.now()
-        ).delete()
-        deleted_count += deleted_info[0]
-    logger.info("Deleted {} expired availability events".format(deleted_count))
+    """
+    Delete availability events whose recurrence has ended, with their occurrences.
+
+    :returns: dict -- The sweep result.
+    """
+    availability_calendars = CalendarRelation.objects.filter(
+        distinction="available"
+    ).values("calendar_id")
+    return PKRangeSweep(
+        "expired availability events",
+        Event.objects.filter(
+            calendar_id__in=availability_calendars,
+            end_recurring_period__lt=timezone.now(),
+        ),
+        delete=lambda events: DeletionPlan(
+            event_ids=events.values_list("pk", flat=True)
+        )
+        .execute()
+        .get("schedule.Event", 0),
+    ).run()
+
+
+def rebuild_weekly_availability(missing_only=False, batch_size=500):
+    """
+    Rebuild the availability bitmaps for every gamer that has an availability calendar.
+    Use this to backfill the index or repair it after bulk changes to availability events.
+    With ``missing_only`` only gamers without a bitmap are built, leaving existing rows alone.
+    Rows are written with bulk inserts and updates rather than one query per gamer.
+    """
+    availability_calendar_ids = dict(
+        CalendarRelation.objects.filter(distinction="available").values_list(
+            "object_id", "calendar_id"
+        )
+    )
+    calendar_ids_by_slug = {
+        slug: availability_calendar_ids[primary_id]
+        for primary_id, slug in Calendar.objects.filter(
+            id__in=availability_calendar_ids.keys()
+        ).values_list("id", "slug")
+    }
+    gamers = models.GamerProfile.objects.filter(
+        username__in=calendar_ids_by_slug.keys()
+    )
+    if missing_only:
+        gamers = gamers.filter(weekly_availability__isnull=True)
+    gamers = list(gamers)
+    calendars = models.AvailableCalendar.objects.in_bulk(
+        [calendar_ids_by_slug[gamer.username] for gamer in gamers]
+    )
+    existing_ids = dict(
+        models.WeeklyAvailability.objects.filter(gamer__in=gamers).values_list(
+            "gamer_id", "id"
+        )
+    )
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for gamer in gamers:
+        row = models.WeeklyAvailability.objects.build_for_calendar(
+            gamer, calendars[calendar_ids_by_slug[gamer.username]]
+        )
+        row.modified = now
+        if gamer.id in existing_ids:
+            row.id = existing_ids[gamer.id]
+            to_update.append(row)
+        else:
+            to_create.append(row)
+    models.WeeklyAvailability.objects.bulk_create(to_create, batch_size=batch_size)
+    models.WeeklyAvailability.objects.bulk_update(
+        to_update, ["bitmap", "overlap_bitmap", "modified"], batch_size=batch_size
+    )
+    rebuilt = len(to_create) + len(to_update)
+    logger.info(
+        "Rebuilt {} weekly availability bitmaps ({} new)".format(
+            rebuilt, len(to_create)
+        )
+    )
+    return rebuilt
+
+
+def refresh_next_session_for_game(game):
+    """
+    Recompute the cached next session time of a game, reloading it first as it may have
+    changed since the task was queued.
+    """
+    try:
+        game = models.GamePosting.objects.select_related("event", "gm__user").get(
+            pk=game.pk
+        )
+    except ObjectDoesNotExist:
+        logger.debug("Game was deleted before its next session could be refreshed.")
+        return None
+    return game.refresh_next_session_at()
+
+
+def refresh_next_session_for_events(event_ids):
+    """
+    Recompute the cached next session time of the games using any of the events.
+    """
+    for game in models.GamePosting.objects.filter(
+        event_id__in=event_ids
+    ).select_related("event", "gm__user"):
+        game.refresh_next_session_at()
+
+
+def sweep_next_session_times(batch_size=200):
+    """
+    Periodic repair of the cached next session times of active games, walking them in
+    primary key batches and only writing the values that changed.
+
+    :returns: int -- The number of games updated.
+    """
+    cleared_ids = list(
+        models.GamePosting.objects.filter(
+            event__isnull=True, next_session_at__isnull=False
+        ).values_list("pk", flat=True)
+    )
+    updated = models.GamePosting.objects.filter(pk__in=cleared_ids).update(
+        next_session_at=None
+    )
+    fragments.bump(models.GamePosting, cleared_ids)
+    games = (
+        models.GamePosting.objects.filter(event__isnull=False)
+        .exclude(status__in=["cancel", "closed"])
+        .select_related("event", "gm__user")
+        .order_by("pk")
+    )
+    last_pk = 0
+    while True:
+        batch = list(games.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        changed = []
+        for game in batch:
+            previous = game.next_session_at
+            if game.refresh_next_session_at(commit=False) != previous:
+                changed.append(game)
+        if changed:
+            models.GamePosting.objects.bulk_update(changed, ["next_session_at"])
+            fragments.bump(models.GamePosting, [game.pk for game in changed])
+            updated += len(changed)
+    logger.info("Updated the next session time for {} games".format(updated))
+    return updated
+
+
+def reconcile_counters(batch_size=500):
+    """
+    Periodic repair of the denormalized counters, such as completed sessions and the
+    gamer profile stats, recounting them from the rows they track.
+
+    :returns: int -- The number of rows repaired.
+    """
+    repaired = counters.reconcile(batch_size=batch_size)
+    for counter, total in repaired.items():
+        if total:
+            logger.warning("Repaired drift in {} rows for {}".format(total, counter))
+    return sum(repaired.values())
 
 
 def notify_subscribers_of_new_game(communities, game):
@@ -318,21 +833,15 @@ def notify_subscribers_of_new_game(communities, game):
         )
 
 
-def remove_event_and_descendants(game_event_to_delete):
+def remove_event_and_descendants(game_event_to_delete, dry_run=False):
     """
-    For a given game event, check if it is a master event and if so delete its child
-    events before finally deleting it.
+    For a given game event, delete it along with its child events, occurrences and
+    links in a handful of bulk statements.
+
+    :param dry_run: Only report how many rows would be deleted.
+    :returns: OrderedDict -- Row counts keyed by model label.
     """
     logger.debug(
         "Received task call to delete event with id {}".format(game_event_to_delete.pk)
     )
-    logger.debug("Checking if it is a master event...")
-    if game_event_to_delete.is_master_event():
-        logger.debug("Event {} IS a master event. Proceeding to delete child events...")
-        game_event_to_delete.remove_child_events()
-        logger.debug("Child events removed.")
-    logger.debug(
-        "Now deleting individual event with id {}".format(game_event_to_delete)
-    )
-    game_event_to_delete.delete()
-    logger.debug("Event deleted!")
+    return DeletionPlan.for_events([game_event_to_delete]).execute(dry_run=dry_run)
@@ -2,10 +2,23 @@ from django.db.models.query_utils import Q
 from django.template import Library
 
 from .. import models
+from ...fragments import set_fragment_versions
+from ..views import game_fragment_dependencies
 
 register = Library()
 
 
+@register.simple_tag()
+def get_game_fragment_version(game):
+    """
+    The version of a game and the objects shown with it, for the keys of the template
+    fragments that show it.
+    """
+    if getattr(game, "fragment_version", None) is None:
+        set_fragment_versions([game], game_fragment_dependencies)
+    return game.fragment_version
+
+
 @register.simple_tag()
 def get_games_for_system(system, active_only=False):
     """
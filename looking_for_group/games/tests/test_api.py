@@ -3,12 +3,15 @@ from datetime import datetime, timedelta
 import pytest
 import pytz
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
 from django.db.models.signals import post_delete, post_save, pre_delete
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from factory.django import mute_signals
 from rest_framework.reverse import reverse
 
 from .. import models, serializers
+from ...counters import increment
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -1718,3 +1721,156 @@ def test_api_openapi_views(
     print(url)
     response = apiclient.get(url)
     assert response.status_code == expected_response
+
+
+def test_list_games_starting_within(apiclient, game_testdata):
+    models.GamePosting.objects.update(next_session_at=None)
+    models.GamePosting.objects.filter(pk=game_testdata.gp2.pk).update(
+        next_session_at=timezone.now() + timedelta(days=2)
+    )
+    apiclient.force_login(game_testdata.gamer1.user)
+    url = reverse("api-game-list")
+    response = apiclient.get(url, {"starts_within": 3, "ordering": "next_session_at"})
+    assert response.status_code == 200
+    assert [game["slug"] for game in response.data["results"]] == [
+        game_testdata.gp2.slug
+    ]
+    assert not apiclient.get(url, {"starts_within": 1}).data["results"]
+    assert apiclient.get(url, {"starts_within": "soon"}).status_code == 400
+
+
+def test_list_games_keyset_pagination(apiclient, game_testdata):
+    gamer = game_testdata.gamer4
+    expected = [
+        game.slug
+        for game in models.GamePosting.objects.visible_to(gamer).order_by(
+            "-modified", "-id"
+        )
+    ]
+    assert len(expected) > 2
+    apiclient.force_login(gamer.user)
+    response = apiclient.get(reverse("api-game-list"), {"limit": 2})
+    assert response.status_code == 200
+    assert response.data["previous"] is None
+    assert "cursor=" in response.data["next"]
+    seen = [game["slug"] for game in response.data["results"]]
+    while response.data["next"]:
+        response = apiclient.get(response.data["next"])
+        assert response.status_code == 200
+        seen += [game["slug"] for game in response.data["results"]]
+    assert seen == expected
+    last_page_start = len(expected) - len(response.data["results"])
+    response = apiclient.get(response.data["previous"])
+    assert response.status_code == 200
+    assert [game["slug"] for game in response.data["results"]] == expected[
+        last_page_start - 2 : last_page_start
+    ]
+    offset_response = apiclient.get(reverse("api-game-list"), {"limit": 2, "offset": 1})
+    assert offset_response.data["count"] == len(expected)
+    assert [game["slug"] for game in offset_response.data["results"]] == expected[1:3]
+    response = apiclient.get(reverse("api-game-list"), {"pagination": "offset"})
+    assert response.data["count"] == len(expected)
+    assert (
+        apiclient.get(reverse("api-game-list"), {"cursor": "not-a-cursor"}).status_code
+        == 404
+    )
+
+
+@pytest.mark.parametrize(
+    "viewname,url_kwargs",
+    [
+        ("api-game-list", {}),
+        ("api-gameapplication-list", {"parent_lookup_game__slug": "gp5"}),
+    ],
+)
+def test_list_query_count_is_constant(apiclient, game_testdata, viewname, url_kwargs):
+    """
+    A page of results should cost the same number of queries however many rows it has.
+    """
+    url_kwargs = {
+        key: getattr(game_testdata, value).slug for key, value in url_kwargs.items()
+    }
+    url = reverse(viewname, kwargs=url_kwargs)
+    apiclient.force_login(game_testdata.gamer4.user)
+    assert apiclient.get(url).status_code == 200
+    with CaptureQueriesContext(connection) as one_row:
+        response = apiclient.get(url, {"limit": 1})
+    assert len(response.data["results"]) == 1
+    with CaptureQueriesContext(connection) as all_rows:
+        response = apiclient.get(url, {"limit": 100})
+    assert len(response.data["results"]) > 1
+    assert len(all_rows) == len(one_row)
+
+
+def test_game_sparse_fieldsets_and_expansions(apiclient, game_testdata):
+    apiclient.force_login(game_testdata.gamer4.user)
+    with CaptureQueriesContext(connection) as queries:
+        response = apiclient.get(reverse("api-game-list"), {"fields": "slug,title"})
+    assert response.status_code == 200
+    assert all(set(game) == {"slug", "title"} for game in response.data["results"])
+    assert not any(
+        "games_gameposting_communities" in query["sql"]
+        for query in queries.captured_queries
+    )
+    url = reverse("api-game-detail", kwargs={"slug": game_testdata.gp1.slug})
+    response = apiclient.get(url, {"fields": "slug,gm", "expand": "gm"})
+    assert response.status_code == 200
+    assert set(response.data) == {"slug", "gm"}
+    assert response.data["gm"]["user"] == game_testdata.gamer4.user.username
+    assert apiclient.get(url).data["gm"] == game_testdata.gamer4.username
+    response = apiclient.get(
+        reverse(
+            "api-session-list",
+            kwargs={"parent_lookup_game__slug": game_testdata.gp2.slug},
+        ),
+        {"fields": "slug,game", "expand": "game"},
+    )
+    assert response.status_code == 200
+    for session in response.data["results"]:
+        assert set(session) == {"slug", "game"}
+        assert session["game"]["slug"] == game_testdata.gp2.slug
+
+
+def test_game_list_is_assembled_from_cached_fragments(
+    settings, apiclient, game_testdata
+):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "api-fragments",
+        }
+    }
+    apiclient.force_login(game_testdata.gamer4.user)
+    url = reverse("api-game-list")
+    with CaptureQueriesContext(connection) as cold:
+        first = apiclient.get(url)
+    with CaptureQueriesContext(connection) as warm:
+        second = apiclient.get(url)
+    assert second.data == first.data
+    assert len(warm) < len(cold)
+    game_testdata.gp1.title = "A retitled game"
+    game_testdata.gp1.save()
+    models.Player.objects.create(game=game_testdata.gp1, gamer=game_testdata.gamer2)
+    before = {game["slug"]: game for game in first.data["results"]}
+    after = {game["slug"]: game for game in apiclient.get(url).data["results"]}
+    assert set(after) == set(before)
+    for slug, game in after.items():
+        if slug == game_testdata.gp1.slug:
+            assert game["title"] == "A retitled game"
+            assert game["current_players"] == before[slug]["current_players"] + 1
+        else:
+            assert game == before[slug]
+
+
+def test_game_fragments_discarded_on_counter_update(settings, apiclient, game_testdata):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "api-fragments",
+        }
+    }
+    apiclient.force_login(game_testdata.gamer4.user)
+    url = reverse("api-game-detail", kwargs={"slug": game_testdata.gp1.slug})
+    before = apiclient.get(url).data
+    increment(game_testdata.gp1, "sessions")
+    assert apiclient.get(url).data["sessions"] == before["sessions"] + 1
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from django.urls import reverse
+
+from .. import availability
+from ..models import AvailableCalendar, WeeklyAvailability
+from ..tasks import rebuild_weekly_availability
+from .test_scheduling_utils import avail_testdata, make_event_time_for_date  # noqa
+
+MONDAY = datetime(2020, 3, 2, tzinfo=pytz.UTC)
+
+
+def interval(day, start_hour, end_hour):
+    return availability.mask_for_interval(
+        MONDAY + timedelta(days=day, hours=start_hour),
+        MONDAY + timedelta(days=day, hours=end_hour),
+    )
+
+
+def test_mask_for_interval_slots():
+    mask = interval(0, 16, 20)
+    assert availability.popcount(mask) == 16
+    assert mask == ((1 << 16) - 1) << 64
+
+
+def test_mask_for_interval_wraps_week():
+    mask = interval(6, 22, 26)
+    assert availability.popcount(mask) == 16
+    assert mask & 1
+    assert (mask >> (availability.SLOTS_PER_WEEK - 1)) & 1
+    assert len(availability.split_runs(mask)) == 1
+
+
+def test_split_runs():
+    mask = interval(0, 10, 12) | interval(2, 10, 12)
+    runs = availability.split_runs(mask)
+    assert len(runs) == 2
+    assert runs[0] | runs[1] == mask
+
+
+@pytest.mark.parametrize(
+    "gamer_hours, window_hours, overlap, expected",
+    [
+        ((16, 20), (17, 19), None, True),  # Fits completely
+        ((16, 20), (10, 12), None, False),  # No overlap at all
+        ((16, 20), (15, 17), 120, False),  # Overlap insufficient
+        ((16, 20), (15, 17), 30, True),  # Overlap sufficient
+        ((16, 20), (12, 17), 150, False),  # Only one hour of overlap
+        ((12, 17), (15, 20), 120, True),  # Two hours of overlap
+    ],
+)
+def test_mask_matches_windows(gamer_hours, window_hours, overlap, expected):
+    windows = availability.build_window_masks(interval(1, *window_hours), overlap)
+    assert (
+        availability.mask_matches_windows(interval(1, *gamer_hours), windows)
+        == expected
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_for_gamer(avail_testdata):
+    weekly = WeeklyAvailability.objects.rebuild_for_gamer(avail_testdata.gamer1)
+    weekly.refresh_from_db()
+    assert weekly.available_minutes == 6 * 4 * 60
+    assert (
+        WeeklyAvailability.objects.rebuild_for_gamer(
+            avail_testdata.gamer4
+        ).available_minutes
+        > 0
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_missing_bitmap_is_empty_on_read(avail_testdata):
+    WeeklyAvailability.objects.filter(gamer=avail_testdata.gamer1).delete()
+    bitmaps = WeeklyAvailability.objects.get_bitmaps_for_gamers(
+        [avail_testdata.gamer1, avail_testdata.gamer2]
+    )
+    assert bitmaps[avail_testdata.gamer1.id] == 0
+    assert bitmaps[avail_testdata.gamer2.id] != 0
+    assert not WeeklyAvailability.objects.filter(gamer=avail_testdata.gamer1).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_weekly_availability_backfills_missing(avail_testdata):
+    WeeklyAvailability.objects.filter(gamer=avail_testdata.gamer1).delete()
+    WeeklyAvailability.objects.filter(gamer=avail_testdata.gamer2).update(bitmap=0)
+    assert rebuild_weekly_availability(missing_only=True) == 1
+    assert (
+        WeeklyAvailability.objects.get(gamer=avail_testdata.gamer1).available_minutes
+        == 6 * 4 * 60
+    )
+    assert WeeklyAvailability.objects.get(gamer=avail_testdata.gamer2).bitmap == 0
+    assert rebuild_weekly_availability() == 4
+    assert WeeklyAvailability.objects.get(gamer=avail_testdata.gamer2).bitmap != 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_check_availability(avail_testdata):
+    start = make_event_time_for_date(avail_testdata.weekdays[1], "17:00")
+    conflicts = AvailableCalendar.objects.check_availability(
+        [avail_testdata.gamer1, avail_testdata.gamer2, avail_testdata.gamer3],
+        start,
+        start + timedelta(hours=2),
+        minimum_overlap=120,
+    )
+    assert len(conflicts) == 2
+    assert avail_testdata.gamer1 not in [c["gamer"] for c in conflicts]
+    assert all(conflict["conflicts"] for conflict in conflicts)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_overlapping_in_database(avail_testdata):
+    bitmaps = WeeklyAvailability.objects.get_bitmaps_for_gamers(
+        [
+            avail_testdata.gamer1,
+            avail_testdata.gamer2,
+            avail_testdata.gamer3,
+            avail_testdata.gamer4,
+        ]
+    )
+    matches = WeeklyAvailability.objects.overlapping(
+        bitmaps[avail_testdata.gamer1.id]
+    ).values_list("gamer_id", flat=True)
+    assert set(matches) == {avail_testdata.gamer1.id, avail_testdata.gamer4.id}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_game_list_similar_availability_filter(client, avail_testdata):
+    client.force_login(user=avail_testdata.gamer3.user)
+    response = client.get(
+        reverse("games:game_list"),
+        data={"filter_present": 1, "similar_availability": "on"},
+    )
+    assert response.status_code == 200
+    assert avail_testdata.gp2 not in response.context["game_list"]
+    assert len(response.context["game_list"]) == 2
@@ -1,5 +1,11 @@
+from datetime import timedelta
+
 import pytest
 from django.urls import reverse
+from django.utils import timezone
+from schedule.models import Calendar, Event, Occurrence
+
+from .. import models
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -12,3 +18,49 @@ def test_gm(client, game_testdata, django_assert_max_num_queries, gamer_to_use):
             reverse("games:calendar_ical", kwargs={"gamer": gamer.pk})
         )
     assert response.status_code == 200
+
+
+def test_ical_conditional_get(client, game_testdata):
+    url = reverse("games:calendar_ical", kwargs={"gamer": game_testdata.gamer4.pk})
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    game_testdata.session2.move(
+        game_testdata.session2.scheduled_time + timedelta(hours=1)
+    )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_ical_etag_ignores_unrelated_occurrences(client, game_testdata):
+    url = reverse("games:calendar_ical", kwargs={"gamer": game_testdata.gamer4.pk})
+    response = client.get(url)
+    etag = response["ETag"]
+    start = timezone.now() + timedelta(days=1)
+    event = Event.objects.create(
+        calendar=Calendar.objects.create(name="Elsewhere", slug="elsewhere"),
+        start=start,
+        end=start + timedelta(hours=1),
+        title="Unrelated",
+    )
+    Occurrence.objects.create(
+        event=event,
+        start=event.start,
+        end=event.end,
+        original_start=event.start,
+        original_end=event.end,
+        title=event.title,
+    )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_calendar_version_bumped_on_event_change(game_testdata):
+    version = models.CalendarVersion.objects.get_for_calendar(game_testdata.calendar4)
+    game_testdata.gp2.title = "A new title"
+    game_testdata.gp2.save()
+    version.refresh_from_db()
+    assert version.version > 1
@@ -2,6 +2,7 @@ from datetime import timedelta
 
 import pytest
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.query_utils import Q
 from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.utils import timezone
 from factory.django import mute_signals
@@ -61,6 +62,32 @@ def test_create_child_events(game_testdata, game_player_group_calendars):
     assert game_player_group_calendars["master_event"].get_child_events().count() == 2
 
 
+def test_generate_child_events_query_count(
+    game_testdata, game_player_group_calendars, django_assert_max_num_queries
+):
+    calendars = [
+        game_player_group_calendars["player_calendar_1"],
+        game_player_group_calendars["player_calendar_2"],
+    ]
+    with django_assert_max_num_queries(10):
+        events_added = game_player_group_calendars[
+            "master_event"
+        ].generate_missing_child_events(calendars)
+    assert events_added == 2
+    for event in game_player_group_calendars["master_event"].get_child_events():
+        assert event.get_master_event() == game_player_group_calendars["master_event"]
+        assert event.creator.gamerprofile.username == event.calendar.slug
+
+
+def test_get_player_calendars_creates_missing(game_testdata):
+    Calendar.objects.filter(slug=game_testdata.gamer3.username).delete()
+    calendars = game_testdata.gp2.get_player_calendars()
+    assert sorted(calendar.slug for calendar in calendars) == sorted(
+        [game_testdata.gamer3.username, game_testdata.gamer4.username]
+    )
+    assert Calendar.objects.filter(slug=game_testdata.gamer3.username).exists()
+
+
 def test_event_type_evaluation(game_testdata, game_player_group_calendars):
     game_player_group_calendars["master_event"].generate_missing_child_events(
         [
@@ -215,3 +242,69 @@ def test_adhoc_player_clear(game_testdata):
         .count()
         == 0
     )
+
+
+def test_event_roles_without_extra_queries(game_testdata, django_assert_num_queries):
+    master_id = game_testdata.gp2.event.pk
+    child_ids = list(
+        models.MasterEventLink.objects.filter(master_event_id=master_id).values_list(
+            "event_id", flat=True
+        )
+    )
+    assert len(child_ids) == 2
+    events = list(
+        models.GameEvent.objects.with_master_event_ids().filter(
+            id__in=child_ids + [master_id]
+        )
+    )
+    with django_assert_num_queries(0):
+        for event in events:
+            if event.id == master_id:
+                assert event.is_master_event()
+            else:
+                assert event.is_player_event()
+                assert event.get_master_event_id() == master_id
+
+
+def test_master_event_link_created_for_relation(game_testdata):
+    master_event = models.GameEvent.objects.get(pk=game_testdata.gp1.event.pk)
+    child_event = models.GameEvent.objects.create(
+        calendar=game_testdata.calendar2,
+        creator=game_testdata.gamer2.user,
+        start=master_event.start,
+        end=master_event.end,
+        title=master_event.title,
+    )
+    assert child_event.is_master_event()
+    models.GameEventRelation.objects.create_relation(
+        child_event, master_event, distinction="playerevent"
+    )
+    assert child_event.get_master_event_id() == master_event.id
+    child_event = models.GameEvent.objects.get(pk=child_event.pk)
+    assert child_event.get_master_event() == master_event
+    assert child_event.get_related_game() == game_testdata.gp1
+    assert child_event in master_event.get_child_events()
+
+
+def test_games_visible_to(game_testdata):
+    game_testdata.gp4.communities.add(game_testdata.comm1)
+    models.Player.objects.create(game=game_testdata.gp4, gamer=game_testdata.gamer2)
+    for gamer in [
+        game_testdata.gamer1,
+        game_testdata.gamer2,
+        game_testdata.gamer3,
+        game_testdata.gamer4,
+        game_testdata.blocked_gamer,
+    ]:
+        expected = models.GamePosting.objects.filter(
+            Q(gm=gamer)
+            | Q(privacy_level="public")
+            | Q(gm__in=gamer.friends.all(), privacy_level="community")
+            | Q(players=gamer)
+            | Q(communities__in=gamer.communities.all(), privacy_level="community")
+        ).distinct()
+        visible = models.GamePosting.objects.visible_to(gamer)
+        assert visible.count() == expected.count()
+        assert set(visible.values_list("pk", flat=True)) == set(
+            expected.values_list("pk", flat=True)
+        )
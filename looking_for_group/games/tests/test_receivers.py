@@ -11,7 +11,7 @@ from factory.django import mute_signals
 from schedule.models import Calendar, Rule
 
 from ...gamer_profiles.tests import factories
-from .. import models
+from .. import models, visibility
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -252,3 +252,91 @@ def test_cancel_game_with_past_and_future_events(game_receiver_testdata):
     assert models.GameSession.objects.get(pk=session.pk)
     with pytest.raises(ObjectDoesNotExist):
         models.GameSession.objects.get(pk=session2.pk)
+
+
+def test_tracker_treats_unsaved_sessions_as_changed(game_testdata):
+    session = models.GameSession(
+        game=game_testdata.gp2, scheduled_time=timezone.now(), gm_notes="Hi"
+    )
+    assert session.tracker.has_changed("gm_notes")
+    assert session.tracker.previous("status") is None
+    session.save()
+    assert not session.tracker.has_changed("gm_notes")
+    assert session.tracker.previous("gm_notes") == "Hi"
+
+
+def test_markdown_only_rendered_when_source_changes(game_testdata):
+    session = game_testdata.session2
+    session.gm_notes = "Some **notes**"
+    session.save()
+    assert "<strong>" in session.gm_notes_rendered
+    models.GameSession.objects.filter(pk=session.pk).update(
+        gm_notes_rendered="<p>cached</p>"
+    )
+    session = models.GameSession.objects.get(pk=session.pk)
+    session.status = "cancel"
+    session.save()
+    session.refresh_from_db()
+    assert session.gm_notes_rendered == "<p>cached</p>"
+    session.gm_notes = "Other notes"
+    session.save()
+    assert session.gm_notes_rendered == "<p>Other notes</p>"
+
+
+def test_game_save_skips_event_sync_when_unchanged(game_testdata):
+    game = models.GamePosting.objects.get(pk=game_testdata.gp2.pk)
+    updated_on = game.event.updated_on
+    game.privacy_level = "private"
+    game.save()
+    game.event.refresh_from_db()
+    assert game.event.updated_on == updated_on
+    game.title = "A renamed campaign"
+    game.save()
+    game.event.refresh_from_db()
+    assert game.event.title == "A renamed campaign"
+
+
+def test_visible_games_cache_invalidation(settings, game_testdata):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "game-visibility",
+        }
+    }
+    gamer = game_testdata.gamer2
+    assert game_testdata.gp2 not in visibility.visible_games(gamer)
+    assert game_testdata.gp4 not in visibility.visible_games(gamer)
+    game_testdata.comm1.add_member(gamer)
+    assert game_testdata.gp2 in visibility.visible_games(gamer)
+    models.Player.objects.create(game=game_testdata.gp4, gamer=gamer)
+    assert game_testdata.gp4 in visibility.visible_games(gamer)
+    game_testdata.gp2.privacy_level = "private"
+    game_testdata.gp2.save()
+    assert game_testdata.gp2 not in visibility.visible_games(gamer)
+    game_testdata.gamer1.friends.add(gamer)
+    game_testdata.gp2.privacy_level = "community"
+    game_testdata.gp2.save()
+    game_testdata.comm1.remove_member(gamer)
+    assert game_testdata.gp2 in visibility.visible_games(gamer)
+    game_testdata.gamer1.friends.remove(gamer)
+    assert game_testdata.gp2 not in visibility.visible_games(gamer)
+
+
+def test_visibility_bumps_leave_unrelated_gamers(settings, game_testdata):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "game-visibility",
+        }
+    }
+    stranger = factories.GamerProfileFactory()
+    member = game_testdata.gamer2
+    visibility.visible_game_ids(stranger)
+    stranger_versions = visibility.get_versions(stranger.pk)
+    member_versions = visibility.get_versions(member.pk)
+    game_testdata.comm1.add_member(member)
+    game_testdata.gp2.privacy_level = "private"
+    game_testdata.gp2.save()
+    game_testdata.gp2.communities.remove(game_testdata.comm1)
+    assert visibility.get_versions(stranger.pk) == stranger_versions
+    assert visibility.get_versions(member.pk) != member_versions
@@ -0,0 +1,99 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import availability, models
+from ..scheduling import GameScheduler, round_up_to_slot
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.mark.parametrize(
+    "minute, second, expected_minute",
+    [(0, 0, 0), (15, 0, 15), (1, 0, 15), (14, 59, 15), (45, 1, 0)],
+)
+def test_round_up_to_slot(minute, second, expected_minute):
+    value = datetime(2020, 3, 2, 10, minute, second, tzinfo=pytz.UTC)
+    assert round_up_to_slot(value).minute == expected_minute
+
+
+@pytest.fixture
+def conflicting_event(game_testdata):
+    start = round_up_to_slot(timezone.now() + timedelta(days=2))
+    return models.GameEvent.objects.create(
+        calendar=game_testdata.calendar3,
+        creator=game_testdata.gamer3.user,
+        start=start,
+        end=start + timedelta(hours=3),
+        title="Dentist",
+        description="Ouch",
+    )
+
+
+def test_check_time(game_testdata, conflicting_event):
+    start = conflicting_event.start + timedelta(hours=1)
+    scheduler = GameScheduler(game_testdata.gp2, start, start)
+    avail_conflicts, occurrence_conflicts = scheduler.check_time(start)
+    assert not avail_conflicts
+    assert occurrence_conflicts == [game_testdata.gamer3]
+    later = conflicting_event.end + timedelta(hours=1)
+    assert not scheduler.has_conflict(game_testdata.gamer3, later)
+
+
+def test_has_conflict_inside_longer_event(game_testdata, conflicting_event):
+    start = conflicting_event.start + timedelta(minutes=30)
+    models.GameEvent.objects.create(
+        calendar=game_testdata.calendar3,
+        creator=game_testdata.gamer3.user,
+        start=start,
+        end=start + timedelta(minutes=15),
+        title="Coffee",
+        description="Quick",
+    )
+    candidate = conflicting_event.start + timedelta(hours=2)
+    scheduler = GameScheduler(game_testdata.gp2, candidate, candidate)
+    assert scheduler.has_conflict(game_testdata.gamer3, candidate)
+
+
+def test_is_available_unaligned_start(game_testdata):
+    start = datetime(2020, 3, 2, 16, 0, tzinfo=pytz.UTC)
+    scheduler = GameScheduler(game_testdata.gp2, start, start)
+    slot = availability.minute_of_week(start) // availability.SLOT_MINUTES
+    scheduler.session_fits = {game_testdata.gamer3.id: 1 << slot}
+    unaligned = start + timedelta(minutes=5)
+    assert scheduler.is_available(game_testdata.gamer3, start)
+    assert not scheduler.is_available(game_testdata.gamer3, unaligned)
+    scheduler.session_fits[game_testdata.gamer3.id] |= 1 << (slot + 1)
+    assert scheduler.is_available(game_testdata.gamer3, unaligned)
+
+
+def test_suggest_slots(game_testdata, conflicting_event):
+    start = conflicting_event.start - timedelta(hours=1)
+    scheduler = GameScheduler(
+        game_testdata.gp2, start, conflicting_event.end + timedelta(hours=4)
+    )
+    slots = scheduler.suggest_slots(limit=2, step=timedelta(hours=1))
+    assert [slot["start"] for slot in slots] == [
+        conflicting_event.end,
+        conflicting_event.end + timedelta(hours=3),
+    ]
+    for slot in slots:
+        assert slot["available_players"] == slot["total_players"] == 2
+        assert not slot["conflict_issues"]
+
+
+@pytest.mark.parametrize(
+    "gamer_to_use, expected_status", [(None, 302), ("gamer3", 403), ("gamer1", 200)]
+)
+def test_suggest_slots_view(client, game_testdata, gamer_to_use, expected_status):
+    url = reverse("games:adhoc_suggest_slots", kwargs={"game": game_testdata.gp2.slug})
+    if gamer_to_use:
+        client.force_login(user=getattr(game_testdata, gamer_to_use).user)
+    response = client.post(url, data={"weeks": 1, "limit": 3})
+    assert response.status_code == expected_status
+    if expected_status == 200:
+        assert len(json.loads(response.content)["slots"]) == 3
@@ -9,6 +9,7 @@ from schedule.models import Event, Rule
 
 from ...gamer_profiles.models import GamerProfile
 from ..models import AvailableCalendar
+from ..tasks import rebuild_weekly_availability
 from ..tests.fixtures import GamesTData
 
 pytestmark = pytest.mark.django_db(transaction=True)
@@ -89,6 +90,7 @@ class AvailTData(GamesTData):
             rule=self.weeklyrule,
             title="extraavail",
         )
+        rebuild_weekly_availability()
 
 
 @pytest.fixture
@@ -1,5 +1,6 @@
 import logging
 from datetime import timedelta
+from decimal import Decimal
 
 import pytest
 from django.contrib.contenttypes.models import ContentType
@@ -7,8 +8,10 @@ from django.db.models.signals import m2m_changed, post_delete, post_save, pre_de
 from django.utils import timezone
 from factory.django import mute_signals
 from notifications.models import Notification
+from schedule.models import Event, Occurrence
 
 from .. import models, tasks
+from ...gamer_profiles.models import CommunityMembership
 from ..tests.fixtures import GamesTData
 
 pytestmark = pytest.mark.django_db(transaction=True)
@@ -369,3 +372,332 @@ def test_long_name_multiple(game_notify_testdata):
         == 1
     )
     assert "..." in Notification.objects.latest("timestamp").verb
+
+
+def get_occurrence_times(occurrences):
+    return sorted((occ.start, occ.cancelled) for occ in occurrences)
+
+
+def test_materialized_occurrences_match_expansion(game_testdata):
+    event = models.GameEvent.objects.get(pk=game_testdata.gp2.event.pk)
+    assert models.OccurrenceHorizon.objects.filter(event=event).exists()
+    start, end = models.OccurrenceHorizon.objects.get_default_window()
+    materialized = models.MaterializedOccurrence.objects.get_occurrences_for_events(
+        [event], start, end
+    )[event.id]
+    assert len(materialized) > 0
+    assert get_occurrence_times(materialized) == get_occurrence_times(
+        event.get_occurrences(start, end)
+    )
+
+
+def test_materialized_occurrences_regenerated_on_rule_change(game_testdata):
+    event_id = game_testdata.gp2.event.pk
+    weekly_count = models.MaterializedOccurrence.objects.filter(
+        event_id=event_id
+    ).count()
+    game_testdata.gp2.game_frequency = "monthly"
+    game_testdata.gp2.save()
+    event = models.GameEvent.objects.get(pk=event_id)
+    assert event.rule.name == "monthly"
+    assert models.OccurrenceHorizon.objects.filter(event=event).exists()
+    start, end = models.OccurrenceHorizon.objects.get_default_window()
+    assert (
+        models.MaterializedOccurrence.objects.filter(event_id=event_id).count()
+        < weekly_count
+    )
+    for child_event in event.get_child_events():
+        assert get_occurrence_times(
+            models.MaterializedOccurrence.objects.get_occurrences_for_events(
+                [child_event], start, end
+            )[child_event.id]
+        ) == get_occurrence_times(child_event.get_occurrences(start, end))
+
+
+def test_extend_occurrence_horizon(game_testdata):
+    event_id = game_testdata.gp2.event.pk
+    models.MaterializedOccurrence.objects.invalidate_events([event_id])
+    assert not models.MaterializedOccurrence.objects.filter(event_id=event_id).exists()
+    pruned, extended, materialized = tasks.extend_occurrence_horizon()
+    assert materialized > 0
+    assert models.MaterializedOccurrence.objects.filter(event_id=event_id).exists()
+    horizon = models.OccurrenceHorizon.objects.get(event_id=event_id)
+    horizon.end = horizon.end - timedelta(days=14)
+    horizon.save()
+    models.MaterializedOccurrence.objects.filter(
+        event_id=event_id, start__gte=horizon.end
+    ).delete()
+    pruned, extended, materialized = tasks.extend_occurrence_horizon()
+    assert extended >= 2
+    assert materialized == 0
+
+
+def test_next_session_reads_from_materialized_occurrences(game_testdata):
+    expected = game_testdata.gp2.get_next_scheduled_session_occurrence()
+    models.MaterializedOccurrence.objects.invalidate_events(
+        [game_testdata.gp2.event.pk]
+    )
+    assert game_testdata.gp2.get_next_scheduled_session_occurrence() == expected
+
+
+def test_occurrence_propagation_skips_existing_links(game_testdata):
+    master_event = models.GameEvent.objects.get(pk=game_testdata.gp2.event.pk)
+    child_events = list(master_event.get_child_events())
+    master_occurrences = list(master_event.occurrence_set.all())
+    assert master_occurrences
+    existing_links = models.ChildOccurenceLink.objects.filter(
+        master_event_occurence__in=master_occurrences
+    ).count()
+    created = tasks.propagate_occurrences_to_child_events(
+        master_occurrences, child_events
+    )
+    assert (
+        models.ChildOccurenceLink.objects.filter(
+            master_event_occurence__in=master_occurrences
+        ).count()
+        == existing_links + created
+        == len(master_occurrences) * len(child_events)
+    )
+    assert (
+        tasks.propagate_occurrences_to_child_events(master_occurrences, child_events)
+        == 0
+    )
+
+
+def test_refresh_child_event_caches_syncs_copies(game_testdata):
+    master_event = models.GameEvent.objects.get(pk=game_testdata.gp2.event.pk)
+    child_events = list(master_event.get_child_events())
+    for child_event in child_events:
+        models.MaterializedOccurrence.objects.materialize_event(child_event)
+    start, end = models.OccurrenceHorizon.objects.get_default_window()
+    master_occurrences = list(
+        master_event.occurrence_set.filter(start__gte=start, end__lt=end)
+    )
+    assert master_occurrences
+    tasks.propagate_occurrences_to_child_events(master_occurrences, child_events)
+    copies = Occurrence.objects.filter(
+        master_occurence_link__master_event_occurence__in=master_occurrences
+    )
+    copies.update(cancelled=True)
+    tasks.refresh_child_event_caches(child_events, master_occurrences)
+    for copy in copies:
+        row = models.MaterializedOccurrence.objects.get(
+            event_id=copy.event_id, original_start=copy.original_start
+        )
+        assert row.occurrence_id == copy.id
+        assert row.cancelled
+
+
+def test_virtual_player_calendar_replaces_child_events(settings, game_testdata):
+    master_event = models.GameEvent.objects.get(pk=game_testdata.gp2.event.pk)
+    child_ids = set(master_event.get_child_events().values_list("id", flat=True))
+    assert child_ids
+    settings.GAMES_VIRTUAL_PLAYER_CALENDARS = True
+    event_ids = set(
+        models.GameEvent.objects.for_calendar(game_testdata.calendar3).values_list(
+            "id", flat=True
+        )
+    )
+    assert master_event.id in event_ids
+    assert not event_ids & child_ids
+    with pytest.raises(ValueError):
+        tasks.restore_player_event_copies()
+    assert tasks.remove_player_event_copies(batch_size=1) == len(child_ids)
+    assert not master_event.get_child_events().exists()
+    assert master_event.generate_missing_child_events([game_testdata.calendar3]) == 0
+    upcoming = next(
+        models.MaterializedOccurrence.objects.calendar_occurrences_after(
+            game_testdata.calendar3
+        )
+    )
+    assert upcoming.event.id == master_event.id
+    settings.GAMES_VIRTUAL_PLAYER_CALENDARS = False
+    with pytest.raises(ValueError):
+        tasks.remove_player_event_copies()
+    assert tasks.restore_player_event_copies() >= len(child_ids)
+    assert master_event.get_child_events().count() == len(child_ids)
+
+
+def test_virtual_events_by_calendar_match_for_calendar(
+    settings, game_testdata, django_assert_max_num_queries
+):
+    settings.GAMES_VIRTUAL_PLAYER_CALENDARS = True
+    calendars = [
+        game_testdata.calendar1,
+        game_testdata.calendar3,
+        game_testdata.calendar4,
+    ]
+    start = timezone.now() - timedelta(days=30)
+    end = timezone.now() + timedelta(days=30)
+    with django_assert_max_num_queries(3):
+        events_by_calendar = models.GameEvent.objects.get_events_by_calendar(
+            calendars, start, end
+        )
+    for calendar in calendars:
+        assert {event.id for event in events_by_calendar[calendar.id]} == set(
+            models.GameEvent.objects.for_calendar(calendar)
+            .filter(start__lte=end)
+            .exclude(end_recurring_period__lt=start)
+            .values_list("id", flat=True)
+        )
+    settings.GAMES_VIRTUAL_PLAYER_CALENDARS = False
+
+
+def test_next_session_at_kept_current(game_testdata):
+    game = models.GamePosting.objects.get(pk=game_testdata.gp2.pk)
+    expected = game.get_next_scheduled_session_occurrence().start
+    assert game.next_session_time == expected
+    models.GamePosting.objects.filter(pk=game.pk).update(next_session_at=None)
+    assert tasks.sweep_next_session_times() >= 1
+    game.refresh_from_db()
+    assert game.next_session_at == expected
+    assert tasks.sweep_next_session_times() == 0
+
+
+def test_next_session_refresh_skipped_for_unrelated_edits(game_testdata):
+    game = models.GamePosting.objects.get(pk=game_testdata.gp2.pk)
+    expected = game.next_session_at
+    models.GamePosting.objects.filter(pk=game.pk).update(next_session_at=None)
+    game.max_players += 1
+    game.save()
+    game.refresh_from_db()
+    assert game.next_session_at is None
+    game.title = "A new title"
+    game.save()
+    game.refresh_from_db()
+    assert game.next_session_at == expected
+
+
+def test_create_upcoming_sessions(game_testdata, django_assert_max_num_queries):
+    game_testdata.session2.delete()
+    models.GamePosting.objects.filter(pk=game_testdata.gp2.pk).update(status="started")
+    game = models.GamePosting.objects.get(pk=game_testdata.gp2.pk)
+    assert game.next_session_at
+    with django_assert_max_num_queries(30):
+        created, duration = tasks.create_upcoming_sessions()
+    assert created == 1
+    assert duration >= 0
+    session = models.GameSession.objects.get(game=game, status="pending")
+    assert session.scheduled_time == game.next_session_at
+    assert session.occurrence.event_id == game.event_id
+    assert set(session.players_expected.all()) == {
+        game_testdata.player1,
+        game_testdata.player2,
+    }
+    assert (
+        models.ChildOccurenceLink.objects.filter(
+            master_event_occurence=session.occurrence
+        ).count()
+        == 2
+    )
+    assert tasks.create_upcoming_sessions()[0] == 0
+
+
+def test_calculate_player_attendance_rollups(game_testdata):
+    session = game_testdata.session2
+    session.players_expected.add(game_testdata.player1, game_testdata.player2)
+    session.players_missing.add(game_testdata.player2)
+    session.status = "complete"
+    session.save()
+    game_testdata.player1.refresh_from_db()
+    game_testdata.player2.refresh_from_db()
+    assert game_testdata.player1.sessions_expected == 1
+    assert game_testdata.player1.sessions_missed == 0
+    assert game_testdata.player2.sessions_expected == 1
+    assert game_testdata.player2.sessions_missed == 1
+    game_testdata.gamer4.refresh_from_db()
+    game_testdata.gamer3.refresh_from_db()
+    assert game_testdata.gamer4.attendance_record == Decimal("1")
+    assert game_testdata.gamer3.attendance_record == Decimal("0")
+    assert CommunityMembership.objects.get(
+        gamer=game_testdata.gamer3, community=game_testdata.comm1
+    ).comm_game_attendance_record == Decimal("0")
+    session.status = "pending"
+    session.save()
+    game_testdata.player2.refresh_from_db()
+    assert game_testdata.player2.sessions_expected == 0
+    assert game_testdata.player2.sessions_missed == 0
+    game_testdata.gamer3.refresh_from_db()
+    assert game_testdata.gamer3.attendance_record is None
+
+
+def test_completed_session_counter(game_testdata):
+    game = game_testdata.gp2
+    game.refresh_from_db()
+    assert game.sessions == 1
+    modified = game.modified
+    game_testdata.session2.status = "complete"
+    game_testdata.session2.save()
+    game.refresh_from_db()
+    assert game.sessions == 2
+    assert game.modified == modified  # The game itself was not re-saved.
+    game_testdata.session1.status = "cancel"
+    game_testdata.session1.save()
+    game_testdata.session2.delete()
+    game.refresh_from_db()
+    assert game.sessions == 0
+
+
+def test_reconcile_counters(game_testdata):
+    tasks.reconcile_counters()
+    models.GamePosting.objects.filter(pk=game_testdata.gp2.pk).update(sessions=5)
+    models.GamerProfile.objects.filter(pk=game_testdata.gamer1.pk).update(
+        games_created=0, games_joined=0
+    )
+    assert tasks.reconcile_counters() == 2
+    game_testdata.gp2.refresh_from_db()
+    game_testdata.gamer1.refresh_from_db()
+    assert game_testdata.gp2.sessions == 1
+    assert game_testdata.gamer1.games_created == 1
+    assert game_testdata.gamer1.games_joined == 1
+    assert tasks.reconcile_counters() == 0
+
+
+def test_remove_event_and_descendants(game_testdata, django_assert_max_num_queries):
+    event = game_testdata.gp2.event
+    event_ids = [event.id] + list(
+        event.get_child_events().values_list("id", flat=True)
+    )
+    planned = tasks.remove_event_and_descendants(event, dry_run=True)
+    assert planned["schedule.Event"] == len(event_ids)
+    assert planned["games.GameSession (updated)"] == 2
+    assert models.GameEvent.objects.filter(id__in=event_ids).count() == len(event_ids)
+    with django_assert_max_num_queries(20):
+        deleted = tasks.remove_event_and_descendants(event)
+    assert deleted == planned
+    assert not models.GameEvent.objects.filter(id__in=event_ids).exists()
+    game_testdata.gp2.refresh_from_db()
+    game_testdata.session1.refresh_from_db()
+    assert game_testdata.gp2.event is None
+    assert game_testdata.session1.occurrence is None
+
+
+def test_clean_expired_availability_events(settings, game_testdata):
+    settings.MAINTENANCE_BATCH_SIZE = 2
+    calendar = models.AvailableCalendar.objects.get_or_create_availability_calendar_for_gamer(
+        game_testdata.gamer1
+    )
+    start = timezone.now() - timedelta(days=30)
+    expired = [
+        Event.objects.create(
+            calendar=calendar,
+            start=start,
+            end=start + timedelta(hours=2),
+            end_recurring_period=timezone.now() - timedelta(days=1),
+            title="Expired {}".format(i),
+        )
+        for i in range(3)
+    ]
+    current = Event.objects.create(
+        calendar=calendar, start=start, end=start + timedelta(hours=2), title="Current",
+    )
+    game_event = game_testdata.gp2.event
+    models.GameEvent.objects.filter(pk=game_event.pk).update(
+        end_recurring_period=timezone.now() - timedelta(days=1)
+    )
+    result = tasks.clean_expired_availability_events()
+    assert result["rows"] == 3
+    assert result["batches"] == 2
+    assert not Event.objects.filter(pk__in=[e.pk for e in expired]).exists()
+    assert Event.objects.filter(pk=current.pk).exists()
+    assert Event.objects.filter(pk=game_event.pk).exists()
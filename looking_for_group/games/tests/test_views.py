@@ -1,14 +1,17 @@
+import json
 import urllib
 from datetime import timedelta
 
 import pytest
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
 from django.db.models.signals import post_save, pre_delete
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from factory.django import mute_signals
 
-from .. import models
+from .. import models, views
 from ...invites.models import Invite
 from ..utils import mkfirstOfmonth, mkLastOfMonth
 
@@ -70,6 +73,23 @@ def test_my_game_list(
         assert len(response.context["completed_game_list"]) == expected_past
 
 
+def test_game_list_sort_by_next_session(client, game_testdata):
+    models.GamePosting.objects.update(next_session_at=None)
+    models.GamePosting.objects.filter(pk=game_testdata.gp2.pk).update(
+        next_session_at=timezone.now() + timedelta(days=2)
+    )
+    client.force_login(user=game_testdata.gamer3.user)
+    response = client.get(
+        reverse("games:game_list"), data={"filter_present": 1, "sort": "next_session"}
+    )
+    assert response.status_code == 200
+    assert response.context["game_list"][0] == game_testdata.gp2
+    response = client.get(
+        reverse("games:game_list"), data={"filter_present": 1, "starts_within": 1}
+    )
+    assert not response.context["game_list"]
+
+
 @pytest.mark.parametrize(
     "gamer_to_use,post_data_key,expected_post_response",
     [
@@ -1171,6 +1191,34 @@ def test_calendar_json_view(
         assert response.status_code == expected_get_response
 
 
+def test_calendar_json_view_content(client, game_testdata, django_assert_max_num_queries):
+    query_values = {
+        "calendar_slug": game_testdata.gamer4.username,
+        "start": mkfirstOfmonth(timezone.now()).strftime("%Y-%m-%d"),
+        "end": (timezone.now() + timedelta(days=40)).strftime("%Y-%m-%d"),
+        "timezone": "America/New_York",
+    }
+    url = "{}?{}".format(
+        reverse("games:api_occurrences"), urllib.parse.urlencode(query_values)
+    )
+    client.force_login(user=game_testdata.gamer4.user)
+    with django_assert_max_num_queries(20):
+        response = client.get(url)
+        occurrences = json.loads(b"".join(response.streaming_content))
+    assert response.status_code == 200
+    assert len(occurrences) >= 4
+    for occurrence in occurrences:
+        assert occurrence["url"] == game_testdata.gp2.get_absolute_url()
+        assert occurrence["calendar"] == game_testdata.gamer4.username
+        assert not occurrence["cancelled"]
+    assert len({occurrence["id"] for occurrence in occurrences}) == len(occurrences)
+    response = client.get(url)
+    assert [
+        occurrence["id"]
+        for occurrence in json.loads(b"".join(response.streaming_content))
+    ] == [occurrence["id"] for occurrence in occurrences]
+
+
 @pytest.mark.parametrize(
     "view_name, gamer_to_use, expected_get_response, expected_post_response",
     [
@@ -1620,3 +1668,65 @@ def test_profile_export(
         assert assert_login_redirect(response)
     else:
         assert response.status_code == expected_get_response
+
+
+def test_game_list_keyset_pagination(client, game_testdata, monkeypatch):
+    monkeypatch.setattr(views.GamePostingListView, "paginate_by", 1)
+    client.force_login(user=game_testdata.gamer4.user)
+    response = client.get(reverse("games:game_list"))
+    assert response.status_code == 200
+    page = response.context["page_obj"]
+    assert page.is_keyset and page.has_next() and not page.has_previous()
+    seen = list(response.context["game_list"])
+    while page.has_next():
+        response = client.get(reverse("games:game_list"), {"cursor": page.next_cursor})
+        assert response.status_code == 200
+        page = response.context["page_obj"]
+        seen += list(response.context["game_list"])
+    assert len(seen) == 3
+    assert seen == sorted(seen, key=lambda game: game.modified, reverse=True)
+    response = client.get(reverse("games:game_list"), {"page": 1})
+    assert response.status_code == 200
+    assert not getattr(response.context["page_obj"], "is_keyset", False)
+    assert (
+        client.get(reverse("games:game_list"), {"cursor": "garbage"}).status_code == 404
+    )
+
+
+def test_game_list_rows_are_cached_by_version(client, settings, game_testdata):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "template-fragments",
+        }
+    }
+    client.force_login(user=game_testdata.gamer4.user)
+    url = reverse("games:game_list")
+    with CaptureQueriesContext(connection) as cold:
+        assert client.get(url).status_code == 200
+    with CaptureQueriesContext(connection) as warm:
+        response = client.get(url)
+    assert game_testdata.gp1.title.encode() in response.content
+    assert len(warm) < len(cold)
+    game_testdata.gp1.title = "A retitled game"
+    game_testdata.gp1.save()
+    response = client.get(url)
+    assert b"A retitled game" in response.content
+
+
+def test_game_list_rows_vary_on_timezone(client, settings, game_testdata):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "template-fragments",
+        }
+    }
+    game_testdata.gamer1.user.timezone = "America/New_York"
+    game_testdata.gamer1.user.save()
+    game_testdata.gamer3.user.timezone = "Asia/Tokyo"
+    game_testdata.gamer3.user.save()
+    url = reverse("games:game_list")
+    client.force_login(user=game_testdata.gamer1.user)
+    assert b"JST" not in client.get(url).content
+    client.force_login(user=game_testdata.gamer3.user)
+    assert b"JST" in client.get(url).content
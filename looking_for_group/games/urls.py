@@ -222,5 +222,15 @@ urlpatterns = [
         view=views.AdHocSessionCheckConflicts.as_view(),
         name="adhoc_check_conflicts",
     ),
+    path(
+        "sessions/<slug:session>/suggestslots/",
+        view=views.GameSessionRescheduleSuggestSlots.as_view(),
+        name="session_suggest_slots",
+    ),
+    path(
+        "game/<slug:game>/adhoc/suggestslots/",
+        view=views.AdHocSessionSuggestSlots.as_view(),
+        name="adhoc_suggest_slots",
+    ),
     path("", views.GamePostingListView.as_view(), name="game_list"),
 ]
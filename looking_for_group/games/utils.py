@@ -1,5 +1,7 @@
 import datetime
+from decimal import Decimal
 
+from django.conf import settings
 from django.db import DEFAULT_DB_ALIAS, connections
 
 
@@ -10,6 +12,24 @@ def check_table_exists(table_name):
     return table_name in [i[0] for i in table_list]
 
 
+def virtual_player_calendars_enabled():
+    """
+    Check if player calendars are assembled from the master events of their games at read time.
+    """
+    return getattr(settings, "GAMES_VIRTUAL_PLAYER_CALENDARS", False)
+
+
+def attendance_rate(sessions_expected, sessions_missed):
+    """
+    Return the share of expected sessions that were attended, or None if no sessions were expected.
+    """
+    if not sessions_expected:
+        return None
+    return (1 - Decimal(sessions_missed) / Decimal(sessions_expected)).quantize(
+        Decimal("0.0001")
+    )
+
+
 def mkDateTime(datestring, date_format="%Y-%m-%d %z"):
     return datetime.datetime.strptime(datestring, date_format)
 
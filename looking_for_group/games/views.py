@@ -14,24 +14,39 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 from django.db.models import F
 from django.db.models.query_utils import Q
-from django.http import Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseRedirect
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseRedirect,
+    StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.views import generic
 from notifications.signals import notify
 from rest_framework.renderers import JSONRenderer
 from rules.contrib.views import PermissionRequiredMixin
-from schedule.models import Calendar, Occurrence
-from schedule.periods import Day, Month
+from schedule.models import Calendar
+from schedule.periods import Month
 
-from . import forms, models, serializers
+from . import forms, models, serializers, visibility
+from ..counters import apply_deltas
+from ..fragments import set_fragment_versions
 from ..game_catalog.models import GameEdition, GameSystem, PublishedModule
 from ..gamer_profiles.models import GamerProfile
 from ..locations.forms import LocationForm
 from ..locations.models import Location
-from .mixins import JSONResponseMixin
+from ..pagination import KeysetPaginationMixin
+from .mixins import (
+    JSONResponseMixin,
+    conditional_calendar_response,
+    get_occurrence_uid,
+    stream_json_list
+)
+from .scheduling import GameScheduler
 from .signals import player_kicked, player_left
 from .utils import mkfirstOfmonth, mkLastOfMonth
 
@@ -39,9 +54,28 @@ from .utils import mkfirstOfmonth, mkLastOfMonth
 
 logger = logging.getLogger("games")
 
+# The objects shown with a game in its list row and details card.
+game_fragment_dependencies = [
+    "gm",
+    "gm__user",
+    "game_system",
+    "game_location",
+    "published_game",
+    "published_game__game",
+    "published_game__game_system",
+    "published_module",
+    "published_module__parent_game_edition",
+    "published_module__parent_game_edition__game",
+    "published_module__parent_game_edition__game_system",
+]
+
 
 class GameListAbstractView(
-    LoginRequiredMixin, SelectRelatedMixin, PrefetchRelatedMixin, generic.ListView
+    LoginRequiredMixin,
+    SelectRelatedMixin,
+    PrefetchRelatedMixin,
+    KeysetPaginationMixin,
+    generic.ListView,
 ):
     """
     A generic view that can be used to load the game lists and handle all the filtering.
@@ -62,6 +96,8 @@ class GameListAbstractView(
     filter_querystring = None
     filter_venue = None
     filter_distance = None
+    filter_starts_within = None
+    filter_sort = None
     stub_queryset = None
 
     def get_context_data(self, **kwargs):
@@ -85,6 +121,8 @@ class GameListAbstractView(
                     "similar_availability": self.filter_availability,
                     "venue": self.filter_venue,
                     "distance": self.filter_distance,
+                    "starts_within": self.filter_starts_within,
+                    "sort": self.filter_sort,
                 },
             )
         else:
@@ -94,25 +132,9 @@ class GameListAbstractView(
 
     def get_stub_queryset(self):
         if not self.stub_queryset:
-            gamer = self.request.user.gamerprofile
-            friends = gamer.friends.all()
-            communities = [f.id for f in gamer.communities.all()]
-            game_player_ids = [
-                obj.game.id
-                for obj in models.Player.objects.filter(gamer=gamer).select_related(
-                    "game"
-                )
-            ]
-            q_gm = Q(gm=gamer)
-            q_gm_is_friend = Q(gm__in=friends) & Q(privacy_level="community")
-            q_isplayer = Q(id__in=game_player_ids)
-            q_community = Q(communities__id__in=communities) & Q(
-                privacy_level="community"
+            self.stub_queryset = visibility.visible_games(
+                self.request.user.gamerprofile
             )
-            q_public = Q(privacy_level="public")
-            self.stub_queryset = models.GamePosting.objects.filter(
-                q_gm | q_public | q_gm_is_friend | q_isplayer | q_community
-            ).distinct()
         return self.stub_queryset
 
     def handle_form_filters(self, queryset):
@@ -124,6 +146,9 @@ class GameListAbstractView(
             system = get_dict.pop("system", None)
             print(system)
             module = get_dict.pop("module", None)
+            similar_availability = get_dict.pop("similar_availability", None)
+            starts_within = get_dict.pop("starts_within", None)
+            sort = get_dict.pop("sort", None)
             self.filter_venue = get_dict.pop("venue", None)
             if self.filter_venue and self.filter_venue[0] != "":
                 self.is_filtered = True
@@ -181,10 +206,64 @@ class GameListAbstractView(
                     self.filter_module = mod_obj.pk
                 except ObjectDoesNotExist:
                     pass
+            if similar_availability and similar_availability[0] != "":
+                query_string_data["similar_availability"] = similar_availability[0]
+                self.is_filtered = True
+                self.filter_availability = True
+                queryset = self.filter_by_gm_availability(queryset)
+            if starts_within and starts_within[0].isdigit():
+                query_string_data["starts_within"] = starts_within[0]
+                self.is_filtered = True
+                self.filter_starts_within = starts_within[0]
+                queryset = self.filter_by_next_session(queryset, int(starts_within[0]))
+            if sort and sort[0] == "next_session":
+                query_string_data["sort"] = sort[0]
+                self.is_filtered = True
+                self.filter_sort = sort[0]
+                queryset = queryset.order_by(
+                    F("next_session_at").asc(nulls_last=True), "-modified"
+                )
             if query_string_data:
                 self.filter_querystring = urllib.parse.urlencode(query_string_data)
         return queryset
 
+    def filter_by_next_session(self, queryset, days):
+        """
+        Narrow the queryset to games with a session starting in the next number of days.
+        """
+        now = timezone.now()
+        return queryset.filter(
+            next_session_at__gte=now,
+            next_session_at__lte=now + datetime.timedelta(days=days),
+        )
+
+    def filter_by_gm_availability(self, queryset):
+        """
+        Narrow the queryset to games where the GM's weekly availability overlaps the user's.
+        GMs that have not specified availability are treated as an ambiguous match.
+        """
+        gamer = self.request.user.gamerprofile
+        bitmap = models.WeeklyAvailability.objects.get_bitmaps_for_gamers([gamer])[
+            gamer.id
+        ]
+        if not bitmap:
+            messages.info(
+                self.request,
+                _(
+                    "You have not set your availability yet, so we can't filter games by the GM's schedule."
+                ),
+            )
+            return queryset
+        return queryset.filter(
+            Q(
+                gm__in=models.WeeklyAvailability.objects.overlapping(bitmap).values(
+                    "gamer_id"
+                )
+            )
+            | Q(gm__weekly_availability__isnull=True)
+            | Q(gm__weekly_availability__bitmap=0)
+        )
+
     def get_queryset(self):
         return self.handle_form_filters(
             self.get_stub_queryset()
@@ -200,6 +279,13 @@ class GamePostingListView(GameListAbstractView):
 
     template_name = "games/game_list.html"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["game_list"] = set_fragment_versions(
+            context["game_list"], game_fragment_dependencies
+        )
+        return context
+
 
 class MyGameList(GameListAbstractView):
     """
@@ -212,14 +298,10 @@ class MyGameList(GameListAbstractView):
     def get_stub_queryset(self):
         if not self.stub_queryset:
             gamer = self.request.user.gamerprofile
-            game_player_ids = [
-                obj.game.id
-                for obj in models.Player.objects.filter(gamer=gamer).select_related(
-                    "game"
-                )
-            ]
             q_gm = Q(gm=gamer)
-            q_is_player = Q(id__in=game_player_ids)
+            q_is_player = Q(
+                id__in=models.Player.objects.filter(gamer=gamer).values("game_id")
+            )
             self.stub_queryset = models.GamePosting.objects.filter(q_gm | q_is_player)
         return self.stub_queryset
 
@@ -313,7 +395,6 @@ class GamePostingCreateView(LoginRequiredMixin, generic.CreateView):
             else:
                 self.game_posting.game_location = game_location
         self.game_posting.save()
-        self.game_posting.gm.games_created = F("gamed_created") + 1
         return HttpResponseRedirect(reverse_lazy("games:game_list"))
 
 
@@ -779,11 +860,16 @@ class GamePostingUpdateView(
                         )
             with transaction.atomic():
                 obj_to_save.save()
-                obj_to_save.gm.gm_games_finished = F("gm_games_finished") + value_to_add
-                obj_to_save.gm.save()
-                for gamer in obj_to_save.players.all():
-                    gamer.games_finished = F("games_finished") + value_to_add
-                    gamer.save()
+                apply_deltas(
+                    GamerProfile,
+                    {"pk": obj_to_save.gm_id},
+                    {"gm_games_finished": value_to_add},
+                )
+                apply_deltas(
+                    GamerProfile,
+                    {"pk__in": obj_to_save.players.values("pk")},
+                    {"games_finished": value_to_add},
+                )
             return HttpResponseRedirect(self.get_success_url())
         return super().form_valid(form)
 
@@ -1494,8 +1580,25 @@ class CalendarJSONView(
         )
         return get_object_or_404(self.model, slug=self.calendar_slug)
 
+    def get(self, request, *args, **kwargs):
+        # Kept so that the response body reuses it rather than fetching the calendar again.
+        self.calendar = self.get_object()
+        return conditional_calendar_response(
+            request,
+            models.CalendarVersion.objects.get_for_calendar(self.calendar),
+            lambda: super(CalendarJSONView, self).get(request, *args, **kwargs),
+            "json",
+            self.start,
+            self.end,
+            self.timezone,
+        )
+
     def render_to_json_response(self, context, **response_kwargs):
-        return super().render_to_json_response(context, safe=False, **response_kwargs)
+        return StreamingHttpResponse(
+            stream_json_list(self.get_data(context)),
+            content_type="application/json",
+            **response_kwargs
+        )
 
     def get_queryset(self):
         return Calendar.objects.all()
@@ -1506,10 +1609,16 @@ class CalendarJSONView(
                 self.start, self.end, self.calendar_slug, self.timezone
             )
         )
-        return _api_occurrences(self.start, self.end, self.calendar_slug, self.timezone)
+        return _api_occurrences(
+            self.start,
+            self.end,
+            self.calendar_slug,
+            self.timezone,
+            calendar=self.calendar,
+        )
 
 
-def _api_occurrences(start, end, calendar_slug, timezone):
+def _api_occurrences(start, end, calendar_slug, timezone, calendar=None):
 
     if not start or not end:
         raise ValueError("Start and end parameters are required")
@@ -1545,13 +1654,14 @@ def _api_occurrences(start, end, calendar_slug, timezone):
         start = utc.localize(start)
         end = utc.localize(end)
 
-    if calendar_slug:
+    if calendar:
+        calendars = [calendar]
+    elif calendar_slug:
         # will raise DoesNotExist exception if no match
         calendars = [Calendar.objects.get(slug=calendar_slug)]
     # if no calendar slug is given, get all the calendars
     else:
-        calendars = Calendar.objects.all()
-    response_data = []
+        calendars = list(Calendar.objects.all())
     # Algorithm to get an id for the occurrences in fullcalendar (NOT THE SAME
     # AS IN THE DB) which are always unique.
     # Fullcalendar thinks that all their "events" with the same "event.id" in
@@ -1561,63 +1671,74 @@ def _api_occurrences(start, end, calendar_slug, timezone):
     # Check the "persisted" boolean value that tells it whether to change the
     # event, using the "event_id" or the occurrence with the specified "id".
     # for more info https://github.com/llazzaro/django-scheduler/pull/169
-    i = 1
-    if Occurrence.objects.all().count() > 0:
-        i = Occurrence.objects.latest("id").id + 1
+    events_by_calendar = models.GameEvent.objects.get_events_by_calendar(
+        calendars, start, end
+    )
+    # create flat list of events from each calendar
     event_list = []
     for calendar in calendars:
-        # create flat list of events from each calendar
-        event_list += calendar.events.filter(start__lte=end).filter(
-            Q(end_recurring_period__gte=start) | Q(end_recurring_period__isnull=True)
-        )
-    for event in event_list:
-        occurrences = event.get_occurrences(start, end)
-        for occurrence in occurrences:
-            occurrence_id = i + occurrence.event.id
+        event_list += [(calendar, event) for event in events_by_calendar[calendar.id]]
+    event_occurrences = models.MaterializedOccurrence.objects.get_occurrences_for_events(
+        [event for calendar, event in event_list], start, end
+    )
+    game_slugs = models.GameEvent.objects.get_related_game_slugs(
+        [event.id for calendar, event in event_list]
+    )
+    return _iter_api_occurrences(event_list, event_occurrences, game_slugs, current_tz)
+
+
+def _iter_api_occurrences(event_list, event_occurrences, game_slugs, current_tz):
+    """
+    Generate the fullcalendar representation of the occurrences without any further queries.
+    Expects a list of (calendar, event) tuples, as virtual player calendars show events
+    that belong to another calendar.
+    """
+    for calendar, event in event_list:
+        game_url = None
+        if event.id in game_slugs:
+            game_url = reverse(
+                "games:game_detail", kwargs={"gameid": game_slugs[event.id]}
+            )
+        recur_rule = event.rule.name if event.rule else None
+        if event.end_recurring_period:
+            recur_period_end = event.end_recurring_period
+            if current_tz:
+                # make recur_period_end aware in given timezone
+                recur_period_end = recur_period_end.astimezone(current_tz)
+        else:
+            recur_period_end = None
+        for occurrence in event_occurrences[event.id]:
+            if occurrence.cancelled:
+                continue
+            occurrence_id = get_occurrence_uid(occurrence)
             existed = False
 
             if occurrence.id:
                 occurrence_id = occurrence.id
                 existed = True
 
-            recur_rule = occurrence.event.rule.name if occurrence.event.rule else None
-
-            if occurrence.event.end_recurring_period:
-                recur_period_end = occurrence.event.end_recurring_period
-                if current_tz:
-                    # make recur_period_end aware in given timezone
-                    recur_period_end = recur_period_end.astimezone(current_tz)
-                recur_period_end = recur_period_end
-            else:
-                recur_period_end = None
-
             event_start = occurrence.start
             event_end = occurrence.end
             if current_tz:
                 # make event start and end dates aware in given timezone
                 event_start = event_start.astimezone(current_tz)
                 event_end = event_end.astimezone(current_tz)
-            gevent = models.GameEvent.objects.get(pk=occurrence.event.pk)
-            if not occurrence.cancelled:
-                response_data.append(
-                    {
-                        "id": occurrence_id,
-                        "title": occurrence.title,
-                        "start": event_start,
-                        "end": event_end,
-                        "url": gevent.get_related_game().get_absolute_url(),
-                        "existed": existed,
-                        "event_id": occurrence.event.id,
-                        "color": occurrence.event.color_event,
-                        "description": occurrence.description,
-                        "rule": recur_rule,
-                        "end_recurring_period": recur_period_end,
-                        "creator": str(occurrence.event.creator),
-                        "calendar": occurrence.event.calendar.slug,
-                        "cancelled": occurrence.cancelled,
-                    }
-                )
-    return response_data
+            yield {
+                "id": occurrence_id,
+                "title": occurrence.title,
+                "start": event_start,
+                "end": event_end,
+                "url": game_url,
+                "existed": existed,
+                "event_id": event.id,
+                "color": event.color_event,
+                "description": occurrence.description,
+                "rule": recur_rule,
+                "end_recurring_period": recur_period_end,
+                "creator": str(event.creator),
+                "calendar": calendar.slug,
+                "cancelled": occurrence.cancelled,
+            }
 
 
 class PlayerLeaveGameView(
@@ -2083,45 +2204,26 @@ class ConflictCheckingMixin(object):
     avail_conflicts = None
     occurrence_conflicts = None
 
+    def get_scheduler(self, window_start, window_end, gamer_list=None):
+        return GameScheduler(
+            self.game, window_start, window_end, gamer_list=gamer_list
+        )
+
     def get_occurrences_that_overlap(self, gamer_list, start_time, end_time):
-        gamer_conflicts = []
-        for gamer in gamer_list:
-            cal, created = Calendar.objects.get_or_create(
-                slug=gamer.username,
-                defaults={"name": "{}'s calendar".format(gamer.username)},
-            )
-            if not created:
-                day_period = Day(cal.events.all(), start_time)
-                occs = day_period.get_occurrences()
-                for occ in occs:
-                    gep = models.GameEvent.objects.get(id=occ.event.id)
-                    if (
-                        not occ.cancelled
-                        and occ.start < end_time
-                        and occ.end > start_time
-                        and gamer not in gamer_conflicts
-                        and gep.get_related_game() != self.game
-                    ):
-                        # Here there be conflict
-                        gamer_conflicts.append(gamer)
-        return gamer_conflicts
+        scheduler = self.get_scheduler(start_time, start_time, gamer_list)
+        return [
+            gamer
+            for gamer in scheduler.gamers
+            if scheduler.has_conflict(gamer, start_time)
+        ]
 
     def avail_compare(self, gamer_list, start, end):
-        conflicts = []
-        for gamer in gamer_list:
-            acal = models.AvailableCalendar.objects.get_or_create_availability_calendar_for_gamer(
-                gamer
-            )
-            if (
-                acal.events.filter(
-                    end_recurring_period__isnull=True, rule__isnull=False
-                ).count()
-                > 0
-            ):
-                results = acal.check_proposed_time(start, end)
-                if results:
-                    conflicts.append(gamer)
-        return conflicts
+        scheduler = self.get_scheduler(start, start, gamer_list)
+        return [
+            gamer
+            for gamer in scheduler.gamers
+            if not scheduler.is_available(gamer, start)
+        ]
 
     def get_data(self):
         result = {"avail_issues": [], "conflict_issues": []}
@@ -2161,16 +2263,40 @@ class ConflictCheckingMixin(object):
         self.game = self.get_game()
         start_time = form.cleaned_data["scheduled_time"]
         logger.debug("Received {} for new time".format(start_time))
-        end_time = start_time + datetime.timedelta(
-            minutes=int(60 * self.game.session_length)
+        scheduler = self.get_scheduler(start_time, start_time)
+        self.avail_conflicts, self.occurrence_conflicts = scheduler.check_time(
+            start_time
         )
-        gamer_list = self.game.players.all()
+        return self.render_to_response(self.get_context_data())
+
+
+class SlotSuggestionMixin(ConflictCheckingMixin):
+    """
+    Instead of checking a single proposed time, score every possible start time over the next few weeks
+    and return the best slots for the players in the game.
+    """
 
-        self.avail_conflicts = self.avail_compare(gamer_list, start_time, end_time)
-        self.occurrence_conflicts = self.get_occurrences_that_overlap(
-            gamer_list, start_time, end_time
+    form_class = forms.SlotSuggestionForm
+    slots = None
+
+    def get_data(self):
+        return {"slots": self.slots}
+
+    def form_valid(self, form):
+        self.game = self.get_game()
+        window_start = form.cleaned_data["earliest"] or timezone.now()
+        if window_start < timezone.now():
+            window_start = timezone.now()
+        window_end = window_start + datetime.timedelta(
+            weeks=form.cleaned_data["weeks"]
         )
-        return self.render_to_response(self.get_context_data())
+        logger.debug(
+            "Searching for slots between {} and {}".format(window_start, window_end)
+        )
+        self.slots = self.get_scheduler(window_start, window_end).suggest_slots(
+            limit=form.cleaned_data["limit"]
+        )
+        return self.render_to_response({})
 
 
 class GameSessionRescheduleCheckConflicts(
@@ -2202,28 +2328,30 @@ class GameSessionRescheduleCheckConflicts(
         self.game = self.get_object().game
         return self.game
 
-    def form_valid(self, form):
-        self.game = self.get_game()
-        start_time = form.cleaned_data["scheduled_time"]
-        logger.debug("Received {} for new time".format(start_time))
-        end_time = start_time + datetime.timedelta(
-            minutes=int(60 * self.game.session_length)
-        )
-        gamer_list = self.game.players.all()
 
-        self.avail_conflicts = self.avail_compare(gamer_list, start_time, end_time)
-        self.occurrence_conflicts = self.get_occurrences_that_overlap(
-            gamer_list, start_time, end_time
-        )
-        return self.render_to_response(self.get_context_data())
+class GameSessionRescheduleSuggestSlots(
+    LoginRequiredMixin, PermissionRequiredMixin, SlotSuggestionMixin, generic.FormView
+):
+    """
+    Provide a JSON response of the best times to reschedule a session to.
+    """
 
-    def form_invalid(self, form):
-        logger.debug(self.request.POST)
-        return HttpResponse(
-            JSONRenderer().render({"form_errors": form.errors}),
-            content_type="application/json",
-            status=400,
-        )
+    permission_required = "game.can_edit_details"
+    game = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method.lower() not in ["post"]:
+            return HttpResponseNotAllowed(["POST"])
+        if request.user.is_authenticated:
+            session_slug = kwargs.pop("session", None)
+            self.session = get_object_or_404(
+                models.GameSession.objects.select_related("game"), slug=session_slug
+            )
+            self.game = self.session.game
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_permission_object(self):
+        return self.game
 
 
 class AdHocSessionCheckConflicts(
@@ -2247,25 +2375,23 @@ class AdHocSessionCheckConflicts(
     def get_permission_object(self):
         return self.game
 
-    def form_valid(self, form):
-        self.game = self.get_game()
-        start_time = form.cleaned_data["scheduled_time"]
-        logger.debug("Received {} for new time".format(start_time))
-        end_time = start_time + datetime.timedelta(
-            minutes=int(60 * self.game.session_length)
-        )
-        gamer_list = self.game.players.all()
 
-        self.avail_conflicts = self.avail_compare(gamer_list, start_time, end_time)
-        self.occurrence_conflicts = self.get_occurrences_that_overlap(
-            gamer_list, start_time, end_time
-        )
-        return self.render_to_response(self.get_context_data())
+class AdHocSessionSuggestSlots(
+    LoginRequiredMixin, PermissionRequiredMixin, SlotSuggestionMixin, generic.FormView
+):
+    """
+    Provide a JSON response of the best times to hold an ad hoc session.
+    """
 
-    def form_invalid(self, form):
-        logger.debug(self.request.POST)
-        return HttpResponse(
-            JSONRenderer().render({"form_errors": form.errors}),
-            content_type="application/json",
-            status=400,
-        )
+    permission_required = "game.can_edit_details"
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method.lower() not in ["post"]:
+            return HttpResponseNotAllowed(["POST"])
+        if request.user.is_authenticated:
+            game_slug = kwargs.pop("game", None)
+            self.game = get_object_or_404(models.GamePosting, slug=game_slug)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_permission_object(self):
+        return self.game
@@ -0,0 +1,139 @@
+"""
+Cached answers to "which games can this gamer see".
+
+Public games are visible to everyone and are filtered on the indexed
+``privacy_level`` column. The other games a gamer can see are resolved with
+:meth:`GamePostingQuerySet.visible_to` and their ids are cached per gamer. The cache
+key includes a version for the gamer, bumped when their friends, communities or games
+change or when a non-public game changes who can see it, and a version for all gamers
+for changes too broad to work out who is affected. Versions are random tokens rather than counters, so a version evicted from
+the cache can never bring back a stale entry.
+"""
+import logging
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.query_utils import Q
+
+from . import models
+from ..gamer_profiles.models import CommunityMembership, GamerProfile
+
+logger = logging.getLogger("games")
+
+ALL_GAMERS_VERSION_KEY = "game-visibility-version"
+
+
+def get_cache():
+    return caches[getattr(settings, "GAME_VISIBILITY_CACHE_ALIAS", "default")]
+
+
+def gamer_version_key(gamer_id):
+    return "game-visibility-version:{}".format(gamer_id)
+
+
+def get_versions(gamer_id):
+    """
+    Fetch the version for all gamers and for this gamer in one cache lookup, creating
+    any that are missing.
+    """
+    cache = get_cache()
+    keys = [ALL_GAMERS_VERSION_KEY, gamer_version_key(gamer_id)]
+    found = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def _bump(keys):
+    get_cache().set_many({key: uuid4().hex for key in keys}, timeout=None)
+
+
+def bump_gamers(gamer_ids):
+    """
+    Discard the cached visible games of the given gamers once the current transaction
+    commits.
+    """
+    keys = [gamer_version_key(gamer_id) for gamer_id in set(gamer_ids) if gamer_id]
+    if keys:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def bump_audience(gm_ids=(), game_ids=(), community_ids=(), friends_of_gm=False):
+    """
+    Discard the cached visible games of everyone who may see a non-public game through
+    the given relationships: the GMs, the players of the games, the members of the
+    communities and, if ``friends_of_gm`` is set, the friends of the GMs.
+    """
+    gm_ids = [gm_id for gm_id in gm_ids if gm_id]
+    gamer_ids = set(gm_ids)
+    if game_ids:
+        gamer_ids.update(
+            models.Player.objects.filter(game_id__in=game_ids).values_list(
+                "gamer_id", flat=True
+            )
+        )
+    if community_ids:
+        gamer_ids.update(
+            CommunityMembership.objects.filter(
+                community_id__in=community_ids
+            ).values_list("gamer_id", flat=True)
+        )
+    if friends_of_gm and gm_ids:
+        gamer_ids.update(
+            GamerProfile.friends.through.objects.filter(
+                to_gamerprofile_id__in=gm_ids
+            ).values_list("from_gamerprofile_id", flat=True)
+        )
+    bump_gamers(gamer_ids)
+
+
+def bump_all_gamers():
+    """
+    Discard the cached visible games of every gamer once the current transaction
+    commits.
+    """
+    transaction.on_commit(lambda: _bump([ALL_GAMERS_VERSION_KEY]))
+
+
+def visible_game_ids(gamer):
+    """
+    The ids of the non-public games the gamer can see.
+
+    :returns: list
+    """
+    key = "game-visibility:{}:{}:{}".format(gamer.pk, *get_versions(gamer.pk))
+    cache = get_cache()
+    game_ids = cache.get(key)
+    if game_ids is None:
+        game_ids = list(
+            models.GamePosting.objects.visible_to(gamer)
+            .exclude(privacy_level="public")
+            .order_by()
+            .values_list("pk", flat=True)
+        )
+        logger.debug(
+            "Cached {} non-public games visible to {}".format(len(game_ids), gamer)
+        )
+        cache.set(
+            key,
+            game_ids,
+            timeout=getattr(settings, "GAME_VISIBILITY_CACHE_TIMEOUT", 60 * 60),
+        )
+    return game_ids
+
+
+def visible_games(gamer, queryset=None):
+    """
+    Narrow a queryset of games to the ones the gamer can see, using the cached ids.
+
+    :param queryset: Defaults to all games.
+    """
+    if queryset is None:
+        queryset = models.GamePosting.objects.all()
+    return queryset.filter(
+        Q(privacy_level="public") | Q(pk__in=visible_game_ids(gamer))
+    )
@@ -2,6 +2,7 @@ from datetime import timedelta
 
 from django.utils import timezone
 
+from ..maintenance import PKRangeSweep
 from . import models
 
 
@@ -15,3 +16,18 @@ def clean_old_expired_invites():
     old_invites = models.Invite.objects.filter(status='expired', expires_at__lte=timezone.now() - timedelta(days=30))
     deleted_rows, delete_dict = old_invites.delete()
     return deleted_rows
+
+
+def expire_pending_invites():
+    """
+    Mark pending invites that are past their expiration date as expired. Invites
+    otherwise only notice that they have expired when they are saved.
+
+    :returns: dict -- The sweep result.
+    """
+    now = timezone.now()
+    return PKRangeSweep(
+        "expired invites",
+        models.Invite.objects.filter(status="pending", expires_at__lt=now),
+        updates={"status": "expired", "modified": now},
+    ).run()
@@ -52,3 +52,15 @@ class CleanUpTestCase(TestCase):
             invite.expires_at = timezone.now() - timedelta(days=60)
             invite.save()
         assert tasks.clean_old_expired_invites() == 10
+
+    def test_expire_pending_invites(self):
+        invite_ids = list(models.Invite.objects.values_list("pk", flat=True)[:10])
+        models.Invite.objects.filter(pk__in=invite_ids).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        models.Invite.objects.filter(pk=invite_ids[0]).update(status="accepted")
+        result = tasks.expire_pending_invites()
+        assert result["rows"] == 9
+        assert models.Invite.objects.filter(status="expired").count() == 9
+        assert models.Invite.objects.filter(status="pending").count() == 10
+        assert tasks.expire_pending_invites()["rows"] == 0
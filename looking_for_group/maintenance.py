@@ -0,0 +1,110 @@
+"""
+Periodic clean up of rows that have expired.
+
+A sweep walks the rows matching its queryset in primary key ranges and changes each
+range with a single statement in its own short transaction, so it never holds locks
+for long no matter how many rows match. Every sweep reports how many rows it changed
+and how long it took; :func:`run_maintenance` runs all of the sweeps listed in the
+``MAINTENANCE_SWEEPS`` setting and returns those figures, so they are stored with the
+result of the scheduled task.
+"""
+import logging
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger("maintenance")
+
+
+def get_batch_size():
+    return getattr(settings, "MAINTENANCE_BATCH_SIZE", 1000)
+
+
+class PKRangeSweep:
+    """
+    Updates or deletes the rows of a queryset one primary key range at a time.
+
+    :param name: Identifies the sweep in logs and results.
+    :param queryset: The rows to sweep. It is filtered again for every range, so rows
+        that stopped matching in the meantime are left alone.
+    :param updates: A dict of field values to set. If omitted the rows are deleted.
+    :param delete: A callable taking the queryset of a range and returning the number
+        of rows it deleted, for rows that need more than a plain ``delete()``.
+    :param batch_size: The maximum number of rows in a range.
+    """
+
+    def __init__(self, name, queryset, updates=None, delete=None, batch_size=None):
+        self.name = name
+        self.queryset = queryset.order_by("pk")
+        self.updates = updates
+        self.delete = delete
+        self.batch_size = batch_size or get_batch_size()
+
+    def __repr__(self):
+        return "<PKRangeSweep {}>".format(self.name)
+
+    def ranges(self):
+        """
+        Yield ``(low, high)`` primary key bounds covering every matching row, where
+        ``low`` is exclusive and ``None`` for the first range.
+        """
+        low = None
+        while True:
+            batch = self.queryset if low is None else self.queryset.filter(pk__gt=low)
+            pks = list(batch.values_list("pk", flat=True)[: self.batch_size])
+            if not pks:
+                break
+            yield low, pks[-1]
+            if len(pks) < self.batch_size:
+                break
+            low = pks[-1]
+
+    def process(self, queryset):
+        if self.updates is not None:
+            return queryset.update(**self.updates)
+        if self.delete is not None:
+            return self.delete(queryset)
+        deleted, by_model = queryset.delete()
+        return by_model.get(queryset.model._meta.label, 0)
+
+    def run(self):
+        """
+        :returns: dict -- The rows changed, the ranges processed and the duration.
+        """
+        started = time.monotonic()
+        rows = 0
+        batches = 0
+        for low, high in self.ranges():
+            queryset = self.queryset.filter(pk__lte=high)
+            if low is not None:
+                queryset = queryset.filter(pk__gt=low)
+            with transaction.atomic():
+                rows += self.process(queryset)
+            batches += 1
+        result = {
+            "rows": rows,
+            "batches": batches,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        logger.info("Sweep {} finished: {}".format(self.name, result))
+        return result
+
+
+def run_maintenance():
+    """
+    Run every sweep in ``MAINTENANCE_SWEEPS``. A sweep that fails is logged and
+    skipped so the others still run.
+
+    :returns: OrderedDict -- The result of each sweep, keyed by its dotted path.
+    """
+    results = OrderedDict()
+    for path in getattr(settings, "MAINTENANCE_SWEEPS", []):
+        try:
+            results[path] = import_string(path)()
+        except Exception as e:
+            logger.exception("Maintenance sweep {} failed".format(path))
+            results[path] = {"error": str(e)}
+    return results
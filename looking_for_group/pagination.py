@@ -0,0 +1,411 @@
+"""
+Keyset pagination for the API and the HTML lists.
+
+Paging with ``OFFSET`` makes the database read and throw away every row before the
+requested page, so deep pages get slower the further in they are. Keyset pagination
+instead filters on the ordering key of the last row that was shown, which an index on
+the ordering columns can answer directly. The ordering always ends with the primary
+key, so every row has a unique position and rows are neither skipped nor repeated
+when others are inserted in the meantime.
+
+Cursors are opaque tokens encoding the key of a row and the direction to read in.
+Clients that need the old behaviour can ask for it with ``?pagination=offset``, or
+by passing an ``offset``, in the API, and with ``?page=<n>`` in the HTML lists.
+"""
+import base64
+import binascii
+import datetime
+import json
+import logging
+from collections import namedtuple
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F
+from django.db.models.expressions import OrderBy
+from django.db.models.query_utils import Q
+from django.http import Http404
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger("pagination")
+
+DEFAULT_ORDERING = ("-modified",)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeyField(
+    namedtuple("KeyField", ["attname", "field", "descending", "nulls_last"])
+):
+    """
+    A column of a keyset ordering. ``nulls_last`` follows the Postgres default of
+    sorting nulls as larger than any value unless an ordering says otherwise.
+    """
+
+    def reversed(self):
+        return self._replace(
+            descending=not self.descending, nulls_last=not self.nulls_last
+        )
+
+    def order_by(self):
+        if not self.field.null:
+            return OrderBy(F(self.attname), descending=self.descending)
+        return OrderBy(
+            F(self.attname),
+            descending=self.descending,
+            nulls_first=not self.nulls_last,
+            nulls_last=self.nulls_last,
+        )
+
+    def after(self, value):
+        """
+        The rows strictly after ``value`` in this column, or ``None`` if there are
+        none.
+        """
+        if value is None:
+            if self.nulls_last:
+                return None
+            return Q(**{"{}__isnull".format(self.attname): False})
+        lookup = "{}__{}".format(self.attname, "lt" if self.descending else "gt")
+        condition = Q(**{lookup: value})
+        if self.field.null and self.nulls_last:
+            condition |= Q(**{"{}__isnull".format(self.attname): True})
+        return condition
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{"{}__isnull".format(self.attname): True})
+        return Q(**{self.attname: value})
+
+
+def get_key_fields(model, ordering):
+    """
+    Turn an ordering of field names and ``F()`` expressions into key fields that end
+    in a unique, non-null column, appending the primary key if needed.
+
+    :raises ValueError: If the ordering uses anything but columns of the model.
+    """
+    key_fields = []
+    for item in ordering:
+        if isinstance(item, str):
+            if item == "?":
+                raise ValueError("Random orderings can't be paginated by key.")
+            descending = item.startswith("-")
+            name = item.lstrip("-+")
+            nulls_last = None
+        elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+            name = item.expression.name
+            descending = item.descending
+            nulls_last = (
+                True if item.nulls_last else False if item.nulls_first else None
+            )
+        else:
+            raise ValueError("Unsupported ordering {!r}".format(item))
+        if "__" in name:
+            raise ValueError("Orderings across relations can't be paginated by key.")
+        try:
+            field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        except FieldDoesNotExist as e:
+            raise ValueError(str(e))
+        if nulls_last is None:
+            nulls_last = not descending
+        key_fields.append(KeyField(field.attname, field, descending, nulls_last))
+        if field.unique and not field.null:
+            return key_fields
+    pk = model._meta.pk
+    descending = key_fields[-1].descending if key_fields else False
+    key_fields.append(KeyField(pk.attname, pk, descending, not descending))
+    return key_fields
+
+
+def keyset_filter(key_fields, values):
+    """
+    The rows that come after the row with the given key, or ``None`` if no row can.
+    """
+    terms = []
+    prefix = Q()
+    for key_field, value in zip(key_fields, values):
+        after = key_field.after(value)
+        if after is not None:
+            terms.append(prefix & after)
+        prefix &= key_field.equal(value)
+    if not terms:
+        return None
+    return reduce(or_, terms)
+
+
+def _serialize(value):
+    # DjangoJSONEncoder truncates microseconds, which would break exact positions.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    return value
+
+
+def encode_cursor(values, reverse=False):
+    data = json.dumps({"k": [_serialize(value) for value in values], "r": reverse})
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, key_fields):
+    """
+    :returns: tuple -- The key values, parsed by their fields, and the direction.
+    :raises InvalidCursor: If the cursor is malformed or doesn't match the ordering.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = data["k"]
+        reverse = bool(data.get("r", False))
+        if len(values) != len(key_fields):
+            raise InvalidCursor("The cursor does not match the ordering.")
+        values = [
+            None if value is None else key_field.field.to_python(value)
+            for key_field, value in zip(key_fields, values)
+        ]
+    except (
+        binascii.Error,
+        UnicodeError,
+        ValueError,
+        TypeError,
+        KeyError,
+        ValidationError,
+    ):
+        raise InvalidCursor("Invalid cursor")
+    return values, reverse
+
+
+class KeysetPage:
+    """
+    A page of results with cursors for its neighbours. It implements the parts of
+    :class:`django.core.paginator.Page` that templates use.
+    """
+
+    is_keyset = True
+
+    def __init__(
+        self, object_list, has_next, has_previous, next_cursor, previous_cursor
+    ):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    Fetches pages of a queryset by key.
+
+    :param ordering: The ordering to page through. Defaults to the ordering of the
+        queryset, then the model's default ordering, then ``-modified``.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        if not ordering:
+            ordering = (
+                queryset.query.order_by
+                or queryset.model._meta.ordering
+                or DEFAULT_ORDERING
+            )
+        self.key_fields = get_key_fields(queryset.model, ordering)
+
+    def get_key(self, obj):
+        if isinstance(obj, dict):
+            return [obj[key_field.attname] for key_field in self.key_fields]
+        return [getattr(obj, key_field.attname) for key_field in self.key_fields]
+
+    def get_page(self, cursor=None):
+        """
+        :param cursor: A cursor from a previous page, or ``None`` for the first page.
+        :raises InvalidCursor:
+        """
+        values, reverse = None, False
+        if cursor:
+            values, reverse = decode_cursor(cursor, self.key_fields)
+        key_fields = self.key_fields
+        if reverse:
+            key_fields = [key_field.reversed() for key_field in key_fields]
+        queryset = self.queryset.order_by(
+            *[key_field.order_by() for key_field in key_fields]
+        )
+        if values is not None:
+            condition = keyset_filter(key_fields, values)
+            queryset = (
+                queryset.none() if condition is None else queryset.filter(condition)
+            )
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_next:
+                next_cursor = encode_cursor(self.get_key(rows[-1]))
+            if has_previous:
+                previous_cursor = encode_cursor(self.get_key(rows[0]), reverse=True)
+        elif values is not None:
+            # The rows around the cursor were removed; point back the way we came.
+            if reverse:
+                next_cursor = encode_cursor(values)
+            else:
+                previous_cursor = encode_cursor(values, reverse=True)
+        return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination for viewsets. The ordering comes from the view's
+    ``OrderingFilter`` if it has one, then the view's ``ordering``, then the queryset.
+    Requests with ``?pagination=offset`` or an ``offset`` parameter get the previous
+    limit and offset pagination instead.
+    """
+
+    ordering = None
+    page_size_query_param = "limit"
+    max_page_size = 500
+    offset_query_param = "offset"
+    pagination_query_param = "pagination"
+
+    def use_offset(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == "offset"
+            or self.offset_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.offset_paginator = None
+        if self.use_offset(request):
+            self.offset_paginator = LimitOffsetPagination()
+            return self.offset_paginator.paginate_queryset(queryset, request, view)
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        try:
+            paginator = KeysetPaginator(
+                queryset, self.page_size, self.get_ordering(request, queryset, view)
+            )
+            self.page = paginator.get_page(
+                request.query_params.get(self.cursor_query_param)
+            )
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        if self.page.has_other_pages() and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, "filter_backends", []):
+            if hasattr(backend, "get_ordering"):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering
+        return getattr(view, "ordering", None) or self.ordering
+
+    def _get_link(self, cursor):
+        url = remove_query_param(self.base_url, self.offset_query_param)
+        if cursor is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.page.has_next():
+            return None
+        return self._get_link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        if not self.page.has_previous():
+            return None
+        return self._get_link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_html_context()
+        return super().get_html_context()
+
+    def get_schema_fields(self, view):
+        fields = super().get_schema_fields(view)
+        return fields + [
+            coreapi.Field(
+                name=self.pagination_query_param,
+                required=False,
+                location="query",
+                schema=coreschema.String(
+                    title="Pagination",
+                    description=(
+                        "Use 'offset' for limit and offset pagination instead of "
+                        "cursors."
+                    ),
+                ),
+            ),
+            coreapi.Field(
+                name=self.offset_query_param,
+                required=False,
+                location="query",
+                schema=coreschema.Integer(
+                    title="Offset",
+                    description="The initial index for offset pagination.",
+                ),
+            ),
+        ]
+
+
+class KeysetPaginationMixin:
+    """
+    Keyset pagination for list views. Links to the neighbouring pages use the
+    ``cursor`` query parameter, while a ``page`` parameter falls back to the usual
+    page number pagination.
+    """
+
+    cursor_kwarg = "cursor"
+    keyset_ordering = None
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET or self.kwargs.get(self.page_kwarg):
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        try:
+            page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404(_("Invalid cursor"))
+        return (paginator, page, page.object_list, page.has_other_pages())
@@ -4,8 +4,8 @@ from allauth.account.signals import user_logged_in
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from markdown import markdown
 
+from ..rendering import render_field
 from ..users.models import User
 from .models import ReleaseNote, ReleaseNotice
 from .serializers import ReleaseNoteSerializer
@@ -33,7 +33,7 @@ def render_markdown_to_field(sender, instance, *args, **kwargs):
     Render the markdown note as HTML into the rendered_field to have a db cache of the result.
     """
     if instance.notes:
-        instance.notes_rendered = markdown(instance.notes)
+        render_field(instance, "notes", "notes_rendered")
 
 
 @receiver(user_logged_in)
@@ -0,0 +1,207 @@
+"""
+Markdown rendering for the models that keep a rendered copy of a markdown field.
+
+Each renderer reuses a configured ``Markdown`` instance per thread, and caches its
+output under a hash of the source text in a cache shared by every process, so text
+that has been rendered once is never rendered again.
+"""
+import hashlib
+import logging
+import threading
+
+import bleach
+from bleach_whitelist.bleach_whitelist import markdown_attrs, markdown_tags
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.html import linebreaks
+from django_q.tasks import async_task
+from markdown import Markdown
+
+logger = logging.getLogger("rendering")
+
+
+def get_cache():
+    return caches[getattr(settings, "MARKDOWN_CACHE_ALIAS", "default")]
+
+
+def get_async_threshold():
+    """
+    Bodies longer than this many characters are rendered in a background task. A
+    falsy value renders everything inline.
+    """
+    return getattr(settings, "MARKDOWN_ASYNC_THRESHOLD", None)
+
+
+class MarkdownRenderer:
+    """
+    Renders markdown to HTML with a fixed configuration.
+
+    :param name: Identifies the configuration in cache keys and background tasks.
+    :param output_format: The output format passed to ``Markdown``.
+    :param sanitize: Whether to clean the output with the markdown bleach whitelist.
+    """
+
+    def __init__(self, name, output_format="xhtml", sanitize=False):
+        self.name = name
+        self.output_format = output_format
+        self.sanitize = sanitize
+        self._local = threading.local()
+
+    def __repr__(self):
+        return "<MarkdownRenderer {}>".format(self.name)
+
+    def get_markdown(self):
+        md = getattr(self._local, "markdown", None)
+        if md is None:
+            md = self._local.markdown = Markdown(output_format=self.output_format)
+        return md
+
+    def cache_key(self, text):
+        return "markdown:{}:{}".format(
+            self.name, hashlib.sha256(text.encode("utf-8")).hexdigest()
+        )
+
+    def convert(self, text):
+        """
+        Render without consulting the cache.
+        """
+        html = self.get_markdown().reset().convert(text)
+        if self.sanitize:
+            html = bleach.clean(html, markdown_tags, markdown_attrs)
+        return html
+
+    def get_cached(self, text):
+        return get_cache().get(self.cache_key(text))
+
+    def render(self, text):
+        """
+        Render a single text, or return ``None`` if it is empty.
+        """
+        return self.render_many([text])[0]
+
+    def render_many(self, texts):
+        """
+        Render a list of texts with a single cache lookup and a single cache write.
+        Empty texts render as ``None``.
+
+        :returns: list -- The rendered HTML in the same order as ``texts``.
+        """
+        keys = {text: self.cache_key(text) for text in set(texts) if text}
+        if not keys:
+            return [None] * len(texts)
+        cache = get_cache()
+        found = cache.get_many(list(keys.values()))
+        rendered = {}
+        missing = {}
+        for text, key in keys.items():
+            if key in found:
+                rendered[text] = found[key]
+            else:
+                rendered[text] = missing[key] = self.convert(text)
+        if missing:
+            logger.debug("Rendered {} uncached markdown bodies".format(len(missing)))
+            cache.set_many(
+                missing, timeout=getattr(settings, "MARKDOWN_CACHE_TIMEOUT", None)
+            )
+        return [rendered[text] if text else None for text in texts]
+
+
+default_renderer = MarkdownRenderer("default")
+sanitized_renderer = MarkdownRenderer("sanitized", output_format="html5", sanitize=True)
+
+RENDERERS = {
+    renderer.name: renderer for renderer in [default_renderer, sanitized_renderer]
+}
+
+
+def render_field(instance, source_field, rendered_field, renderer=default_renderer):
+    """
+    Update the rendered copy of a markdown field on an instance that is about to be
+    saved. If an async threshold is configured, long bodies that are not cached yet
+    get an escaped placeholder and are rendered in a background task once the save
+    commits.
+    """
+    text = getattr(instance, source_field)
+    threshold = get_async_threshold()
+    if text and threshold and len(text) > threshold:
+        html = renderer.get_cached(text)
+        if html is None:
+            setattr(instance, rendered_field, linebreaks(text, autoescape=True))
+            label, pk = instance._meta.label, instance.pk
+            transaction.on_commit(
+                lambda: async_task(
+                    render_markdown_field,
+                    label,
+                    pk,
+                    source_field,
+                    rendered_field,
+                    renderer.name,
+                )
+            )
+            return
+        setattr(instance, rendered_field, html)
+        return
+    setattr(instance, rendered_field, renderer.render(text))
+
+
+def render_objects(objects, source_field, rendered_field, renderer=default_renderer):
+    """
+    Set the rendered copy of a markdown field on many instances at once, e.g. before a
+    ``bulk_create``.
+    """
+    objects = list(objects)
+    rendered = renderer.render_many([getattr(obj, source_field) for obj in objects])
+    for obj, html in zip(objects, rendered):
+        setattr(obj, rendered_field, html)
+    return objects
+
+
+def render_queryset(
+    queryset, source_field, rendered_field, renderer=default_renderer, batch_size=500
+):
+    """
+    Re-render a markdown field for every row of a queryset in primary key batches,
+    writing with ``bulk_update`` so no save receivers fire. Useful after bulk imports
+    and fixture loads.
+
+    :returns: int -- The number of rows whose rendered copy changed.
+    """
+    queryset = queryset.order_by("pk").only("pk", source_field, rendered_field)
+    updated = 0
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        previous = [getattr(obj, rendered_field) for obj in batch]
+        render_objects(batch, source_field, rendered_field, renderer)
+        changed = [
+            obj
+            for obj, old in zip(batch, previous)
+            if getattr(obj, rendered_field) != old
+        ]
+        if changed:
+            queryset.model.objects.bulk_update(changed, [rendered_field])
+            updated += len(changed)
+    return updated
+
+
+def render_markdown_field(
+    model_label, pk, source_field, rendered_field, renderer_name="default"
+):
+    """
+    Background task for long bodies. The rendered copy is only written if the source
+    text is still the one that was rendered.
+    """
+    model = apps.get_model(model_label)
+    text = model.objects.filter(pk=pk).values_list(source_field, flat=True).first()
+    if not text:
+        return 0
+    html = RENDERERS[renderer_name].render(text)
+    return model.objects.filter(pk=pk, **{source_field: text}).update(
+        **{rendered_field: html}
+    )
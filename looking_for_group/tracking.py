@@ -0,0 +1,42 @@
+"""
+Field change tracking, so that receivers can tell what changed in a save without
+selecting the old copy of the row.
+
+Declare ``tracker = FieldTracker(fields=[...])`` on a model and use
+``instance.tracker.has_changed(field)`` and ``instance.tracker.previous(field)`` in
+its receivers. The values are snapshotted when the instance is loaded and again after
+each save.
+"""
+from django.db.models.signals import post_init
+from model_utils import tracker
+
+
+class FieldInstanceTracker(tracker.FieldInstanceTracker):
+    """
+    Our primary keys are UUIDs assigned on instantiation, so ``pk`` cannot be used to
+    spot unsaved rows the way ``model_utils`` does. Use ``_state.adding`` instead.
+    """
+
+    def has_changed(self, field):
+        if self.instance._state.adding and field in self.fields:
+            return True
+        return super().has_changed(field)
+
+    def previous(self, field):
+        if self.instance._state.adding:
+            return None
+        return super().previous(field)
+
+
+class FieldTracker(tracker.FieldTracker):
+    """
+    A ``model_utils.FieldTracker`` that understands UUID primary keys and only listens
+    to ``post_init`` for its own model rather than for every model instantiated.
+    """
+
+    tracker_class = FieldInstanceTracker
+
+    def finalize_class(self, sender, **kwargs):
+        super().finalize_class(sender, **kwargs)
+        post_init.disconnect(self.initialize_tracker)
+        post_init.connect(self.initialize_tracker, sender=sender)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Preferences
+from .models import AccountDeletionRequest, Preferences
 
 # Register your models here.
 
@@ -11,3 +11,12 @@ class PrefAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Preferences, PrefAdmin)
+
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    list_display = ['username', 'status', 'step', 'chunks_processed', 'created', 'finished']
+    list_filter = ['status', 'step']
+    readonly_fields = ['user', 'username', 'games_deleted', 'players_deleted', 'events_deleted', 'chunks_processed', 'error', 'finished']
+
+
+admin.site.register(AccountDeletionRequest, AccountDeletionAdmin)
@@ -0,0 +1,62 @@
+# Generated by Django 3.0.4 on 2020-03-29 14:02
+
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def schedule_deletion_resume(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func="looking_for_group.user_preferences.tasks.resume_account_deletions",
+        defaults={
+            "name": "Resume stalled account deletions",
+            "schedule_type": "H",
+            "repeats": -1,
+        },
+    )
+
+
+def unschedule_deletion_resume(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(
+        func="looking_for_group.user_preferences.tasks.resume_account_deletions"
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('django_q', '0009_auto_20171009_0915'),
+        ('user_preferences', '0003_preferences_community_subscribe_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDeletionRequest',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('username', models.CharField(max_length=150)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'In progress'), ('complete', 'Complete'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('step', models.CharField(choices=[('games', 'Deleting GMed games'), ('players', 'Deleting player records'), ('events', 'Deleting calendar events'), ('account', 'Deleting account'), ('done', 'Done')], default='games', max_length=20)),
+                ('games_deleted', models.PositiveIntegerField(default=0)),
+                ('players_deleted', models.PositiveIntegerField(default=0)),
+                ('events_deleted', models.PositiveIntegerField(default=0)),
+                ('chunks_processed', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deletion_request', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(schedule_deletion_resume, unschedule_deletion_resume),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.4 on 2020-04-01 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_preferences', '0004_accountdeletionrequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountdeletionrequest',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='How many times processing has failed.'),
+        ),
+    ]
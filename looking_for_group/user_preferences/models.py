@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.urls import reverse_lazy
 from django.utils.translation import ugettext_lazy as _
@@ -25,3 +26,58 @@ class Preferences(TimeStampedModel, AbstractUUIDModel, models.Model):
 
     def get_absolute_url(self):
         return reverse_lazy('user_preferences:setting-view')
+
+
+class AccountDeletionRequest(TimeStampedModel, AbstractUUIDModel, models.Model):
+    """
+    Tracks the progress of a background account deletion. The row outlives the user
+    so that the deletion can still be polled after the account is gone.
+    """
+
+    STATUS_CHOICES = (
+        ("pending", _("Pending")),
+        ("running", _("In progress")),
+        ("complete", _("Complete")),
+        ("failed", _("Failed")),
+    )
+    STEP_CHOICES = (
+        ("games", _("Deleting GMed games")),
+        ("players", _("Deleting player records")),
+        ("events", _("Deleting calendar events")),
+        ("account", _("Deleting account")),
+        ("done", _("Done")),
+    )
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="deletion_request",
+    )
+    username = models.CharField(max_length=150)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="pending", db_index=True
+    )
+    step = models.CharField(max_length=20, choices=STEP_CHOICES, default="games")
+    games_deleted = models.PositiveIntegerField(default=0)
+    players_deleted = models.PositiveIntegerField(default=0)
+    events_deleted = models.PositiveIntegerField(default=0)
+    chunks_processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveIntegerField(
+        default=0, help_text=_("How many times processing has failed.")
+    )
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "Deletion of {} ({})".format(self.username, self.status)
+
+    def get_absolute_url(self):
+        return reverse_lazy(
+            "user_preferences:account_delete_status", kwargs={"deletion": self.pk}
+        )
+
+    @property
+    def is_finished(self):
+        return self.status in ("complete", "failed")
@@ -1,16 +1,24 @@
 import logging
+from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.mail import EmailMultiAlternatives
 from django.db import transaction
+from django.db.models import F, Q
 from django.template import RequestContext
 from django.template.loader import render_to_string
 from django.test import RequestFactory
+from django.utils import timezone
 from django_q.tasks import async_task
 from markdown import markdown
 from notifications.models import Notification
+from schedule.models import Calendar, Event
 
-from .models import Preferences
+from ..games.deletion import DeletionPlan
+from ..games.models import GamePosting, Player
+from ..games.receivers import skip_departure_cleanup
+from .models import AccountDeletionRequest, Preferences
 
 logger = logging.getLogger("games")
 
@@ -59,3 +67,199 @@ def get_notifications_for_userlist(user_targets):
 def perform_daily_digests():
     user_list = get_users_with_digests()
     get_notifications_for_userlist(user_list)
+
+
+def get_deletion_batch_sizes():
+    return (
+        getattr(settings, "ACCOUNT_DELETION_GAME_BATCH_SIZE", 5),
+        getattr(settings, "ACCOUNT_DELETION_BATCH_SIZE", 200),
+    )
+
+
+def queue_account_deletion(user):
+    """
+    Deactivate an account and start deleting it in the background. Asking again for an
+    account whose deletion failed retries it from the step where it stopped.
+
+    :returns: AccountDeletionRequest -- The row recording the progress of the deletion.
+    """
+    with transaction.atomic():
+        deletion, created = AccountDeletionRequest.objects.get_or_create(
+            user=user, defaults={"username": user.username}
+        )
+        if user.is_active:
+            user.is_active = False
+            user.save(update_fields=["is_active"])
+        if not created and deletion.status == "failed":
+            deletion.status = "pending"
+            deletion.error = ""
+            deletion.attempts = 0
+            deletion.save(update_fields=["status", "error", "attempts", "modified"])
+        elif not created:
+            return deletion
+    transaction.on_commit(lambda: async_task(process_account_deletion, deletion.pk))
+    return deletion
+
+
+def delete_games_chunk(deletion, batch_size):
+    games = list(
+        GamePosting.objects.filter(gm__user_id=deletion.user_id).order_by("pk")[
+            :batch_size
+        ]
+    )
+    # Player records and sessions go with the game, so there are no calendars or next
+    # session times to update for them.
+    with skip_departure_cleanup():
+        for game in games:
+            game.delete()
+    deletion.games_deleted += len(games)
+    return len(games)
+
+
+def delete_players_chunk(deletion, batch_size):
+    player_ids = list(
+        Player.objects.filter(gamer__user_id=deletion.user_id)
+        .order_by("pk")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if player_ids:
+        # The copies of game events in the player's calendar are removed in the next
+        # step, so the per player calendar cleanup is skipped.
+        with skip_departure_cleanup():
+            Player.objects.filter(pk__in=player_ids).delete()
+    deletion.players_deleted += len(player_ids)
+    return len(player_ids)
+
+
+def delete_events_chunk(deletion, batch_size):
+    event_ids = list(
+        Event.objects.filter(
+            calendar_id__in=Calendar.objects.filter(slug=deletion.username).values("id")
+        )
+        .order_by("pk")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if event_ids:
+        counts = DeletionPlan(event_ids=event_ids).execute()
+        deletion.events_deleted += counts.get("schedule.Event", 0)
+    return len(event_ids)
+
+
+def delete_account(deletion, batch_size):
+    Calendar.objects.filter(slug=deletion.username).delete()
+    if deletion.user is not None:
+        deletion.user.delete()
+        deletion.user = None
+    deletion.status = "complete"
+    deletion.finished = timezone.now()
+    return 0
+
+
+DELETION_STEPS = (
+    ("games", delete_games_chunk),
+    ("players", delete_players_chunk),
+    ("events", delete_events_chunk),
+    ("account", delete_account),
+)
+
+
+def process_deletion_chunk(deletion_id):
+    """
+    Run a single bounded chunk of an account deletion in its own transaction, moving
+    on to the next step once the current one has nothing left to delete.
+
+    :returns: bool -- Whether there is more work to do.
+    """
+    game_batch_size, batch_size = get_deletion_batch_sizes()
+    with transaction.atomic():
+        deletion = (
+            AccountDeletionRequest.objects.select_for_update(skip_locked=True)
+            .filter(pk=deletion_id, status__in=["pending", "running"])
+            .first()
+        )
+        if deletion is None:
+            # Finished, or another worker is processing a chunk right now.
+            return False
+        steps = dict(DELETION_STEPS)
+        deletion.status = "running"
+        processed = steps[deletion.step](
+            deletion, game_batch_size if deletion.step == "games" else batch_size
+        )
+        if not processed:
+            step_names = [name for name, step in DELETION_STEPS] + ["done"]
+            if deletion.status == "complete":
+                deletion.step = "done"
+            else:
+                deletion.step = step_names[step_names.index(deletion.step) + 1]
+        deletion.chunks_processed += 1
+        deletion.save(
+            update_fields=[
+                "status",
+                "step",
+                "games_deleted",
+                "players_deleted",
+                "events_deleted",
+                "chunks_processed",
+                "finished",
+                "modified",
+            ]
+        )
+    logger.debug(
+        "Processed chunk {} of {}, now at step {}".format(
+            deletion.chunks_processed, deletion, deletion.step
+        )
+    )
+    return deletion.status == "running"
+
+
+def process_account_deletion(deletion_id):
+    """
+    Process the next chunk of an account deletion and queue another run of this task
+    until the user has been deleted. A chunk that fails marks the deletion as failed
+    and is rolled back, so it can be retried from the same point.
+    """
+    try:
+        more = process_deletion_chunk(deletion_id)
+    except Exception as e:
+        logger.exception("Account deletion {} failed".format(deletion_id))
+        AccountDeletionRequest.objects.filter(pk=deletion_id).update(
+            status="failed",
+            error=str(e),
+            attempts=F("attempts") + 1,
+            modified=timezone.now(),
+        )
+        raise
+    if more:
+        async_task(process_account_deletion, deletion_id)
+    return more
+
+
+def resume_account_deletions():
+    """
+    Queue the next chunk of any deletion that has not made progress recently, e.g.
+    because the worker running it was restarted, or that failed and has not been
+    retried since. Deletions that have failed too many times are left for a manual
+    retry through :func:`queue_account_deletion`.
+
+    :returns: int -- The number of deletions resumed.
+    """
+    stalled_before = timezone.now() - timedelta(
+        minutes=getattr(settings, "ACCOUNT_DELETION_STALLED_MINUTES", 30)
+    )
+    stalled = list(
+        AccountDeletionRequest.objects.filter(
+            Q(status__in=["pending", "running"])
+            | Q(
+                status="failed",
+                attempts__lt=getattr(settings, "ACCOUNT_DELETION_MAX_ATTEMPTS", 3),
+            ),
+            modified__lt=stalled_before,
+        ).values_list("pk", flat=True)
+    )
+    AccountDeletionRequest.objects.filter(pk__in=stalled, status="failed").update(
+        status="pending", modified=timezone.now()
+    )
+    for deletion_id in stalled:
+        logger.info("Resuming stalled account deletion {}".format(deletion_id))
+        async_task(process_account_deletion, deletion_id)
+    return len(stalled)
@@ -1,9 +1,15 @@
+from datetime import timedelta
+
 import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
 from notifications.models import Notification
 from notifications.signals import notify
+from schedule.models import Calendar
 
+from ...games.models import GamePosting, Player
 from .. import tasks
-from ..models import Preferences
+from ..models import AccountDeletionRequest, Preferences
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -66,3 +72,57 @@ def test_email_sending(up_task_testdata):
 
 def test_full_process(up_task_testdata):
     tasks.perform_daily_digests()
+
+
+def test_account_deletion_in_chunks(settings, game_testdata):
+    settings.ACCOUNT_DELETION_GAME_BATCH_SIZE = 1
+    settings.ACCOUNT_DELETION_BATCH_SIZE = 1
+    user = game_testdata.gamer1.user
+    gmed_games = list(GamePosting.objects.filter(gm=game_testdata.gamer1))
+    player_records = Player.objects.filter(gamer=game_testdata.gamer1).count()
+    assert gmed_games and player_records
+    deletion = tasks.queue_account_deletion(user)
+    deletion.refresh_from_db()
+    assert deletion.status == "complete"
+    assert deletion.step == "done"
+    assert deletion.user is None
+    assert deletion.finished
+    assert deletion.games_deleted == len(gmed_games)
+    assert deletion.players_deleted == player_records
+    # One chunk per row, plus one empty chunk closing each step.
+    assert deletion.chunks_processed >= len(gmed_games) + player_records + 4
+    assert not get_user_model().objects.filter(pk=user.pk).exists()
+    assert not GamePosting.objects.filter(pk__in=[g.pk for g in gmed_games]).exists()
+    assert not Calendar.objects.filter(slug=deletion.username).exists()
+    assert tasks.process_account_deletion(deletion.pk) is False
+
+
+def test_account_deletion_resume(game_testdata):
+    user = game_testdata.gamer3.user
+    deletion = AccountDeletionRequest.objects.create(user=user, username=user.username)
+    assert tasks.resume_account_deletions() == 0
+    AccountDeletionRequest.objects.filter(pk=deletion.pk).update(
+        modified=timezone.now() - timedelta(days=1)
+    )
+    assert tasks.resume_account_deletions() == 1
+    deletion.refresh_from_db()
+    assert deletion.status == "complete"
+    assert not get_user_model().objects.filter(pk=user.pk).exists()
+
+
+def test_failed_account_deletion_retry_limit(settings, game_testdata):
+    settings.ACCOUNT_DELETION_MAX_ATTEMPTS = 2
+    user = game_testdata.gamer3.user
+    deletion = AccountDeletionRequest.objects.create(
+        user=user, username=user.username, status="failed", attempts=2
+    )
+    AccountDeletionRequest.objects.filter(pk=deletion.pk).update(
+        modified=timezone.now() - timedelta(days=1)
+    )
+    assert tasks.resume_account_deletions() == 0
+    deletion.refresh_from_db()
+    assert deletion.status == "failed"
+    tasks.queue_account_deletion(user)
+    deletion.refresh_from_db()
+    assert deletion.attempts == 0
+    assert deletion.status == "complete"
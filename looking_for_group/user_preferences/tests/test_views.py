@@ -2,7 +2,7 @@ import pytest
 from django.urls import reverse
 
 from ...gamer_profiles import models as social_models
-from ..models import Preferences
+from ..models import AccountDeletionRequest, Preferences
 from ..utils import fetch_or_set_discord_comm_links, prime_site_stats_cache
 
 pytestmark = pytest.mark.django_db(transaction=True)
@@ -85,3 +85,20 @@ def test_discord_fetch(game_testdata):
 
 def test_stats_priming(game_testdata):
     prime_site_stats_cache()
+
+
+def test_account_deletion_status(client, game_testdata):
+    user = game_testdata.gamer2.user
+    deletion = AccountDeletionRequest.objects.create(user=user, username=user.username)
+    response = client.get(deletion.get_absolute_url())
+    assert response.status_code == 200
+    assert response.context["deletion"] == deletion
+    response = client.get(
+        reverse(
+            "user_preferences:account_delete_status_json",
+            kwargs={"deletion": deletion.pk},
+        )
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    assert response.json()["step"] == "games"
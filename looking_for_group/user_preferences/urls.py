@@ -8,4 +8,14 @@ urlpatterns = [
     path("", view=views.SettingsView.as_view(), name="setting-view"),
     path("edit/", view=views.SettingsEdit.as_view(), name="setting-edit"),
     path("goodbye/", view=views.DeleteAccount.as_view(), name="account_delete"),
+    path(
+        "goodbye/<uuid:deletion>/",
+        view=views.AccountDeletionStatus.as_view(),
+        name="account_delete_status",
+    ),
+    path(
+        "goodbye/<uuid:deletion>/json/",
+        view=views.AccountDeletionStatusJSON.as_view(),
+        name="account_delete_status_json",
+    ),
 ]
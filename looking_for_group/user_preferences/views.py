@@ -2,25 +2,21 @@ import hashlib
 import json
 import logging
 
-import factory.django
 import pytz
 from braces.views import SelectRelatedMixin
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.cache import cache
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
 from django.db.models.query_utils import Q
-from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.views import generic
+from django.views.generic.detail import SingleObjectMixin
 from django_q import humanhash
 from notifications.models import Notification
-from schedule.models import Calendar
 
 from ..discord.models import CommunityDiscordLink
 from ..game_catalog import models as catalog_models
@@ -28,7 +24,7 @@ from ..gamer_profiles import models as social_models
 from ..gamer_profiles.views import ModelFormWithSwitcViewhMixin
 from ..games import models as game_models
 from ..games.mixins import JSONResponseMixin
-from . import forms, models
+from . import forms, models, tasks
 
 # Create your views here.
 
@@ -36,53 +32,6 @@ from . import forms, models
 logger = logging.getLogger("gamer_profiles")
 
 
-def delete_user(user):
-    with transaction.atomic():
-        logger.debug("Delete user called, entering transaction.")
-        logger.debug("Starting search for player records...")
-        players = game_models.Player.objects.filter(
-            gamer=user.gamerprofile
-        ).select_related("gamer")
-        logger.debug("Found {} player records, deleting...".format(players.count()))
-        if len(players) > 0:
-            for player in players:
-                player.delete()
-        logger.debug("Proceeding to search for gmed_games to delete...")
-        games = user.gamerprofile.gmed_games.all()
-        logger.debug("Found {} gmed games... deleting.".format(games.count()))
-        if len(games) > 0:
-            for game in games:
-                with factory.django.mute_signals(pre_delete, post_delete):
-                    game.event.remove_child_events()
-                    game.event.delete()
-                    players = game_models.Player.objects.filter(
-                        game=game
-                    ).select_related("gamer")
-                    for player in players:
-                        logger.debug(
-                            "Deleting player {} from game {}".format(
-                                player.gamer, game.title
-                            )
-                        )
-                        player.delete()
-                    logger.debug("Players deleted, deleting game...")
-                with factory.django.mute_signals(
-                    pre_delete, post_delete, m2m_changed, pre_save, post_save
-                ):
-                    game.delete()
-        logger.debug("Games deleted, moving on.")
-        try:
-            logger.debug("Searching for calendar...")
-            cal = Calendar.objects.get(slug=user.username)
-            logger.debug("Calendar found for user, deleting...")
-            cal.delete()
-            logger.debug("Calendar successfully deleted.")
-        except ObjectDoesNotExist:
-            logger.debug("no calendar found, moving on...")
-        logger.debug("Now calling delete on user object.")
-        user.delete()
-
-
 def generate_delete_key(user_pk):
     concat_data = ", ".join([str(timezone.now()), str(user_pk)])
     digest = hashlib.sha256(concat_data.encode())
@@ -211,21 +160,11 @@ class Dashboard(LoginRequiredMixin, generic.ListView):
         context["gamer_communities"] = social_models.CommunityMembership.objects.filter(
             gamer=gamer
         ).select_related("community")
-        next_sessions = []
-        if context["gamer_active_games"].count() > 0:
-            for game in context["gamer_active_games"]:
-                if game.event:
-                    next_occurences = game.event.occurrences_after(
-                        timezone.now().astimezone(self.timezone)
-                    )
-                    try:
-                        occ = next(next_occurences)
-                        while occ.cancelled or occ.start < timezone.now():
-                            occ = next(next_occurences)
-                        next_sessions.append(occ)
-                    except StopIteration:
-                        pass  # No next occurrence
-        context["next_sessions"] = sorted(next_sessions, key=lambda k: k.start)
+        context["next_sessions"] = (
+            context["gamer_active_games"]
+            .filter(next_session_at__gte=timezone.now())
+            .order_by("next_session_at")
+        )
         context[
             "pending_community_applications"
         ] = social_models.CommunityApplication.objects.filter(
@@ -350,9 +289,47 @@ class DeleteAccount(LoginRequiredMixin, generic.DeleteView):
         logger.debug("Form valid, starting deletion process task.")
         logger.debug("Logging out user...")
         logout(request)
-        delete_user(user)
-        logger.debug("Redirecting to home.")
-        return HttpResponseRedirect(self.get_success_url())
+        deletion = tasks.queue_account_deletion(user)
+        logger.debug("Redirecting to deletion status.")
+        return HttpResponseRedirect(deletion.get_absolute_url())
+
+
+class AccountDeletionStatus(generic.DetailView):
+    """
+    Shows the progress of an account deletion. The user has already been logged out,
+    so the unguessable id of the deletion is what grants access.
+    """
+
+    model = models.AccountDeletionRequest
+    pk_url_kwarg = "deletion"
+    template_name = "user_preferences/delete_account_status.html"
+    context_object_name = "deletion"
+
+
+class AccountDeletionStatusJSON(JSONResponseMixin, SingleObjectMixin, generic.View):
+    """
+    The progress of an account deletion, for polling.
+    """
+
+    model = models.AccountDeletionRequest
+    pk_url_kwarg = "deletion"
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return self.render_to_response(self.get_context_data())
+
+    def get_data(self, context):
+        deletion = self.object
+        return {
+            "status": deletion.status,
+            "step": deletion.step,
+            "step_display": str(deletion.get_step_display()),
+            "games_deleted": deletion.games_deleted,
+            "players_deleted": deletion.players_deleted,
+            "events_deleted": deletion.events_deleted,
+            "chunks_processed": deletion.chunks_processed,
+            "finished": deletion.finished,
+        }
 
 
 class SiteSocialStatsView(LoginRequiredMixin, JSONResponseMixin, generic.TemplateView):